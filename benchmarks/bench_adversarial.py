@@ -0,0 +1,111 @@
+"""Check that conversion time grows linearly on adversarial inputs.
+
+Converts every ADVERSARIAL kind from corpus.py at growing sizes with each
+converter and fits the growth exponent of the time between the smallest and the
+largest size (1.0 is linear, 2.0 quadratic). A case fails when the exponent
+exceeds --max-exponent; cases that stay under --min-time at the largest size
+are reported but never fail, since their timings are mostly noise.
+
+The marko engine parses each paragraph with marko's own inline parser, which
+is not linear for every input; --budget-check converts a paragraph of
+backtick runs of growing length, one such input, under a time budget and
+fails unless the text comes back unchanged and about on time.
+
+Usage:
+    python benchmarks/bench_adversarial.py [--sizes 16KB,64KB,256KB] [--engines marko,fast,legacy]
+        [--kinds KIND,...] [--max-exponent 1.3] [--budget-check SECONDS]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import ADVERSARIAL, adversarial, format_size, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import (  # noqa: E402
+    ConversionStats, convert_math_syntax, convert_math_syntax_legacy,
+)
+
+CONVERTERS = {
+    "marko": lambda text: convert_math_syntax(text, cache=None),
+    "fast": lambda text: convert_math_syntax(text, engine="fast", cache=None),
+    "legacy": convert_math_syntax_legacy,
+}
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def backtick_runs(size):
+    """One paragraph of backtick runs of growing length, none of them closed"""
+    parts = ["\\( x \\) "]
+    total = len(parts[0])
+    n = 1
+    while total < size:
+        part = "`" * n + "a "
+        parts.append(part)
+        total += len(part)
+        n += 1
+    return "".join(parts) + "\n"
+
+
+def budget_check(seconds, size):
+    """Whether a conversion that would take far longer than seconds stops about on time, unchanged"""
+    text = backtick_runs(size)
+    stats = ConversionStats()
+    start = time.perf_counter()
+    output = convert_math_syntax(text, cache=None, stats=stats, time_budget=seconds)
+    elapsed = time.perf_counter() - start
+    ok = output == text and stats.documents_timed_out == 1 and elapsed < seconds + 0.5
+    print(f"budget {seconds}s on {format_size(size)} of backtick runs: {elapsed:.3f}s, "
+          f"{'unchanged' if output == text else 'CHANGED'}, timed out {stats.documents_timed_out}  "
+          f"{'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="16KB,64KB,256KB", help="comma-separated input sizes")
+    parser.add_argument("--engines", default=",".join(CONVERTERS), help="comma-separated converters")
+    parser.add_argument("--kinds", default=",".join(ADVERSARIAL), help="comma-separated ADVERSARIAL kinds")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (best is reported)")
+    parser.add_argument("--max-exponent", type=float, default=1.3, help="fail above this growth exponent")
+    parser.add_argument("--min-time", type=float, default=0.005, help="seconds below which a case never fails")
+    parser.add_argument(
+        "--budget-check", type=float, default=0.5, metavar="SECONDS",
+        help="time budget for the interrupted marko conversion, 0 to skip",
+    )
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    print(f"{'kind':18s} {'engine':7s} " + " ".join(f"{format_size(size):>9s}" for size in sizes) + "  exponent")
+    failures = 0
+    for kind in args.kinds.split(","):
+        for engine in args.engines.split(","):
+            times = []
+            for size in sizes:
+                text = adversarial(kind, size)
+                times.append(best_of(args.repeat, lambda: CONVERTERS[engine](text)))
+            exponent = math.log(max(times[-1], 1e-9) / max(times[0], 1e-9)) / math.log(sizes[-1] / sizes[0])
+            over = exponent > args.max_exponent and times[-1] >= args.min_time
+            failures += over
+            print(f"{kind:18s} {engine:7s} " + " ".join(f"{t * 1000:7.2f}ms" for t in times)
+                  + f"  {exponent:8.2f}  {'FAIL: superlinear' if over else 'ok'}")
+
+    if args.budget_check > 0 and not budget_check(args.budget_check, 256 * 1024):
+        failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Throughput of aconvert_many at different concurrency levels, and event-loop responsiveness.
+
+Converts a set of synthetic documents through an AsyncConverter with
+max_in_flight = 1, 2, 4, ... and reports documents/s, MB/s and the longest
+stall of a 1 ms ticker task running on the same loop. With the default thread
+executor the conversions share one core (the GIL): throughput stays flat, and
+every extra converting thread makes the loop wait longer for its turn at the
+GIL. --processes uses a process pool of the same size instead, which scales
+with cores and leaves the loop thread alone.
+
+Usage:
+    python benchmarks/bench_async.py [--docs N] [--size 64KB] [--levels 1,2,4,8,16] [--processes]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import format_size, generate, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.aio import AsyncConverter  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import warm_up  # noqa: E402
+
+
+async def ticker(stop, lags):
+    """Sleep 1 ms at a time and record how late each wake-up is"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def run_level(documents, level, processes):
+    executor = ProcessPoolExecutor(level, initializer=warm_up) if processes else None
+    converter = AsyncConverter(max_in_flight=level, executor=executor, cache=False)
+    if executor is not None:
+        await asyncio.gather(*[converter.convert("Warm up $ x $\n") for _ in range(level)])
+    stop = asyncio.Event()
+    lags = []
+    tick = asyncio.ensure_future(ticker(stop, lags))
+    start = time.perf_counter()
+    outputs = [output async for output in converter.convert_many(documents)]
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    converter.close()
+    if executor is not None:
+        executor.shutdown()
+    assert len(outputs) == len(documents)
+    return elapsed, max(lags, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=64, help="documents to convert per level")
+    parser.add_argument("--size", type=parse_size, default=parse_size("64KB"), help="document size")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="comma-separated max_in_flight values")
+    parser.add_argument("--processes", action="store_true", help="convert on a process pool instead of threads")
+    args = parser.parse_args()
+
+    warm_up()
+    documents = [generate(args.size, seed=seed) for seed in range(args.docs)]
+    megabytes = sum(len(document.encode("utf-8")) for document in documents) / (1024 * 1024)
+    kind = "processes" if args.processes else "threads"
+    print(f"{args.docs} documents of {format_size(args.size)} on {kind}")
+    for level in [int(level) for level in args.levels.split(",")]:
+        elapsed, lag = asyncio.run(run_level(documents, level, args.processes))
+        print(f"in flight {level:3d}  {args.docs / elapsed:8.1f} docs/s  {megabytes / elapsed:7.2f} MB/s  "
+              f"max loop stall {lag * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Overhead of slow-conversion capture on conversions that are not slow, and cost of a capture.
+
+Converts the same document with and without a SlowCapture whose threshold it
+never reaches (the price every listener conversion pays once capture is on),
+then with a zero threshold, without and with a profile dump, to show what
+recording one slow input costs on top of its conversion.
+
+Usage:
+    python benchmarks/bench_capture.py [--size 64KB] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import format_size, generate, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.capture import SlowCapture  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax  # noqa: E402
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=parse_size, default=parse_size("64KB"), help="document size")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per case (best is reported)")
+    args = parser.parse_args()
+
+    text = generate(args.size, seed=0)
+    with tempfile.TemporaryDirectory() as directory:
+        cases = {
+            "no capture": None,
+            "under threshold": SlowCapture(directory, threshold=3600),
+            "captured": SlowCapture(directory, threshold=0),
+            "captured + profile": SlowCapture(os.path.join(directory, "profiled"), threshold=0, profile=True),
+        }
+        times = {}
+        for name, capture in cases.items():
+            # A profile is only taken once per input, so this case is timed on its first capture
+            repeat = 1 if capture is not None and capture.profile else args.repeat
+            times[name] = best_of(repeat, lambda: convert_math_syntax(text, cache=None, capture=capture))
+
+    base = times["no capture"]
+    print(f"{format_size(args.size)} document, best of {args.repeat}")
+    for name, elapsed in times.items():
+        print(f"{name:20s} {elapsed * 1000:8.2f}ms  {elapsed / base - 1:+7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Time the listener's off-thread conversion pipeline on the fake clipboard backend.
+
+Clipboard notifications are delivered the way the Windows message loop does,
+by calling read_clipboard() and on_clipboard_change() from the event thread.
+Two scenarios:
+
+* stall: how long the event thread is blocked per notification, converting
+  inline versus handing off to the worker
+* burst: documents copied faster than they convert, timed from the first copy
+  until the worker is idle, with how many were coalesced or dropped as stale
+
+tests/test_coalescing.py checks that only the latest copy is written back and
+that a result overtaken by newer content is dropped.
+
+Usage:
+    python benchmarks/bench_coalescing.py [--size 512KB] [--copies N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import format_size, generate, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import warm_up  # noqa: E402
+from chatgpt_clipboard_latex_fixer.fakeclip import FakeClipboard, FakeClipboardListener  # noqa: E402
+
+
+def make_listener(background=True):
+    listener = FakeClipboardListener(FakeClipboard())
+    listener.cache = None  # Every copy is converted for real
+    listener.conversion_budget = None
+    listener.convert_in_background = background
+    return listener
+
+
+def notify(listener, text):
+    """Copy text and deliver the change notification; return the time the event thread was blocked"""
+    listener.clipboard.copy(text)
+    start = time.perf_counter()
+    content = listener.read_clipboard()
+    if content:
+        listener.on_clipboard_change(content)
+    return time.perf_counter() - start
+
+
+def stall(documents):
+    lines = []
+    for background in (False, True):
+        listener = make_listener(background)
+        blocked = [notify(listener, document) for document in documents[:3]]
+        listener.flush()
+        mode = "worker thread" if background else "inline"
+        lines.append(f"stall      {mode:13s} event thread blocked {max(blocked) * 1000:9.3f} ms per notification (max)")
+    return lines
+
+
+def burst(documents):
+    listener = make_listener()
+    start = time.perf_counter()
+    for document in documents:
+        notify(listener, document)
+    listener.flush()
+    seconds = time.perf_counter() - start
+    events = listener.metrics.snapshot()["events"]
+    return [
+        f"burst      {len(documents)} copies -> {listener.stats.documents} conversions in {seconds * 1000:.1f} ms, "
+        f"{events['coalesced']} coalesced, {events['stale']} stale, {events['converted']} written back"
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=parse_size, default=parse_size("512KB"), help="document size")
+    parser.add_argument("--copies", type=int, default=8, help="documents copied in the burst scenario")
+    args = parser.parse_args()
+
+    warm_up()
+    documents = [generate(args.size, seed=seed) for seed in range(args.copies)]
+    print(f"{args.copies} documents of {format_size(args.size)}")
+    with contextlib.redirect_stdout(io.StringIO()):  # Listeners log every conversion
+        lines = stall(documents) + burst(documents)
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Compare cold CLI invocations with round-trips to the resident daemon.
+
+Starts a daemon on a temporary socket, then converts the same snippet three
+ways: a fresh ``filter`` process per snippet (interpreter start plus marko
+import), a fresh ``client`` process per snippet (interpreter start only, the
+daemon converts), and an in-process ``convert_via_daemon`` call (what an
+editor plugin holding a connection pays). Reports p50/p95 latency.
+
+Usage:
+    python benchmarks/bench_daemon.py [--runs N] [--calls N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from chatgpt_clipboard_latex_fixer.daemon import convert_via_daemon, ping, shutdown  # noqa: E402
+
+
+SNIPPET = "So $ a^2 + b^2 = c^2 $ holds.\n\n[\nc = \\sqrt{a^2 + b^2}\n]\n"
+ENV = dict(os.environ, PYTHONPATH=os.path.join(ROOT, "src"))
+CLI = [sys.executable, "-m", "chatgpt_clipboard_latex_fixer.main"]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return statistics.median(samples) * 1000, p95 * 1000
+
+
+def time_calls(func, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def wait_for_daemon(socket_path, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return ping(socket_path, timeout=1.0)
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Daemon did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="process invocations per CLI variant")
+    parser.add_argument("--calls", type=int, default=2000, help="in-process round-trips")
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    daemon = subprocess.Popen(CLI + ["daemon", "--socket", socket_path], env=ENV, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_daemon(socket_path)
+        expected = convert_via_daemon(SNIPPET, socket_path=socket_path)
+
+        def cold_filter():
+            out = subprocess.run(CLI + ["filter"], input=SNIPPET, env=ENV, capture_output=True, text=True).stdout
+            assert out == expected, out
+
+        def cold_client():
+            out = subprocess.run(
+                CLI + ["client", "--socket", socket_path, "--no-fallback"],
+                input=SNIPPET, env=ENV, capture_output=True, text=True,
+            ).stdout
+            assert out == expected, out
+
+        def round_trip():
+            convert_via_daemon(SNIPPET, socket_path=socket_path)
+
+        print(f"snippet: {len(SNIPPET)} chars")
+        for name, func, count in (
+            ("cold CLI (filter)", cold_filter, args.runs),
+            ("CLI client -> daemon", cold_client, args.runs),
+            ("daemon round-trip", round_trip, args.calls),
+        ):
+            p50, p95 = percentiles(time_calls(func, count))
+            print(f"{name:22s} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms")
+    finally:
+        try:
+            shutdown(socket_path, timeout=5.0)
+        except OSError:
+            daemon.terminate()
+        daemon.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
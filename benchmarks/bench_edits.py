@@ -0,0 +1,72 @@
+"""Cost of computing and applying math edits versus re-rendering with marko.
+
+Builds documents of growing size that hold the same few math spans in plain
+prose, plus math-free documents of the same sizes, and times math_edits,
+splice and a full marko conversion. math_edits on math-free text costs one
+prescan; with math it only walks the lines around candidate delimiters, so
+its time should grow far slower than the document.
+
+Usage:
+    python benchmarks/bench_edits.py [--sizes 64KB,1MB,8MB] [--spans N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import CorpusGenerator, format_size, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax  # noqa: E402
+from chatgpt_clipboard_latex_fixer.fast_engine import math_edits, splice  # noqa: E402
+
+MARKO_MAX_SIZE = 1024 * 1024  # Larger documents take too long to re-render for a quick run
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def document(size, spans):
+    """Math-free prose of about size bytes with spans math paragraphs spread evenly"""
+    prose = CorpusGenerator(math_density=0.0, code_ratio=0.0, nesting=0).document(size)
+    blocks = prose.split("\n\n")
+    step = max(1, len(blocks) // (spans + 1))
+    for i in range(spans):
+        blocks.insert((i + 1) * step + i, f"Term {i} is $ x_{i}^2 $ and \\( y_{i} \\) so")
+    return prose, "\n\n".join(blocks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="64KB,1MB,8MB", help="comma-separated document sizes")
+    parser.add_argument("--spans", type=int, default=20, help="math paragraphs per document")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'size':>6s} {'math-free edits':>16s} {'edits':>10s} {'splice':>10s} {'marko':>10s}  edits")
+    for size in [parse_size(size) for size in args.sizes.split(",")]:
+        prose, text = document(size, args.spans)
+        clean, _ = best_of(args.repeat, lambda: math_edits(prose))
+        scan, edits = best_of(args.repeat, lambda: math_edits(text))
+        join, output = best_of(args.repeat, lambda: splice(text, edits))
+        assert output == convert_math_syntax(text, engine="fast", cache=None)
+        if size <= MARKO_MAX_SIZE:
+            marko, _ = best_of(1, lambda: convert_math_syntax(text, cache=None))
+            marko_text = f"{marko * 1000:8.2f}ms"
+        else:
+            marko_text = f"{'-':>10s}"
+        print(f"{format_size(size):>6s} {clean * 1000:14.3f}ms {scan * 1000:8.2f}ms {join * 1000:8.3f}ms "
+              f"{marko_text}  {len(edits)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark per-call overhead of a fresh Markdown() against a reused ConverterEngine.
+
+"before" rebuilds the parser the way markdown_normalize used to on every call,
+"after" goes through the shared default engine. A threaded pass checks that
+concurrent callers get identical output from their per-thread instances.
+
+Usage:
+    python benchmarks/bench_engine.py [--calls N] [--threads N]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from marko import Markdown  # noqa: E402
+from chatgpt_clipboard_latex_fixer.math_parser import MathExtension, default_engine  # noqa: E402
+
+
+SNIPPET = "So $ a^2 + b^2 = c^2 $ holds.\n\n[\nc = \\sqrt{a^2 + b^2}\n]\n"
+
+
+def fresh_markdown_convert(text):
+    """The pre-engine implementation of markdown_normalize"""
+    md = Markdown()
+    md.use(MathExtension)
+    return md.render(md.parse(text))
+
+
+def per_call_us(func, text, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(text)
+    return (time.perf_counter() - start) * 1e6 / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000, help="conversions per measurement")
+    parser.add_argument("--threads", type=int, default=8, help="threads for the concurrency check")
+    args = parser.parse_args()
+
+    expected = fresh_markdown_convert(SNIPPET)
+    default_engine.convert(SNIPPET)  # Build the engine outside the measurement
+
+    before = per_call_us(fresh_markdown_convert, SNIPPET, args.calls)
+    after = per_call_us(default_engine.convert, SNIPPET, args.calls)
+    print(f"snippet: {len(SNIPPET)} chars")
+    print(f"before (new Markdown per call): {before:8.1f} us/call")
+    print(f"after (ConverterEngine):        {after:8.1f} us/call")
+    print(f"overhead removed:               {before - after:8.1f} us/call ({before / after:.1f}x)")
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        outputs = list(pool.map(default_engine.convert, [SNIPPET] * args.calls))
+    mismatches = sum(1 for out in outputs if out != expected)
+    print(f"threaded check: {len(outputs)} conversions on {args.threads} threads, {mismatches} mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Compare the throughput of the marko engine and the fast engine.
+
+Both engines convert the same documents built from the testcases/ answers,
+with no cache, through convert_math_syntax. Reports MB/s per engine.
+
+Usage:
+    python benchmarks/bench_engines.py [--copies N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from chatgpt_clipboard_latex_fixer.common import ENGINES, convert_math_syntax  # noqa: E402
+
+
+def load_document(copies):
+    folder = os.path.join(ROOT, "testcases")
+    parts = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".txt"):
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                parts.append(f.read().rstrip("\n") + "\n\n")
+    return "".join(parts) * copies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=20, help="copies of the testcases/ answers per document")
+    parser.add_argument("--repeat", type=int, default=5, help="conversions per engine, the best is reported")
+    args = parser.parse_args()
+
+    document = load_document(args.copies)
+    megabytes = len(document.encode("utf-8")) / (1024 * 1024)
+    print(f"document: {megabytes:.2f} MiB")
+    results = {}
+    for engine in ENGINES:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            convert_math_syntax(document, engine=engine, cache=None)
+            best = min(best, time.perf_counter() - start)
+        results[engine] = best
+        print(f"{engine:6s} {best:8.3f}s  {megabytes / best:8.2f} MB/s")
+    print(f"speedup: {results['marko'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Cost of recording conversions in the history and of reading one back for undo.
+
+Appends records of a few payload sizes to a fresh history and reports the
+append time while the file fills up and after it has wrapped many times:
+appends must not get slower as the history grows, and reading the latest
+record (what ``undo`` does) must not depend on how many records are kept.
+Payloads above the compression threshold are compressed on append and
+decompressed on read, which dominates both times for large pastes.
+
+Usage:
+    python benchmarks/bench_history.py [--history-size 16MB] [--payloads 1KB,64KB,1MB] [--appends 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import format_size, generate, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax  # noqa: E402
+from chatgpt_clipboard_latex_fixer.history import ConversionHistory  # noqa: E402
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history-size", type=parse_size, default=parse_size("16MB"), help="history file size")
+    parser.add_argument("--payloads", default="1KB,64KB,1MB", help="comma-separated clipboard sizes")
+    parser.add_argument("--appends", type=int, default=2000, help="records appended per payload size")
+    args = parser.parse_args()
+
+    print(f"{format_size(args.history_size)} history")
+    print(f"{'payload':>8s} {'first 10%':>10s} {'last 10%':>10s} {'latest()':>10s} {'kept':>6s}")
+    with tempfile.TemporaryDirectory() as directory:
+        for payload in (parse_size(size) for size in args.payloads.split(",")):
+            original = generate(payload, seed=0)
+            converted = convert_math_syntax(original, cache=None)
+            path = os.path.join(directory, f"history-{payload}.bin")
+            with ConversionHistory(path, size=args.history_size) as history:
+                times = []
+                for _ in range(args.appends):
+                    start = time.perf_counter()
+                    history.append(original, converted)
+                    times.append(time.perf_counter() - start)
+                tenth = max(1, args.appends // 10)
+                reads = []
+                for _ in range(50):
+                    start = time.perf_counter()
+                    history.latest()
+                    reads.append(time.perf_counter() - start)
+                kept = len(history)
+            print(f"{format_size(payload):>8s} {median(times[:tenth]) * 1e6:8.1f}us {median(times[-tenth:]) * 1e6:8.1f}us "
+                  f"{median(reads) * 1e6:8.1f}us {kept:6d}")
+
+
+if __name__ == "__main__":
+    main()
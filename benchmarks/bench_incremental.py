@@ -0,0 +1,61 @@
+"""Benchmark block-level memoization on a growing clipboard text.
+
+Simulates copying a ChatGPT answer while it is still streaming: every event
+holds a longer prefix of the same document. Compares converting each event
+from scratch with converting through a ConversionCache, which re-parses only
+blocks that are new or changed.
+
+Usage:
+    python benchmarks/bench_incremental.py [--events N] [--copies N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from chatgpt_clipboard_latex_fixer.cache import ConversionCache  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import ConversionStats, convert_math_syntax  # noqa: E402
+
+
+def build_document(copies):
+    """A long answer made of the testcases/ answers with math-heavy paragraphs in between"""
+    folder = os.path.join(ROOT, "testcases")
+    parts = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".txt"):
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                parts.append(f.read().rstrip("\n") + "\n\n")
+    filler = "".join(f"Step {i}: we have $ x_{i} = {i} $ and\n\n[\nx_{i}^2 = {i * i}\n]\n\n" for i in range(20))
+    return "".join(parts + [filler]) * copies
+
+
+def run(document, events, cache):
+    stats = ConversionStats()
+    step = max(1, len(document) // events)
+    start = time.perf_counter()
+    for end in range(step, len(document) + step, step):
+        convert_math_syntax(document[:end], cache=cache, stats=stats)
+    return time.perf_counter() - start, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=40, help="clipboard events while the answer grows")
+    parser.add_argument("--copies", type=int, default=3, help="size of the final document")
+    args = parser.parse_args()
+
+    document = build_document(args.copies)
+    print(f"document: {len(document)} chars, {args.events} events")
+    for name, cache in (("no cache", None), ("block cache", ConversionCache())):
+        elapsed, stats = run(document, args.events, cache)
+        print(
+            f"{name:12s} {elapsed:7.3f}s  parsed {stats.blocks_parsed:5d}  "
+            f"reused {stats.blocks_reused:5d}  skipped {stats.blocks_skipped:5d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
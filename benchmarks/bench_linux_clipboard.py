@@ -0,0 +1,107 @@
+"""Benchmark the event-driven X11 listener: idle wakeups and change-to-write-back latency.
+
+Runs headless against any X server, e.g. Xvfb (pass --xvfb to start one).
+A second X connection plays the app the user copies from: it takes the
+CLIPBOARD with a math snippet and serves it, and the time until the listener
+owns the clipboard with the converted text is the change-to-write-back
+latency. Idle wakeups are the listener thread's voluntary context switches
+while nothing happens, next to a 0.5 s polling loop like the macOS listener's.
+
+Usage:
+    python benchmarks/bench_linux_clipboard.py [--xvfb] [--events N] [--idle S]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from chatgpt_clipboard_latex_fixer.linuxclip import X11ClipboardListener  # noqa: E402
+
+
+def context_switches(thread_id):
+    """Voluntary context switches of a thread so far, i.e. how often it woke up"""
+    with open(f"/proc/self/task/{thread_id}/status", "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("voluntary_ctxt_switches:"):
+                return int(line.split()[1])
+    return 0
+
+
+def idle_wakeups(thread, seconds):
+    before = context_switches(thread.native_id)
+    time.sleep(seconds)
+    return (context_switches(thread.native_id) - before) / seconds
+
+
+def start_xvfb():
+    if shutil.which("Xvfb") is None:
+        sys.exit("Xvfb not found; install it or run with DISPLAY set")
+    display = ":97"
+    server = subprocess.Popen(["Xvfb", display, "-nolisten", "tcp"], stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    time.sleep(1.0)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--xvfb", action="store_true", help="start a private Xvfb server")
+    parser.add_argument("--events", type=int, default=50, help="clipboard changes to time")
+    parser.add_argument("--idle", type=float, default=5.0, help="seconds of idle time to watch for wakeups")
+    args = parser.parse_args()
+
+    xvfb = start_xvfb() if args.xvfb else None
+    try:
+        listener = X11ClipboardListener()
+        app = X11ClipboardListener()  # Reused for its selection serving, never started
+        app.on_clipboard_change = lambda content: None
+        listener_thread = threading.Thread(target=listener.start, daemon=True)
+        listener_thread.start()
+        time.sleep(0.5)
+
+        polling = threading.Event()
+
+        def poll_loop():
+            while not polling.is_set():
+                time.sleep(0.5)  # The macOS listener's poll interval
+
+        poll_thread = threading.Thread(target=poll_loop, daemon=True)
+        poll_thread.start()
+        print(f"idle wakeups/s: event-driven {idle_wakeups(listener_thread, args.idle):.2f}, "
+              f"0.5 s polling {idle_wakeups(poll_thread, args.idle):.2f}")
+        polling.set()
+
+        def listener_owns(event):
+            if not app._is_owner_change(event):
+                return False
+            return getattr(event.owner, "id", event.owner) == listener.window.id
+
+        latencies = []
+        for i in range(args.events):
+            start = time.perf_counter()
+            app.set_clipboard_text(f"Event {i}: $ x_{i} = {i} $\n")
+            if app.wait_for(listener_owns, timeout=5.0) is None:
+                print(f"event {i}: no write-back within 5 s")
+                continue
+            latencies.append(time.perf_counter() - start)
+        converted = app.get_clipboard_text()
+        if latencies:
+            latencies.sort()
+            print(f"change-to-write-back: p50 {statistics.median(latencies) * 1000:.2f} ms, "
+                  f"max {latencies[-1] * 1000:.2f} ms over {len(latencies)} events")
+        print(f"clipboard now: {converted!r}")
+        print(f"listener events: {listener.metrics.snapshot()['events']}")
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Report peak conversion memory per MB of input next to the committed memory budget.
+
+Every scenario converts synthetic documents from corpus.py once to warm up,
+then once more under tracemalloc, and divides the peak traced memory by the
+input size in MB (UTF-8); the input text itself is allocated before tracing
+starts and does not count. Each result is shown with its max_mib_per_mb from
+benchmarks/memory_budget.json. tests/test_memory.py runs the same scenarios
+and fails when one exceeds its budget.
+
+Usage:
+    python benchmarks/bench_memory.py [--sizes 256KB,1MB] [--budget PATH]
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import format_size, generate, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax  # noqa: E402
+from chatgpt_clipboard_latex_fixer.math_parser import markdown_normalize  # noqa: E402
+
+
+def inline_heavy(size, seed=0):
+    """Short paragraphs of a few inline formulas each, the worst case for the number of math nodes"""
+    lines = []
+    total = 0
+    i = seed
+    while total < size:
+        line = f"Term {i} is $ x_{{{i}}}^2 + y $ and $ z_{i} $ so [ a_{i} ] holds.\n\n"
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "".join(lines)
+
+
+# name -> (conversion, document builder)
+SCENARIOS = {
+    "convert_math_syntax": (
+        lambda text: convert_math_syntax(text, cache=None),
+        lambda size: generate(size, seed=0),
+    ),
+    "convert_math_syntax[heavy]": (
+        lambda text: convert_math_syntax(text, cache=None),
+        inline_heavy,
+    ),
+    "convert_math_syntax[fast]": (
+        lambda text: convert_math_syntax(text, engine="fast", cache=None),
+        lambda size: generate(size, seed=0),
+    ),
+    "markdown_normalize": (
+        markdown_normalize,
+        lambda size: generate(size, seed=0),
+    ),
+    "markdown_normalize[heavy]": (
+        markdown_normalize,
+        inline_heavy,
+    ),
+}
+
+
+def peak_per_mb(func, text):
+    """Peak traced MiB of one call per MB of input"""
+    func(text)  # Warm-up: builds parsers and fills regex caches outside the measurement
+    tracemalloc.start()
+    try:
+        func(text)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024) / (len(text.encode("utf-8")) / (1024 * 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="256KB,1MB", help="comma-separated document sizes")
+    parser.add_argument(
+        "--budget", default=os.path.join(ROOT, "benchmarks", "memory_budget.json"),
+        help="JSON file with max_mib_per_mb per scenario",
+    )
+    args = parser.parse_args()
+
+    with open(args.budget, "r", encoding="utf-8") as f:
+        budget = json.load(f)
+
+    for name, (func, build) in SCENARIOS.items():
+        max_ratio = budget.get(name, {}).get("max_mib_per_mb")
+        for size in [parse_size(size) for size in args.sizes.split(",")]:
+            ratio = peak_per_mb(func, build(size))
+            budget_text = f"{max_ratio:5.1f}" if max_ratio is not None else " none"
+            print(f"{name:28s} {format_size(size):>6s}  {ratio:6.2f} MiB/MB  budget {budget_text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Scaling of single-document conversion across 1 to N worker processes.
+
+Converts one large synthetic document with convert_math_syntax(workers=n)
+for n = 1 .. N on a pre-warmed pool, checks that every result is identical
+to the serial conversion, and reports speedup and parallel efficiency. The
+serial boundary scan (split_blocks) is timed separately, since it bounds the
+achievable speedup.
+
+Usage:
+    python benchmarks/bench_parallel.py [--size 8MB] [--max-workers N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import format_size, generate, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer import parallel  # noqa: E402
+from chatgpt_clipboard_latex_fixer.blocks import split_blocks  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax, warm_up  # noqa: E402
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=parse_size, default=parse_size("8MB"), help="document size")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="largest pool to try")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per worker count (best is reported)")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    args = parser.parse_args()
+
+    text = generate(args.size, seed=args.seed)
+    warm_up()
+    scan, blocks = best_of(args.repeat, lambda: split_blocks(text))
+    serial, expected = best_of(args.repeat, lambda: convert_math_syntax(text, cache=None))
+    print(f"{format_size(args.size)} document, {len(blocks)} blocks, boundary scan {scan * 1000:.1f} ms "
+          f"({scan / serial:.1%} of serial conversion)")
+    print(f"serial      {serial:8.3f} s")
+
+    failures = 0
+    for workers in range(1 if args.max_workers == 1 else 2, args.max_workers + 1):
+        parallel.prewarm(workers)
+        elapsed, output = best_of(args.repeat, lambda: convert_math_syntax(text, cache=None, workers=workers))
+        identical = output == expected
+        failures += not identical
+        speedup = serial / elapsed
+        print(f"{workers:2d} workers  {elapsed:8.3f} s  speedup {speedup:5.2f}x  "
+              f"efficiency {speedup / workers:6.1%}  {'identical' if identical else 'MISMATCH'}")
+    parallel.shutdown()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
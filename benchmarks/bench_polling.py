@@ -0,0 +1,92 @@
+"""Compare fixed-interval and adaptive clipboard polling on the in-memory fake backend.
+
+A simulated user copies math in bursts (a few copies a couple of seconds
+apart, then an idle gap; gaps are jittered with a fixed seed). For each
+scheduler the benchmark reports the latency from a copy to the listener's
+write-back, polls per second over the whole run and once the listener has
+been idle for a while, and full clipboard reads, which should equal the number
+of copies: polls that see no change, and the listener's own write-back, must
+not fetch the clipboard content.
+
+Usage:
+    python benchmarks/bench_polling.py [--bursts N] [--burst-size N] [--burst-gap S] [--idle-gap S]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from chatgpt_clipboard_latex_fixer.common import warm_up  # noqa: E402
+from chatgpt_clipboard_latex_fixer.fakeclip import FakeClipboard, FakeClipboardListener  # noqa: E402
+from chatgpt_clipboard_latex_fixer.scheduler import PollScheduler  # noqa: E402
+
+
+SCHEDULERS = {
+    "fixed 0.5 s": lambda: PollScheduler(floor=0.5, ceiling=0.5),
+    "adaptive": PollScheduler,
+}
+
+
+def simulate(scheduler, bursts, burst_size, burst_gap, idle_gap):
+    clipboard = FakeClipboard()
+    listener = FakeClipboardListener(clipboard, scheduler)
+    thread = threading.Thread(target=listener.start, daemon=True)
+    latencies = []
+    rng = random.Random(0)  # Jitter, so copies do not line up with a fixed poll phase
+    with contextlib.redirect_stdout(io.StringIO()):  # Listeners log every conversion
+        thread.start()
+        started = time.perf_counter()
+        for burst in range(bursts):
+            time.sleep(idle_gap * rng.uniform(0.5, 1.5))
+            for i in range(burst_size):
+                if i:
+                    time.sleep(burst_gap * rng.uniform(0.5, 1.5))
+                writes = clipboard.writes
+                start = time.perf_counter()
+                clipboard.copy(f"Copy {burst}.{i}: $ x_{i} = {burst} $\n")
+                while clipboard.writes < writes + 2:  # Our copy, then the listener's write-back
+                    time.sleep(0.0005)
+                latencies.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+        polls = listener.metrics.histograms["sleep"].count
+        time.sleep(idle_gap / 2)
+        idle_polls = listener.metrics.histograms["sleep"].count
+        time.sleep(idle_gap / 2)
+        idle_polls = listener.metrics.histograms["sleep"].count - idle_polls
+        listener.stop()
+        thread.join()
+    return latencies, polls / elapsed, idle_polls / (idle_gap / 2), clipboard.reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bursts", type=int, default=3, help="bursts of copies")
+    parser.add_argument("--burst-size", type=int, default=4, help="copies per burst")
+    parser.add_argument("--burst-gap", type=float, default=1.5, help="seconds between copies in a burst")
+    parser.add_argument("--idle-gap", type=float, default=20.0, help="idle seconds before each burst")
+    args = parser.parse_args()
+
+    warm_up()
+    copies = args.bursts * args.burst_size
+    for name, make_scheduler in SCHEDULERS.items():
+        latencies, polls_per_s, idle_polls_per_s, reads = simulate(
+            make_scheduler(), args.bursts, args.burst_size, args.burst_gap, args.idle_gap,
+        )
+        latencies.sort()
+        print(
+            f"{name:12s} latency p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+            f"mean {statistics.mean(latencies) * 1000:7.1f} ms  max {latencies[-1] * 1000:7.1f} ms  "
+            f"{polls_per_s:6.2f} polls/s ({idle_polls_per_s:.2f} idle)  {reads} reads for {copies} copies"
+        )
+
+
+if __name__ == "__main__":
+    main()
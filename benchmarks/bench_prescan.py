@@ -0,0 +1,96 @@
+"""Benchmark the delimiter pre-scan fast path of convert_math_syntax.
+
+Builds a mixed clipboard corpus (prose, URLs, code, ChatGPT answers from
+testcases/ and the already-normalized echo of those answers) and compares
+convert_math_syntax, which pre-scans, against always running markdown_normalize.
+
+Usage:
+    python benchmarks/bench_prescan.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax  # noqa: E402
+from chatgpt_clipboard_latex_fixer.math_parser import markdown_normalize  # noqa: E402
+from chatgpt_clipboard_latex_fixer.prescan import needs_conversion  # noqa: E402
+
+
+PROSE = (
+    "The meeting moved to Thursday afternoon. Please bring the quarterly numbers "
+    "and the draft of the onboarding guide, we will go through both sections.\n"
+)
+URL = "https://github.com/bugparty/chatgpt_math_converter_for_mac/issues?q=is%3Aopen+label%3Abug"
+CODE = (
+    "def fib(n):\n"
+    "    a, b = 0, 1\n"
+    "    for _ in range(n):\n"
+    "        a, b = b, a + b\n"
+    "    return a\n"
+)
+SHELL = "find . -name '*.py' | xargs wc -l | sort -n | tail -5\n"
+ANSWER = (
+    "The rest energy is $ E = mc^2 $, and for a moving body\n\n"
+    "[\nE^2 = (pc)^2 + (mc^2)^2\n]\n\n"
+    "so with $p = 0$ we recover the first formula.\n"
+)
+
+
+def load_testcases():
+    """Read the ChatGPT answers shipped in testcases/"""
+    folder = os.path.join(ROOT, "testcases")
+    texts = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".txt"):
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                texts.append(f.read())
+    return texts
+
+
+def build_corpus():
+    """Mix of typical clipboard contents, roughly 3 math-free copies per math answer"""
+    answers = load_testcases() + [ANSWER]
+    echoes = [markdown_normalize(text) for text in answers]
+    corpus = []
+    for answer, echo in zip(answers, echoes):
+        corpus += [PROSE * 3, URL, CODE, SHELL, PROSE * 20, CODE * 10, answer, echo]
+    return corpus
+
+
+def time_calls(func, corpus, repeat):
+    """Total seconds spent calling func on every corpus entry, repeat times"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus:
+            func(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the corpus")
+    args = parser.parse_args()
+
+    corpus = build_corpus()
+    skipped = sum(1 for text in corpus if not needs_conversion(text))
+    total_bytes = sum(len(text.encode("utf-8")) for text in corpus)
+
+    baseline = time_calls(markdown_normalize, corpus, args.repeat)
+    fast = time_calls(convert_math_syntax, corpus, args.repeat)
+    scan_only = time_calls(needs_conversion, corpus, args.repeat)
+
+    calls = len(corpus) * args.repeat
+    print(f"corpus: {len(corpus)} texts, {total_bytes / 1024:.1f} KiB")
+    print(f"skip rate: {skipped}/{len(corpus)} ({100.0 * skipped / len(corpus):.1f}%)")
+    print(f"markdown_normalize always: {baseline * 1e6 / calls:10.1f} us/call")
+    print(f"convert_math_syntax:       {fast * 1e6 / calls:10.1f} us/call")
+    print(f"pre-scan alone:            {scan_only * 1e6 / calls:10.1f} us/call")
+    print(f"time saved: {100.0 * (baseline - fast) / baseline:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
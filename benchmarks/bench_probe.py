@@ -0,0 +1,107 @@
+"""Time the clipboard probe that runs before the listener fetches any text.
+
+Notifications are delivered the way the event-driven backends do, by calling
+read_clipboard() on the fake clipboard backend, for four kinds of change:
+
+* echo: the listener's own write-back of a converted document
+* image: a non-text item, e.g. a copied screenshot
+* recopy: the user copies the already converted text again
+* new: a document with math that was not seen before
+
+Each runs with the fake backend's probe (change count, text on offer, size)
+and with a probe that knows nothing, so every notification fetches the
+text, and reports the median time and the number of fetches.
+tests/test_probe.py checks that echoes and images are skipped without a
+fetch, that recopied text is recognised by its fingerprint and that new
+text comes through.
+
+Usage:
+    python benchmarks/bench_probe.py [--size 1MB] [--repeat 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import format_size, generate, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.base_clipboard_listener import ClipboardProbe  # noqa: E402
+from chatgpt_clipboard_latex_fixer.fakeclip import FakeClipboard, FakeClipboardListener  # noqa: E402
+
+
+class FullReadListener(FakeClipboardListener):
+    """A backend without metadata: every notification fetches the text"""
+
+    def probe_clipboard(self):
+        return ClipboardProbe(None, True, None)
+
+
+KINDS = {"probe": FakeClipboardListener, "full read": FullReadListener}
+
+
+def make_listener(kind, document):
+    """A listener that has converted document and written it back, as after a copy of it"""
+    listener = kind(FakeClipboard())
+    listener.cache = None
+    listener.conversion_budget = None
+    listener.convert_in_background = False
+    listener.clipboard.copy(document)
+    with contextlib.redirect_stdout(io.StringIO()):
+        listener.convert_and_write_back(listener.read_clipboard())
+    return listener
+
+
+def scenario(listener, name, converted, fresh):
+    """Make the change called name and deliver its notification; return (seconds, fetches)"""
+    clipboard = listener.clipboard
+    if name == "image":
+        clipboard.copy_data(bytes(len(converted)))
+    elif name == "recopy":
+        clipboard.copy(converted)
+    elif name == "new":
+        clipboard.copy(fresh)
+    # "echo": the write-back is still on the clipboard, only the notification is delivered
+    reads = clipboard.reads
+    start = time.perf_counter()
+    listener.read_clipboard()
+    return time.perf_counter() - start, clipboard.reads - reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=parse_size, default=parse_size("1MB"), help="clipboard text size")
+    parser.add_argument("--repeat", type=int, default=20, help="notifications timed per case (median is reported)")
+    args = parser.parse_args()
+
+    document = generate(args.size, seed=0)
+    fresh = generate(args.size, seed=1)
+    print(f"{format_size(args.size)} clipboard text, median of {args.repeat} notifications")
+    print(f"{'change':8s} {'probe':10s} {'read_clipboard':>14s} {'fetches':>8s}")
+    for name in ("echo", "image", "recopy", "new"):
+        cases = {label: make_listener(kind, document) for label, kind in KINDS.items()}
+        times = {label: [] for label in cases}
+        fetches = dict.fromkeys(cases, 0)
+        # Interleaved, so both listeners run with the allocator in the same state
+        for _ in range(args.repeat):
+            for label, listener in cases.items():
+                converted = listener.clipboard.text if name != "image" else document
+                if name == "echo":
+                    listener.clipboard.copy(converted)  # A new write-back of ours
+                    listener.written_change_count = listener.clipboard.change_count
+                elif name == "new":
+                    listener.last_processed_fingerprint = None  # Not seen before, every time
+                seconds, reads = scenario(listener, name, converted, fresh)
+                times[label].append(seconds)
+                fetches[label] += reads
+        for label in cases:
+            print(f"{name:8s} {label:10s} {statistics.median(times[label]) * 1000:12.3f}ms {fetches[label]:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Cost of rule profiles: first use versus switching between compiled profiles.
+
+Converts the same document with a few profiles. The first conversion with a
+profile compiles it (patterns, marko parser and renderer classes); after
+that, alternating between the profiles should cost the same as converting
+with the default engine, since compile_profile answers from its cache.
+
+Usage:
+    python benchmarks/bench_profiles.py [--size 16KB] [--rounds 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import format_size, generate, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax  # noqa: E402
+from chatgpt_clipboard_latex_fixer.profiles import compile_profile  # noqa: E402
+
+PROFILES = {
+    "default": {},
+    "no-bare-brackets": {"bare_brackets": False},
+    "environments": {"environments": ["equation", "align", "align*"]},
+    "latex-output": {"display": "\\[", "inline": "\\("},
+}
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=parse_size, default=parse_size("16KB"), help="document size")
+    parser.add_argument("--rounds", type=int, default=20, help="rounds of switching through all profiles")
+    args = parser.parse_args()
+
+    text = generate(args.size, seed=0)
+    first = {}
+    for name, profile in PROFILES.items():
+        first[name] = timed(lambda: convert_math_syntax(text, engine=compile_profile(profile), cache=None))
+
+    switching = dict.fromkeys(PROFILES, float("inf"))
+    for _ in range(args.rounds):
+        for name, profile in PROFILES.items():
+            elapsed = timed(lambda: convert_math_syntax(text, engine=compile_profile(profile), cache=None))
+            switching[name] = min(switching[name], elapsed)
+    lookup = min(timed(lambda: compile_profile(PROFILES["environments"])) for _ in range(args.rounds))
+
+    print(f"{format_size(args.size)} document, best of {args.rounds} rounds of switching")
+    print(f"{'profile':18s} {'first use':>10s} {'switched':>10s}")
+    for name in PROFILES:
+        print(f"{name:18s} {first[name] * 1000:8.2f}ms {switching[name] * 1000:8.2f}ms")
+    print(f"compile_profile lookup of a compiled profile: {lookup * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Check package import time against the committed startup budget.
+
+Every scenario runs in a fresh interpreter under ``python -X importtime``. Its
+cost is the cumulative import time of the top-level imports it adds on top of
+a bare interpreter, taking the best of several runs to dampen noise. A
+scenario fails when it exceeds its budget in benchmarks/startup_budget.json,
+or when it imports a module the budget forbids (marko for anything that has
+not converted math yet, the platform backends before the listener starts).
+
+The absolute budgets leave room for a slow or busy machine. A scenario can
+also be held to a fraction of another one measured in the same run
+(``max_ratio`` of ``relative_to``), which catches a heavy import however
+fast the machine is: converting plain text must stay well below the cost of
+converting math, which imports marko. tests/test_startup.py runs the same
+check. Exits with status 1 on any failure.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N] [--budget PATH]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "import": "import chatgpt_clipboard_latex_fixer",
+    "plain_text": (
+        "import chatgpt_clipboard_latex_fixer as p\n"
+        "p.convert_math_syntax('No math in this copied text.')"
+    ),
+    "cli_parser": "from chatgpt_clipboard_latex_fixer.main import build_parser\nbuild_parser()",
+    "convert_math": (
+        "import chatgpt_clipboard_latex_fixer as p\n"
+        "p.convert_math_syntax('So $ x $ holds.')"
+    ),
+}
+
+
+def import_times(code):
+    """Return {module: cumulative microseconds} for the top-level imports of one run"""
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, "src"))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        if name.startswith("  "):
+            times.setdefault("", set()).add(name.strip())  # Nested import
+            continue
+        times[name.strip()] = int(cumulative)
+    nested = times.pop("", set())
+    return times, nested
+
+
+def measure(code, baseline, runs):
+    """Best total in ms of the top-level imports missing from baseline, and every module imported"""
+    best = None
+    modules = set()
+    for _ in range(runs):
+        times, nested = import_times(code)
+        total = sum(us for name, us in times.items() if name not in baseline) / 1000
+        best = total if best is None else min(best, total)
+        modules |= set(times) | nested
+    return best, modules
+
+
+def check(budget, runs):
+    """
+    Measure every scenario and compare it with budget.
+
+    Returns:
+        dict: {scenario: (ms, problems)}, problems being a list of failure descriptions
+    """
+    baseline = set(import_times("pass")[0])
+    import_times(SCENARIOS["convert_math"])  # Compile the bytecode cache outside the measurement
+    measured = {name: measure(code, baseline, runs) for name, code in SCENARIOS.items()}
+
+    results = {}
+    for name, (ms, modules) in measured.items():
+        limits = budget.get(name, {})
+        max_ms = limits.get("max_ms")
+        problems = []
+        if max_ms is not None and ms > max_ms:
+            problems.append(f"over budget of {max_ms:.1f} ms")
+        if "relative_to" in limits:
+            reference = measured[limits["relative_to"]][0]
+            if ms > limits["max_ratio"] * reference:
+                problems.append(f"over {limits['max_ratio']:.0%} of {limits['relative_to']} ({reference:.1f} ms)")
+        forbidden = sorted(m for m in limits.get("forbidden", []) if m in modules)
+        if forbidden:
+            problems.append(f"imports {', '.join(forbidden)}")
+        results[name] = (ms, problems)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7, help="interpreter runs per scenario, the best is kept")
+    parser.add_argument(
+        "--budget", default=os.path.join(ROOT, "benchmarks", "startup_budget.json"),
+        help="JSON file with max_ms and forbidden modules per scenario",
+    )
+    args = parser.parse_args()
+
+    with open(args.budget, "r", encoding="utf-8") as f:
+        budget = json.load(f)
+    failures = 0
+    for name, (ms, problems) in check(budget, args.runs).items():
+        max_ms = budget.get(name, {}).get("max_ms")
+        failures += bool(problems)
+        budget_text = f"{max_ms:6.1f} ms" if max_ms is not None else "     none"
+        print(f"{name:14s} {ms:7.1f} ms  budget {budget_text}  {'FAIL: ' + '; '.join(problems) if problems else 'ok'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Compare peak memory of convert_math_syntax and convert_stream on a large document.
+
+The document is produced line by line from the testcases/ answers, so the
+streaming run never holds the whole input; the whole-document run joins it
+first. Peak memory is measured with tracemalloc.
+
+Usage:
+    python benchmarks/bench_stream.py [--copies N]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax, convert_stream  # noqa: E402
+
+
+def load_answers():
+    folder = os.path.join(ROOT, "testcases")
+    answers = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".txt"):
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                answers.append(f.read().rstrip("\n") + "\n\n")
+    return answers
+
+
+def generate_lines(answers, copies):
+    """Yield the lines of copies of every answer, without building the document"""
+    for _ in range(copies):
+        for answer in answers:
+            yield from answer.splitlines(keepends=True)
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=200, help="copies of the testcases/ answers")
+    args = parser.parse_args()
+    answers = load_answers()
+
+    def whole():
+        text = "".join(generate_lines(answers, args.copies))
+        return len(convert_math_syntax(text, cache=None))
+
+    def streamed():
+        return sum(len(block) for block in convert_stream(generate_lines(answers, args.copies)))
+
+    input_size = sum(len(answer.encode("utf-8")) for answer in answers) * args.copies
+    print(f"input: {input_size / (1024 * 1024):.1f} MiB")
+    for name, func in (("convert_math_syntax", whole), ("convert_stream", streamed)):
+        size, elapsed, peak = measure(func)
+        print(f"{name:20s} {elapsed:7.2f}s  peak {peak / (1024 * 1024):8.1f} MiB  output {size} chars")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Synthetic ChatGPT-style Markdown documents for benchmarks.
+
+Documents are built from blocks similar to what ChatGPT produces: prose with
+inline math, display math in the different delimiter styles, lists and block
+quotes nested to a given depth, and fenced code. Generation is deterministic
+for a given seed, so two benchmark runs measure the same input.
+
+Usage:
+    python benchmarks/corpus.py SIZE [--math-density F] [--code-ratio F] [--nesting N] [--seed N] [-o PATH]
+
+SIZE accepts a byte count with an optional KB/MB suffix, e.g. 64KB or 50MB.
+"""
+import argparse
+import random
+import re
+import sys
+
+
+# Delimiter styles and their default weights
+STYLES = {
+    "dollar": 4,          # $ x $
+    "paren": 1,           # \( x \)
+    "bracket_block": 3,   # [ on its own line ... ]
+    "backslash_block": 1, # \[ ... \] after prose
+    "inline_block": 1,    # prose then [ / formula / ] inside a paragraph
+}
+
+FORMULAS = [
+    "x", "a^2 + b^2 = c^2", "\\frac{1}{2}", "E = mc^2", "\\sum_{i=1}^{n} i = \\frac{n(n+1)}{2}",
+    "\\int_0^1 x^2 \\, dx", "\\alpha + \\beta", "f(x) = \\sqrt{x}", "\\lim_{n \\to \\infty} (1 + 1/n)^n",
+    "P(A \\mid B)", "\\nabla \\cdot \\mathbf{E} = \\rho / \\varepsilon_0",
+]
+WORDS = (
+    "the of and to in is that we for with as this by so value result term then hence where "
+    "function series limit sum equation integral derivative proof case step holds gives"
+).split()
+CODE_LINES = [
+    "def f(x):", "    return x ** 2", "print(f(3))  # $ not math $", "for i in range(10):",
+    "    total += i", "x = [1, 2, 3]",
+]
+
+_SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kKmM]?)[bB]?\s*$')
+
+
+def parse_size(text):
+    """Turn "1KB", "50MB" or "4096" into a byte count"""
+    match = _SIZE_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid size '{text}', expected e.g. 4096, 64KB or 50MB")
+    number, unit = float(match.group(1)), match.group(2).lower()
+    return int(number * {"": 1, "k": 1024, "m": 1024 * 1024}[unit])
+
+
+def format_size(size):
+    """Inverse of parse_size for labels"""
+    for unit, factor in (("MB", 1024 * 1024), ("KB", 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
+
+
+class CorpusGenerator:
+    """Deterministic generator of synthetic documents"""
+
+    def __init__(self, math_density=0.5, styles=None, nesting=2, code_ratio=0.1, seed=0):
+        """
+        Args:
+            math_density (float): Fraction of blocks that contain math, 0 to 1
+            styles (dict): Weight per delimiter style in STYLES, defaults to STYLES
+            nesting (int): Maximum list/quote nesting depth
+            code_ratio (float): Fraction of blocks that are fenced code, 0 to 1
+            seed (int): Random seed
+        """
+        self.math_density = math_density
+        self.styles = dict(styles or STYLES)
+        self.nesting = nesting
+        self.code_ratio = code_ratio
+        self.rng = random.Random(seed)
+
+    def _words(self, low=4, high=14):
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(low, high)))
+
+    def _style(self):
+        names = list(self.styles)
+        return self.rng.choices(names, weights=[self.styles[name] for name in names])[0]
+
+    def _math_block(self):
+        formula = self.rng.choice(FORMULAS)
+        style = self._style()
+        prose = self._words()
+        if style == "dollar":
+            return f"{prose} $ {formula} $ {self._words(2, 6)}."
+        if style == "paren":
+            return f"{prose} \\({formula}\\) {self._words(2, 6)}."
+        if style == "bracket_block":
+            return f"{prose}:\n\n[\n{formula}\n]"
+        if style == "backslash_block":
+            return f"{prose} \\[\n{formula}\n\\]"
+        return f"{prose}\n[\n{formula}\n]\n{self._words(2, 6)}."
+
+    def _nested(self, block):
+        """Wrap the lines of block in list items or block quotes, up to self.nesting deep"""
+        depth = self.rng.randint(0, self.nesting)
+        for _ in range(depth):
+            if self.rng.random() < 0.5:
+                lines = block.split("\n")
+                block = "\n".join(["- " + lines[0]] + ["  " + line if line else line for line in lines[1:]])
+            else:
+                block = "\n".join("> " + line if line else ">" for line in block.split("\n"))
+        return block
+
+    def block(self):
+        """One top-level block"""
+        roll = self.rng.random()
+        if roll < self.code_ratio:
+            lines = self.rng.sample(CODE_LINES, self.rng.randint(2, len(CODE_LINES)))
+            return "```python\n" + "\n".join(lines) + "\n```"
+        if roll < self.code_ratio + (1 - self.code_ratio) * self.math_density:
+            return self._nested(self._math_block())
+        if self.rng.random() < 0.2:
+            return f"{'#' * self.rng.randint(2, 3)} {self._words(2, 5).capitalize()}"
+        return self._nested(self._words(10, 40).capitalize() + ".")
+
+    def document(self, size):
+        """A document of about size bytes (UTF-8), never shorter"""
+        parts = []
+        total = 0
+        while total < size:
+            block = self.block() + "\n\n"
+            parts.append(block)
+            total += len(block.encode("utf-8"))
+        return "".join(parts)
+
+
+def generate(size, **options):
+    """Shortcut for CorpusGenerator(**options).document(size)"""
+    return CorpusGenerator(**options).document(size)
+
+
+# Inputs built to trigger backtracking or rescanning in delimiter matching: name -> (head, unit, tail),
+# with unit repeated to fill the size. Log dumps and shell snippets on the clipboard look like these.
+ADVERSARIAL = {
+    "open_parens": ("", "\\( a ", "\n"),                 # \( without \) on one long line
+    "open_brackets": ("", "\\[ a ", "\n"),               # \[ without \] on one long line
+    "dollar_run": ("", "$", "\n"),                       # $$$$...
+    "dollar_spaces": ("$ x", " ", "y\n"),                # one $ then a huge whitespace run and no closing $
+    "dollar_lines": ("", "$ a b c d e f g h\n", ""),     # unclosed $ on every line
+    "deep_parens": ("\\( x \\) ", "(", "\n"),            # ((((... never closed
+    "nested_parens": ("\\( x \\) ", "(a", "\n"),         # (a(a(a... never closed
+    "open_block_lines": ("", "[\n", ""),                 # [ line after [ line, never closed
+    "backticks": ("\\( x \\) ", "``a ", "\n"),           # code span openers without a closer
+    "open_links": ("[\n", "[a ", "\n"),                  # link openers without a closer, after a [ line
+    "emphasis": ("\\( x \\) ", "*a _b ", "\n"),          # unclosed emphasis next to math
+    "shell_log": ("", "$ echo $HOME (pid $$) [ok] \\(x $PATH\n", ""),
+}
+
+
+def adversarial(kind, size):
+    """A document of about size characters of the given ADVERSARIAL kind"""
+    head, unit, tail = ADVERSARIAL[kind]
+    return head + unit * max(1, (size - len(head) - len(tail)) // len(unit)) + tail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("size", type=parse_size, help="document size, e.g. 1KB, 64KB, 50MB")
+    parser.add_argument("--math-density", type=float, default=0.5, help="fraction of blocks with math")
+    parser.add_argument("--code-ratio", type=float, default=0.1, help="fraction of fenced code blocks")
+    parser.add_argument("--nesting", type=int, default=2, help="maximum list/quote nesting depth")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("-o", "--output", help="write here instead of stdout")
+    args = parser.parse_args()
+
+    text = generate(
+        args.size, math_density=args.math_density, code_ratio=args.code_ratio, nesting=args.nesting, seed=args.seed,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
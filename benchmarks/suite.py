@@ -0,0 +1,188 @@
+"""Benchmark suite: conversion latency, throughput and peak memory, with regression reports.
+
+``run`` converts synthetic documents from corpus.py with every target
+(convert_math_syntax with the marko and the fast engine, markdown_normalize
+and convert_math_syntax_legacy) and writes p50/p95/p99 latency, throughput
+and tracemalloc peak memory per target and size to a JSON file. The result
+cache is disabled so every call does the full work. ``compare`` reads two
+such files and flags cases whose p50 latency or peak memory grew by more than
+a threshold; it exits with status 1 if any did.
+
+Usage:
+    python benchmarks/suite.py run [--sizes 1KB,64KB,1MB,50MB] [--repeat N] [--max-seconds S] [-o PATH]
+    python benchmarks/suite.py compare BASELINE.json CURRENT.json [--threshold 0.10]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from corpus import format_size, generate, parse_size  # noqa: E402
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax, convert_math_syntax_legacy  # noqa: E402
+from chatgpt_clipboard_latex_fixer.math_parser import markdown_normalize  # noqa: E402
+
+
+TARGETS = {
+    "convert_math_syntax": lambda text: convert_math_syntax(text, cache=None),
+    "convert_math_syntax[fast]": lambda text: convert_math_syntax(text, engine="fast", cache=None),
+    "markdown_normalize": markdown_normalize,
+    "convert_math_syntax_legacy": convert_math_syntax_legacy,
+}
+DEFAULT_SIZES = "1KB,16KB,256KB,1MB"
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    index = max(0, min(len(sorted_samples) - 1, int(round(fraction * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[index]
+
+
+def measure(func, text, repeat, max_seconds):
+    """Latencies of up to repeat calls, stopping early once max_seconds are spent (at least one call)"""
+    func(text)  # Warm-up: builds parsers and fills regex caches
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        samples.append(time.perf_counter() - start)
+        if time.perf_counter() > deadline:
+            break
+    return sorted(samples)
+
+
+def peak_memory(func, text):
+    """Peak memory allocated by one call, measured separately since tracemalloc slows everything down"""
+    tracemalloc.start()  # Starts with a peak of zero; no reset_peak, which needs Python 3.9
+    try:
+        func(text)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    targets = args.targets.split(",") if args.targets else list(TARGETS)
+    unknown = [name for name in targets if name not in TARGETS]
+    if unknown:
+        print(f"Unknown targets: {', '.join(unknown)}; available: {', '.join(TARGETS)}")
+        return 2
+
+    results = []
+    for size in sizes:
+        text = generate(size, math_density=args.math_density, code_ratio=args.code_ratio, seed=args.seed)
+        nbytes = len(text.encode("utf-8"))
+        for name in targets:
+            func = TARGETS[name]
+            samples = measure(func, text, args.repeat, args.max_seconds)
+            peak = peak_memory(func, text) if not args.no_memory else None
+            p50 = percentile(samples, 0.50)
+            result = {
+                "target": name,
+                "size": format_size(size),
+                "bytes": nbytes,
+                "runs": len(samples),
+                "p50_ms": p50 * 1000,
+                "p95_ms": percentile(samples, 0.95) * 1000,
+                "p99_ms": percentile(samples, 0.99) * 1000,
+                "mb_per_s": nbytes / (1024 * 1024) / p50 if p50 > 0 else None,
+                "peak_mib": peak / (1024 * 1024) if peak is not None else None,
+            }
+            results.append(result)
+            peak_text = f"{result['peak_mib']:9.2f} MiB" if peak is not None else "        -    "
+            print(
+                f"{name:28s} {result['size']:>6s}  p50 {result['p50_ms']:10.3f} ms  p95 {result['p95_ms']:10.3f} ms  "
+                f"p99 {result['p99_ms']:10.3f} ms  {result['mb_per_s']:8.2f} MB/s  peak {peak_text}"
+            )
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "math_density": args.math_density,
+            "code_ratio": args.code_ratio,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+def compare(args):
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = {(r["target"], r["size"]): r for r in json.load(f)["results"]}
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    for result in current:
+        base = baseline.get((result["target"], result["size"]))
+        if base is None:
+            continue
+        problems = []
+        for metric in ("p50_ms", "peak_mib"):
+            old, new = base.get(metric), result.get(metric)
+            if old and new is not None:
+                change = new / old - 1
+                if change > args.threshold:
+                    problems.append(f"{metric} {old:.3f} -> {new:.3f} (+{change:.0%})")
+        latency_change = result["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+        status = "REGRESSION: " + "; ".join(problems) if problems else "ok"
+        regressions += bool(problems)
+        print(f"{result['target']:28s} {result['size']:>6s}  p50 {latency_change:+7.1%}  {status}")
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="measure and optionally write JSON results")
+    run_parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated sizes (default: {DEFAULT_SIZES})")
+    run_parser.add_argument("--targets", help=f"comma-separated subset of: {', '.join(TARGETS)}")
+    run_parser.add_argument("--repeat", type=int, default=50, help="maximum timed calls per case")
+    run_parser.add_argument("--max-seconds", type=float, default=5.0, help="time budget per case")
+    run_parser.add_argument("--math-density", type=float, default=0.5, help="fraction of blocks with math")
+    run_parser.add_argument("--code-ratio", type=float, default=0.1, help="fraction of fenced code blocks")
+    run_parser.add_argument("--seed", type=int, default=0, help="corpus seed")
+    run_parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    run_parser.add_argument("-o", "--output", help="JSON file for the results")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="flag regressions between two result files")
+    compare_parser.add_argument("baseline", help="results of the reference run")
+    compare_parser.add_argument("current", help="results to check")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative growth (default: 0.10)")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
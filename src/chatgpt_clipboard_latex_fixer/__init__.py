@@ -2,10 +2,41 @@
 
 __version__ = "0.1.0"
 
-from .common import convert_math_syntax
-from .clipboard_factory import create_clipboard_listener
+# Public names and the submodule defining each. They are imported on first
+# access (PEP 562) so that importing the package, e.g. for __version__ or the
+# listener factory, does not load marko or a platform backend.
+_LAZY_EXPORTS = {
+    "convert_math_syntax": ".common",
+    "convert_stream": ".common",
+    "ConversionStats": ".common",
+    "aconvert": ".aio",
+    "aconvert_many": ".aio",
+    "AsyncConverter": ".aio",
+    "math_edits": ".fast_engine",
+    "splice": ".fast_engine",
+    "ConverterEngine": ".math_parser",
+    "MathExtension": ".math_parser",
+    "compile_profile": ".profiles",
+    "load_profile": ".profiles",
+    "ConversionCache": ".cache",
+    "ConversionHistory": ".history",
+    "SlowCapture": ".capture",
+    "create_clipboard_listener": ".clipboard_factory",
+}
 
-__all__ = [
-    "convert_math_syntax",
-    "create_clipboard_listener",
-]
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
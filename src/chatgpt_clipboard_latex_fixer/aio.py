@@ -0,0 +1,194 @@
+"""asyncio front end for the converter.
+
+``aconvert`` and ``aconvert_many`` run ``convert_math_syntax`` on an executor
+so the event loop keeps serving other tasks while text converts. An
+``AsyncConverter`` bounds the work it has accepted, both in conversions in
+flight and in characters of text waiting or converting, so a producer that
+submits faster than conversions finish is made to wait instead of queueing
+unbounded amounts of text. Cancelling a waiting call withdraws its text
+before it starts; a conversion that already runs on the executor finishes
+in the background and its result is dropped.
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import default_cache
+from .common import convert_math_syntax
+
+
+def _convert(text, engine, use_cache):
+    """Executor side; a module-level function so it can also be sent to a process pool"""
+    return convert_math_syntax(text, engine=engine, cache=default_cache if use_cache else None)
+
+
+class AsyncConverter:
+    """Bounded asynchronous conversion service for one event loop"""
+
+    def __init__(self, max_in_flight=4, max_queued_bytes=64 * 1024 * 1024, executor=None, engine=None, cache=True):
+        """
+        Args:
+            max_in_flight (int): Conversions running or waiting on the executor at once; with threads,
+                more than a few only add GIL contention for the event loop thread
+            max_queued_bytes (int): Text accepted but not converted yet, counted in characters;
+                a single larger text is still accepted once nothing else is pending
+            executor (Executor): Where conversions run, defaults to a thread pool of max_in_flight
+                threads; a ProcessPoolExecutor converts on several cores
+            engine (str): Engine name passed to convert_math_syntax, defaults to marko
+            cache (bool): Use the shared conversion cache
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queued_bytes = max_queued_bytes
+        self.engine = engine
+        self.cache = cache
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(self.max_in_flight, thread_name_prefix="aconvert")
+        self.in_flight = 0
+        self.queued_bytes = 0
+        self._jobs = set()  # Futures submitted to the executor and not done yet, cancelled by close()
+        self._admission = None  # asyncio.Condition, created in the loop that first uses it
+
+    def _has_room(self, nbytes):
+        if self.in_flight >= self.max_in_flight:
+            return False
+        return self.queued_bytes == 0 or self.queued_bytes + nbytes <= self.max_queued_bytes
+
+    async def _acquire(self, nbytes):
+        if self._admission is None:
+            self._admission = asyncio.Condition()
+        async with self._admission:
+            await self._admission.wait_for(lambda: self._has_room(nbytes))
+            self.in_flight += 1
+            self.queued_bytes += nbytes
+
+    def _release(self, nbytes):
+        async def notify():
+            async with self._admission:
+                self.in_flight -= 1
+                self.queued_bytes -= nbytes
+                self._admission.notify_all()
+
+        return asyncio.ensure_future(notify())
+
+    async def _run(self, text, engine=None):
+        """Convert text on the executor; the caller has acquired room for it"""
+        nbytes = len(text)
+        loop = asyncio.get_running_loop()
+        try:
+            job = self.executor.submit(_convert, text, engine or self.engine, self.cache)
+        except BaseException:
+            self._release(nbytes)
+            raise
+        self._jobs.add(job)
+        job.add_done_callback(self._jobs.discard)
+        # The slot is freed when the executor is done with the text, not when the caller stops waiting
+        job.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, nbytes))
+        try:
+            return await asyncio.wrap_future(job)
+        except asyncio.CancelledError:
+            job.cancel()  # Only succeeds if the conversion has not started
+            raise
+
+    async def convert(self, text, engine=None):
+        """
+        Convert text without blocking the event loop.
+
+        Waits while the converter is at its in-flight or queued-bytes limit.
+
+        Args:
+            text (str): The text to convert
+            engine (str): Engine name for this call, defaults to the converter's
+
+        Returns:
+            str: The converted text
+        """
+        await self._acquire(len(text))
+        return await self._run(text, engine)
+
+    async def convert_many(self, texts, window=None, engine=None):
+        """
+        Convert texts concurrently, yielding results in input order.
+
+        texts is consumed only as fast as the limits allow, so it may be a large
+        (async) generator. Closing the generator early cancels pending conversions.
+
+        Args:
+            texts: Iterable or async iterable of strings
+            window (int): Results converted ahead of the consumer, defaults to 2 * max_in_flight
+            engine (str): Engine name for these texts, defaults to the converter's
+
+        Yields:
+            str: Converted texts
+        """
+        window = window or 2 * self.max_in_flight
+        pending = deque()
+
+        async def each():
+            if hasattr(texts, "__aiter__"):
+                async for text in texts:
+                    yield text
+            else:
+                for text in texts:
+                    yield text
+
+        try:
+            async for text in each():
+                while len(pending) >= window or (pending and pending[0].done()):
+                    yield await pending.popleft()
+                await self._acquire(len(text))
+                pending.append(asyncio.ensure_future(self._run(text, engine)))
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def close(self):
+        """Cancel the conversions that have not started, and shut down the executor if this converter created it"""
+        # By hand rather than with shutdown(cancel_futures=True), which needs Python 3.9
+        for job in list(self._jobs):
+            job.cancel()
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+
+
+_default_converters = {}  # Event loop -> AsyncConverter
+
+
+def _default_converter():
+    loop = asyncio.get_running_loop()
+    converter = _default_converters.get(loop)
+    if converter is None:
+        for other in [other for other in _default_converters if other.is_closed()]:
+            _default_converters.pop(other).close()
+        converter = _default_converters[loop] = AsyncConverter()
+    return converter
+
+
+async def aconvert(text, engine=None):
+    """
+    Asynchronous convert_math_syntax on the event loop's shared AsyncConverter.
+
+    Args:
+        text (str): The text to convert
+        engine (str): Engine name, defaults to marko
+
+    Returns:
+        str: The converted text
+    """
+    return await _default_converter().convert(text, engine)
+
+
+async def aconvert_many(texts, engine=None):
+    """
+    Convert an iterable or async iterable of texts on the event loop's shared AsyncConverter.
+
+    Args:
+        texts: Iterable or async iterable of strings
+        engine (str): Engine name, defaults to marko
+
+    Yields:
+        str: Converted texts, in input order
+    """
+    async for output in _default_converter().convert_many(texts, engine=engine):
+        yield output
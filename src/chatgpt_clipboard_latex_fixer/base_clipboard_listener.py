@@ -1,13 +1,223 @@
+import threading
+import time
 from abc import ABC, abstractmethod
-from .common import convert_math_syntax
+from collections import namedtuple
+from .common import convert_math_syntax, warm_up, ConversionStats
+from .cache import default_cache
+from .metrics import ListenerMetrics
+from .scheduler import PollScheduler
 
+# What a listener can learn about the clipboard without fetching its content:
+# change_count as get_clipboard_change_count (None if the backend has none), has_text False
+# only when no text type is on offer, size the exact text length in characters (None if unknown)
+ClipboardProbe = namedtuple("ClipboardProbe", "change_count has_text size")
 
-class BaseClipboardListener(ABC):
+
+def fingerprint(text):
+    """Identify text by (length, hash), so it can be recognised later without keeping it"""
+    return len(text), hash(text)
+
+
+def matches_fingerprint(text, known):
+    """Whether text has the fingerprint known; texts of another length are told apart without hashing"""
+    return known is not None and len(text) == known[0] and hash(text) == known[1]
+
+
+class ConversionMixin:
+    """
+    Converting clipboard content and writing it back, shared by all listeners.
+
+    BaseClipboardListener inherits it; the macOS listener, which must inherit
+    from NSObject, mixes it in. Hosts call _init_conversion_state() from their
+    initializer and provide set_clipboard_text, get_clipboard_text,
+    get_clipboard_change_count and probe_clipboard.
+    """
+
+    def _init_conversion_state(self):
+        """Set up the attributes convert_and_write_back uses"""
+        self.last_change_count = None  # Clipboard change counter at the last poll, None if the backend has none
+        self.last_processed_fingerprint = None  # Fingerprint of the last processed content, to avoid redundant processing
+        self.written_change_count = None  # Change count right after our last write-back, to recognise its echo
+        self.engine = None  # Converter engine, None for the shared marko engine (imported on first use)
+        self.cache = default_cache  # Shared conversion cache, so content that comes back is not re-converted
+        self.stats = ConversionStats()  # Documents and blocks converted, reused or skipped by this listener
+        self.metrics = ListenerMetrics()  # Per-stage latency histograms and event counters
+        self.scheduler = PollScheduler()  # Poll intervals of backends without change notifications
+        self.conversion_budget = 5.0  # Seconds a conversion may take before it is abandoned, None for no limit
+        self.history = None  # ConversionHistory recording write-backs for the undo command, None to keep none
+        self.capture = None  # SlowCapture keeping inputs of slow conversions for replay, None to keep none
+        self._last_read = (None, None)  # (change count before the read, content read)
+
+    def warm_up_in_background(self):
+        """Build the converter engine on a daemon thread so startup does not wait for it"""
+        threading.Thread(target=warm_up, args=(self.engine,), name="engine-warm-up", daemon=True).start()
+
+    def read_clipboard(self):
+        """
+        Read the clipboard after a change notification, timing it as the read stage.
+
+        The clipboard is probed first, and its content only fetched if it may hold
+        text that is not our own write-back. Content that was processed already is
+        recognised by its fingerprint.
+
+        Returns:
+            str: The clipboard text, or None if it is empty, not text, or was just processed
+        """
+        self.metrics.count("seen")
+        with self.metrics.time("read"):
+            probe = self.probe_clipboard()  # Taken first: a later change makes its change count stale, never wrong
+            if not probe.has_text or probe.size == 0 or (
+                probe.change_count is not None and probe.change_count == self.written_change_count
+            ):
+                content = None
+            else:
+                content = self.get_clipboard_text()
+        if not content or matches_fingerprint(content, self.last_processed_fingerprint):
+            self.metrics.count("skipped")
+            return None
+        if self.history is not None and self.history.is_undone(content):
+            # Put back by the undo command: converting it again would undo the undo
+            self.last_processed_fingerprint = fingerprint(content)
+            self.metrics.count("skipped")
+            return None
+        self._last_read = (probe.change_count, content)
+        return content
+
+    def log(self, message):
+        """Report an event of the listener; the macOS listener sends it to NSLog"""
+        print(message)
+
+    def _is_stale(self, generation):
+        return generation is not None and generation != self._generation
+
+    def clipboard_holds(self, content, source_change_count=None):
+        """
+        Check that the clipboard still holds content, so a write-back does not replace something newer.
+
+        Args:
+            content (str): The content that was converted
+            source_change_count (int): Change count before content was read, if the backend has one
+
+        Returns:
+            bool: True if the clipboard has not changed since content was read
+        """
+        if source_change_count is not None:
+            return self.get_clipboard_change_count() == source_change_count
+        return self.get_clipboard_text() == content
+
+    def record_history(self, content, converted_content):
+        """Append a write-back to self.history; a history that cannot be written never fails the conversion"""
+        if self.history is None:
+            return
+        try:
+            self.history.append(content, converted_content)
+        except (OSError, ValueError) as e:
+            self.log(f"Warning: could not record the conversion in {self.history.path}: {e}")
+
+    def convert_and_write_back(self, content, generation=None, source_change_count=None):
+        """
+        Convert content and write the result to the clipboard.
+
+        The result is dropped if newer content was submitted meanwhile (generation
+        is stale), if the conversion ran out of conversion_budget (it is stopped
+        then, not waited for), or if the clipboard no longer holds content.
+
+        Args:
+            content (str): The clipboard content to process
+            generation (int): Submission generation, None when called synchronously
+            source_change_count (int): Change count before content was read, if known
+        """
+        metrics = self.metrics
+        started = time.perf_counter()
+        parse_before, render_before = self.stats.parse_seconds, self.stats.render_seconds
+        timed_out_before = self.stats.documents_timed_out
+        failed_before = self.stats.blocks_failed
+        convert_seconds = None
+        try:
+            # Use convert_math_syntax to transform the content
+            with metrics.time("convert"):
+                converted_content = convert_math_syntax(
+                    content, engine=self.engine, cache=self.cache, stats=self.stats,
+                    time_budget=self.conversion_budget,
+                )
+            convert_seconds = time.perf_counter() - started
+            if self.stats.parse_seconds > parse_before:
+                metrics.observe("parse", self.stats.parse_seconds - parse_before)
+            if self.stats.render_seconds > render_before:
+                metrics.observe("render", self.stats.render_seconds - render_before)
+            if self.stats.blocks_failed > failed_before:
+                metrics.count("block_fallback", self.stats.blocks_failed - failed_before)
+
+            if self._is_stale(generation):
+                metrics.count("stale")  # Newer content is waiting; its conversion supersedes this one
+                return
+            elapsed = time.perf_counter() - started
+            if self.stats.documents_timed_out > timed_out_before or (
+                self.conversion_budget is not None and elapsed > self.conversion_budget
+            ):
+                self.log(
+                    f"Conversion of {len(content)} chars took {elapsed:.1f}s, "
+                    f"over the {self.conversion_budget:.1f}s budget; not writing back"
+                )
+                metrics.count("over_budget")
+                return
+
+            # If the converted content is the same as the current content, skip writing back to avoid loops
+            if converted_content == content:
+                self.log(f"No math to convert in {len(content)} chars, skipping write-back")
+                self.last_processed_fingerprint = fingerprint(content)
+                metrics.count("skipped")
+                return
+
+            # Write the converted content back to the clipboard, unless the user copied something else meanwhile
+            with metrics.time("write"):
+                if generation is not None and (
+                    self._is_stale(generation) or not self.clipboard_holds(content, source_change_count)
+                ):
+                    metrics.count("stale")
+                    return
+                # Save the processed content, before the write so its notification is recognised
+                previous_fingerprint = self.last_processed_fingerprint
+                self.last_processed_fingerprint = fingerprint(converted_content)
+                written = self.set_clipboard_text(converted_content)
+            if not written:
+                # Nothing was written (e.g. another thread had the clipboard open): no echo to expect, nothing to undo
+                self.last_processed_fingerprint = previous_fingerprint
+                metrics.count("failed")
+                return
+            # Our own write-back bumped the change counter; do not read it back on the next poll or notification
+            self.written_change_count = self.get_clipboard_change_count()
+            self.record_history(content, converted_content)
+            if self.last_change_count is not None:
+                self.last_change_count = self.written_change_count
+        except Exception:
+            metrics.count("failed")
+            raise
+        finally:
+            if self.capture is not None and convert_seconds is not None:
+                # Off this thread and after the budget check, so capturing never changes what is written back
+                self.capture.observe_later(content, self.engine, convert_seconds, self.conversion_budget)
+        metrics.count("converted")
+        # Sizes only: printing whole pastes costs time proportional to their length
+        self.log(f"Converted clipboard content: {len(content)} -> {len(converted_content)} chars")
+
+
+class BaseClipboardListener(ConversionMixin, ABC):
     """Base class for clipboard listeners across different platforms"""
+
+    # Convert on a worker thread so the event loop never waits for a conversion.
+    # Backends whose clipboard handle may only be used from the thread that created it set this to False.
+    convert_in_background = True
     
     def __init__(self):
         """Initialize the base clipboard listener"""
-        self.last_processed_content = None  # Save the last processed content to avoid redundant processing
+        self._init_conversion_state()
+        self.running = True  # Flag to control the poll loop
+        self._slot = threading.Condition()  # Guards the single-slot queue below
+        self._pending = None  # (content, generation, source change count) waiting for the worker
+        self._generation = 0  # Incremented per submitted content; results of older generations are stale
+        self._busy = False  # Whether the worker is converting
+        self._worker = None
     
     @abstractmethod
     def get_clipboard_text(self):
@@ -28,9 +238,39 @@ class BaseClipboardListener(ABC):
         
         Args:
             text (str): The text to set in the clipboard
+
+        Returns:
+            bool: True if the text was written, False if the clipboard could not be set
+        """
+        pass
+
+    def hold_clipboard(self):
+        """
+        Keep text set with set_clipboard_text available until something else is copied.
+        Backends whose clipboard keeps the text after the process exits return at once.
         """
         pass
     
+    def get_clipboard_change_count(self):
+        """
+        Get a counter that increases whenever the clipboard changes.
+        Polled backends override this so unchanged polls skip reading the clipboard.
+
+        Returns:
+            int: The change counter, or None if the backend has none
+        """
+        return None
+
+    def probe_clipboard(self):
+        """
+        Look at the clipboard without fetching its content.
+        Backends override this with what they can learn cheaply, e.g. the types on offer.
+
+        Returns:
+            ClipboardProbe: Change count, whether text may be on offer, and its size if known
+        """
+        return ClipboardProbe(self.get_clipboard_change_count(), True, None)
+
     @abstractmethod
     def start(self):
         """
@@ -39,28 +279,110 @@ class BaseClipboardListener(ABC):
         """
         pass
     
+    def check_clipboard(self):
+        """
+        Poll the clipboard once and process it if it changed.
+
+        Returns:
+            bool: True if the clipboard changed since the last poll
+        """
+        try:
+            change_count = self.get_clipboard_change_count()
+            if change_count is not None:
+                if change_count == self.last_change_count:
+                    return False
+                self.last_change_count = change_count
+            content = self.read_clipboard()
+            if content:
+                self.on_clipboard_change(content)
+            return change_count is not None or content is not None
+        except Exception as e:
+            print(f"Error while checking clipboard: {e}")
+            return False
+
+    def poll(self):
+        """Call check_clipboard until stop(), with intervals from self.scheduler"""
+        if self.last_change_count is None:
+            self.last_change_count = self.get_clipboard_change_count()  # Leave what was copied before start alone
+        while self.running:
+            interval = self.scheduler.record(self.check_clipboard())
+            with self.metrics.time("sleep"):
+                self.scheduler.wait(interval)
+
+    async def poll_async(self):
+        """
+        Variant of poll() that runs as a task in an existing asyncio event loop.
+
+        Conversions run on the listener's worker thread as usual, so the loop only
+        spends the time of a clipboard read per poll. Cancel the task or call stop()
+        to end it.
+        """
+        import asyncio
+
+        if self.last_change_count is None:
+            self.last_change_count = self.get_clipboard_change_count()  # Leave what was copied before start alone
+        while self.running:
+            interval = self.scheduler.record(self.check_clipboard())
+            with self.metrics.time("sleep"):
+                await asyncio.sleep(interval)
+
+    def stop(self):
+        """Make the poll loop return after the current poll"""
+        self.running = False
+        self.scheduler.wake()
+        with self._slot:
+            self._slot.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Wait until the conversion worker has handled all submitted content.
+
+        Returns:
+            bool: True if the worker is idle, False on timeout
+        """
+        with self._slot:
+            return self._slot.wait_for(lambda: self._pending is None and not self._busy, timeout)
+
     def on_clipboard_change(self, content):
         """
         Process the changed clipboard content.
         This method can be overridden by subclasses if needed.
+
+        With convert_in_background, the content is handed to the conversion worker
+        and this returns at once. The queue holds a single item: content still waiting
+        is replaced, since only the latest copy matters.
         
         Args:
             content (str): The clipboard content to process
         """
-        # Use convert_math_syntax to transform the content
-        converted_content = convert_math_syntax(content)
-
-        # If the converted content is the same as the current content, skip writing back to avoid loops
-        if converted_content == content:
-            print("Converted content is the same as the original content, skipping write-back")
-            self.last_processed_content = content
+        if not self.convert_in_background:
+            self.convert_and_write_back(content)
             return
+        change_count, read_content = self._last_read
+        source_change_count = change_count if read_content is content else None
+        with self._slot:
+            if self._pending is not None:
+                self.metrics.count("coalesced")
+            self._generation += 1
+            self._pending = (content, self._generation, source_change_count)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._conversion_worker, name="clipboard-converter", daemon=True)
+                self._worker.start()
+            self._slot.notify_all()
 
-        print(f"Original clipboard content: {content}...")  # Show first 300 chars
-        print(f"Converted clipboard content: {converted_content}...")  # Show first 300 chars
-
-        # Save the processed content
-        self.last_processed_content = converted_content
-
-        # Write the converted content back to the clipboard
-        self.set_clipboard_text(converted_content)
+    def _conversion_worker(self):
+        while True:
+            with self._slot:
+                self._slot.wait_for(lambda: self._pending is not None or not self.running)
+                if self._pending is None:
+                    return
+                (content, generation, source_change_count), self._pending = self._pending, None
+                self._busy = True
+            try:
+                self.convert_and_write_back(content, generation, source_change_count)
+            except Exception as e:
+                print(f"Error while converting clipboard content: {e}")
+            finally:
+                with self._slot:
+                    self._busy = False
+                    self._slot.notify_all()
@@ -0,0 +1,197 @@
+"""Parallel batch conversion of Markdown/text files on disk.
+
+Used by the ``convert`` command of the CLI to normalize whole archives of
+exported conversations. Files are spread over a process pool, written
+atomically, and skipped when they have not changed since the last run.
+"""
+import glob
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .common import convert_math_syntax
+
+
+DEFAULT_EXTENSIONS = (".md", ".markdown", ".txt")
+
+# Per-file outcomes reported by _convert_file
+CONVERTED = "converted"
+UNCHANGED = "unchanged"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+def _glob_base(pattern):
+    """Return the leading directory of a glob pattern that contains no wildcard"""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or os.curdir
+
+
+def expand_inputs(patterns, extensions=DEFAULT_EXTENSIONS):
+    """
+    Expand files, directories and glob patterns into a list of input files.
+
+    Args:
+        patterns (list): Paths or glob patterns; directories are searched recursively
+        extensions (tuple): File extensions picked up inside directories
+
+    Returns:
+        list: (path, relative path) tuples; the relative path is used to mirror
+        the input layout under an output directory
+    """
+    seen = set()
+    files = []
+
+    def add(path, base):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            files.append((path, os.path.relpath(path, base)))
+
+    def add_dir(directory):
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                if name.lower().endswith(extensions):
+                    add(os.path.join(root, name), directory)
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            add_dir(pattern)
+        elif os.path.isfile(pattern):
+            add(pattern, os.path.dirname(pattern) or os.curdir)
+        else:
+            base = _glob_base(pattern)
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isdir(path):
+                    add_dir(path)
+                else:
+                    add(path, base)
+    return files
+
+
+def atomic_write(path, text):
+    """Write text to path through a temporary file in the same directory and a rename"""
+    directory = os.path.dirname(path) or os.curdir
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _convert_file(job):
+    """
+    Convert one file; runs inside a pool worker.
+
+    Args:
+        job (tuple): (source path, destination path, previous (mtime_ns, size) or None, engine)
+
+    Returns:
+        tuple: (source path, status, bytes read, new state or None, error message or None)
+    """
+    src, dst, previous, engine = job
+    try:
+        st = os.stat(src)
+        if previous is not None and tuple(previous) == (st.st_mtime_ns, st.st_size):
+            return src, SKIPPED, 0, previous, None
+        if dst != src and previous is None:
+            try:
+                if os.stat(dst).st_mtime_ns >= st.st_mtime_ns:
+                    return src, SKIPPED, 0, None, None
+            except FileNotFoundError:
+                pass
+
+        with open(src, "r", encoding="utf-8") as f:
+            text = f.read()
+        converted = convert_math_syntax(text, engine=engine)
+
+        if dst == src and converted == text:
+            status = UNCHANGED
+        else:
+            atomic_write(dst, converted)
+            status = CONVERTED if converted != text else UNCHANGED
+        st = os.stat(src)
+        return src, status, len(text.encode("utf-8")), (st.st_mtime_ns, st.st_size), None
+    except Exception as e:
+        return src, FAILED, 0, None, f"{type(e).__name__}: {e}"
+
+
+def load_state(path):
+    """Read the {source path: [mtime_ns, size]} state file, empty if missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def convert_files(files, output_dir=None, workers=None, chunksize=None, state_path=None, progress=None,
+                  engine=None):
+    """
+    Convert files in parallel.
+
+    Args:
+        files (list): (path, relative path) tuples from expand_inputs
+        output_dir (str): Mirror converted files under this directory, None to convert in place
+        workers (int): Number of worker processes, defaults to the CPU count; 1 converts in-process
+        chunksize (int): Files handed to a worker at a time, defaults to an even split
+        state_path (str): JSON file remembering converted inputs, so unchanged files are skipped
+        progress (callable): Called with (source path, status, error) after each file
+        engine: Engine name passed to convert_math_syntax, defaults to marko, or a rule
+            profile's engine from profiles.compile_profile (workers compile the profile once each)
+
+    Returns:
+        dict: Counts per status plus files, bytes, seconds, files_per_s and mb_per_s
+    """
+    workers = workers or os.cpu_count() or 1
+    state = load_state(state_path) if state_path else {}
+
+    jobs = []
+    for path, relpath in files:
+        dst = os.path.join(output_dir, relpath) if output_dir else path
+        jobs.append((path, dst, state.get(os.path.abspath(path)), engine))
+    if chunksize is None:
+        chunksize = max(1, min(256, len(jobs) // (workers * 4)))
+
+    summary = {CONVERTED: 0, UNCHANGED: 0, SKIPPED: 0, FAILED: 0, "bytes": 0}
+    start = time.perf_counter()
+    if workers == 1 or len(jobs) <= 1:
+        results = map(_convert_file, jobs)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_convert_file, jobs, chunksize=chunksize)
+    try:
+        for src, status, nbytes, new_state, error in results:
+            summary[status] += 1
+            summary["bytes"] += nbytes
+            if new_state is not None:
+                state[os.path.abspath(src)] = list(new_state)
+            if progress is not None:
+                progress(src, status, error)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    elapsed = time.perf_counter() - start
+
+    if state_path:
+        atomic_write(state_path, json.dumps(state))
+
+    summary["files"] = len(jobs)
+    summary["seconds"] = elapsed
+    summary["files_per_s"] = len(jobs) / elapsed if elapsed > 0 else 0.0
+    summary["mb_per_s"] = summary["bytes"] / (1024 * 1024) / elapsed if elapsed > 0 else 0.0
+    return summary
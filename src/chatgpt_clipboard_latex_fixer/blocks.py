@@ -0,0 +1,166 @@
+"""Split Markdown into independent top-level blocks.
+
+A document is cut only at blank lines where no construct can continue past
+the cut: never inside fenced code, a ``[`` ... ``]`` BlockMath span, a
+``\\[`` ... ``\\]`` span, a ``$$`` display block, a ``\\begin{...}`` environment
+(display math under rule profiles that list it) or a raw HTML block, and never in front of a line
+that could continue the previous block (indented lines, list items, block
+quotes). Each block can then be converted on its own, which is what lets
+``convert_math_syntax`` skip, cache and stream block by block.
+"""
+import re
+
+from .patterns import CONTAINER_PREFIX_PATTERN
+
+
+_FENCE_RE = re.compile(r' {0,3}(`{3,}|~{3,})')
+_BLOCK_MATH_RE = re.compile(r' {0,3}\[')
+_ENVIRONMENT_RE = re.compile(r' {0,3}\\begin\{([^}\n]+)\}')
+_HTML_RAW_RE = re.compile(r' {0,3}<(?:(!--)|(script|pre|style|textarea)\b)', re.IGNORECASE)
+_HTML_LINE_RE = re.compile(r' {0,3}<')
+_PREFIX_RE = re.compile(CONTAINER_PREFIX_PATTERN)
+# Lines that may continue the block before a blank line instead of starting a new one
+_CONTINUATION_RE = re.compile(r'[ \t>]|[-*+](?:[ \t]|$)|\d{1,9}[.)](?:[ \t]|$)')
+
+
+class BlockSplitter:
+    """
+    Incremental line-based splitter.
+
+    Feed lines (with their line endings) and collect the blocks that are
+    complete. Only the current block is buffered, so memory is bounded by the
+    largest block rather than by document size.
+    """
+
+    def __init__(self):
+        self._lines = []  # Lines of the block being collected
+        self._has_content = False  # The block has a non-blank line
+        self._html_tail = False  # The last non-blank line may belong to an HTML block
+        self._blank_tail = False  # The block ends with blank lines after content, the next line decides whether to cut
+        self._fence = None  # Closing fence character and minimum length inside fenced code
+        self._block_math = False  # Inside a [ ... ] BlockMath span
+        self._display = False  # Inside a \[ ... \] span
+        self._dollar_display = False  # Inside a $$ ... $$ display block
+        self._environment = None  # Closing \end{...} of the environment we are in
+        self._html_end = None  # Text that closes the current raw HTML block
+
+    def feed(self, line):
+        """
+        Add one line.
+
+        Args:
+            line (str): A line including its line ending (the last line may lack one)
+
+        Returns:
+            list: Blocks completed by this line, usually empty
+        """
+        completed = []
+        if self._blank_tail and line.strip() and not _CONTINUATION_RE.match(line):
+            completed.append(''.join(self._lines))
+            self._lines = []
+        self._blank_tail = False
+        self._lines.append(line)
+        self._track(line)
+        return completed
+
+    def flush(self):
+        """Return the remaining buffered block, if any, and reset the splitter"""
+        rest = ''.join(self._lines)
+        self.__init__()
+        return [rest] if rest else []
+
+    def _track(self, line):
+        """Update the open-construct state with line"""
+        stripped = line.strip()
+        if self._fence is not None:
+            match = _FENCE_RE.match(line)
+            if match and match.group(1)[0] == self._fence[0] and len(match.group(1)) >= self._fence[1] \
+                    and not line[match.end():].strip():
+                self._fence = None
+            return
+        if self._block_math:
+            if stripped == ']':
+                self._block_math = False
+            return
+        if self._display:
+            if '\\]' in line:
+                self._display = False
+            return
+        if self._dollar_display:
+            if line[_PREFIX_RE.match(line).end():].strip() == '$$':
+                self._dollar_display = False
+            return
+        if self._environment is not None:
+            if self._environment in line:
+                self._environment = None
+            return
+        if self._html_end is not None:
+            if self._html_end in line.lower():
+                self._html_end = None
+            return
+
+        if not stripped:
+            # Leading blank lines stay with the block that follows them, and
+            # HTML blocks render the blank lines after them, so keep those too
+            self._blank_tail = self._has_content and not self._html_tail
+            return
+        self._has_content = True
+        self._html_tail = bool(_HTML_LINE_RE.match(line))
+        match = _FENCE_RE.match(line)
+        if match:
+            self._fence = (match.group(1)[0], len(match.group(1)))
+            return
+        content = line[_PREFIX_RE.match(line).end():].strip()
+        if content == '$$' or content.endswith(' $$'):
+            # Also "text $$", the opening line of converted inline block math, in a container or not
+            self._dollar_display = True
+            return
+        match = _ENVIRONMENT_RE.match(line)
+        if match:
+            end = f"\\end{{{match.group(1)}}}"
+            if end not in line[match.end():]:
+                self._environment = end
+            return
+        if _BLOCK_MATH_RE.match(line):
+            # BlockMath consumes everything up to the next "]" line, even after "[x]"
+            self._block_math = True
+            return
+        match = _HTML_RAW_RE.match(line)
+        if match:
+            end = '-->' if match.group(1) else f'</{match.group(2).lower()}>'
+            if end not in line.lower()[match.end():]:
+                self._html_end = end
+            return
+        if line.rfind('\\[') > line.rfind('\\]'):
+            self._display = True
+
+
+def iter_lines(text):
+    """Yield the lines of text, split after each newline and keeping it"""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end == -1:
+            if start < len(text):
+                yield text[start:]
+            return
+        yield text[start:end + 1]
+        start = end + 1
+
+
+def split_blocks(text):
+    """
+    Split text into top-level blocks whose concatenation is text.
+
+    Args:
+        text (str): Markdown text
+
+    Returns:
+        list: The blocks, in order
+    """
+    splitter = BlockSplitter()
+    blocks = []
+    for line in iter_lines(text):
+        blocks.extend(splitter.feed(line))
+    blocks.extend(splitter.flush())
+    return blocks
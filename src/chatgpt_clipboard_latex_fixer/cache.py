@@ -0,0 +1,220 @@
+"""Bounded, content-addressed cache of conversion results.
+
+Clipboard content tends to come back: the same answer is copied again, or two
+apps swap the clipboard back and forth. ``convert_math_syntax`` looks converted
+text up here by a hash of the input before parsing it again. The in-memory tier
+is an LRU bounded by entry count and total size; an optional on-disk tier keeps
+results across restarts so a new listener starts warm.
+
+Converted blocks, memoized so a document that grew only re-parses its new
+blocks, go to a separate in-memory LRU (``ConversionCache.blocks``) with its
+own bounds: a document with many blocks would otherwise evict its own blocks
+and the documents around it, and every block would become a file on disk.
+"""
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+
+def content_key(text, namespace=""):
+    """
+    Return the hex digest used to address text in the cache.
+
+    Args:
+        text (str): The content to hash
+        namespace (str): Keeps keys of different kinds of entries apart, e.g. documents and blocks
+    """
+    digest = hashlib.blake2b(namespace.encode("utf-8"), digest_size=16)
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """LRU cache mapping input content hashes to converted text"""
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, disk_dir=None, disk_max_entries=4096,
+                 block_max_entries=16384, block_max_bytes=16 * 1024 * 1024):
+        """
+        Args:
+            max_entries (int): Maximum number of results kept in memory
+            max_bytes (int): Maximum total size of results kept in memory
+            disk_dir (str): Directory of the on-disk tier, None to keep results in memory only
+            disk_max_entries (int): Maximum number of files kept in disk_dir
+            block_max_entries (int): Maximum number of converted blocks kept in self.blocks
+            block_max_bytes (int): Maximum total size of the blocks kept, None for no block cache
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = None
+        self.disk_max_entries = disk_max_entries
+        self._disk_count = 0
+        self._entries = OrderedDict()  # key -> (converted text, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Memory only, and without blocks of its own
+        self.blocks = None if block_max_bytes is None else ConversionCache(
+            block_max_entries, block_max_bytes, block_max_bytes=None,
+        )
+        if disk_dir is not None:
+            self.set_disk_dir(disk_dir)
+
+    def set_disk_dir(self, disk_dir):
+        """
+        Enable (or disable with None) the on-disk tier.
+
+        Only document results are written there; blocks stay in self.blocks.
+
+        Args:
+            disk_dir (str): Directory for cached results, created (private to the user) if missing
+        """
+        if disk_dir is not None:
+            os.makedirs(disk_dir, mode=0o700, exist_ok=True)
+            self._disk_count = sum(1 for name in os.listdir(disk_dir) if name.endswith(".md"))
+        self.disk_dir = disk_dir
+
+    def get(self, key):
+        """
+        Look up a converted result.
+
+        Args:
+            key (str): Key from content_key
+
+        Returns:
+            str: The converted text, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        converted = self._disk_get(key)
+        with self._lock:
+            if converted is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, converted)
+        return converted
+
+    def put(self, key, converted):
+        """
+        Store a converted result, evicting least recently used entries as needed.
+
+        Args:
+            key (str): Key from content_key
+            converted (str): The converted text
+        """
+        with self._lock:
+            self._store(key, converted)
+        self._disk_put(key, converted)
+
+    def clear(self):
+        """Drop all in-memory entries, blocks included (the disk tier is left alone)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.blocks is not None:
+            self.blocks.clear()
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current size as a dict, the block cache's under 'blocks'"""
+        with self._lock:
+            stats = {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+        if self.blocks is not None:
+            stats["blocks"] = self.blocks.stats()
+        return stats
+
+    def _store(self, key, converted):
+        """Insert into the memory tier; caller holds the lock"""
+        size = sys.getsizeof(converted)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (converted, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + ".md")
+
+    def _disk_get(self, key):
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                return f.read()
+        except UnicodeDecodeError:
+            # A corrupt entry: remove it, or _disk_put would never replace it with the next result
+            try:
+                os.remove(path)
+                self._disk_count -= 1
+            except OSError:
+                pass
+            return None
+        except OSError:
+            return None
+
+    def _disk_put(self, key, converted):
+        import tempfile  # Only needed once the disk tier is used, keeps package import cheap
+
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            return
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(converted)
+            os.replace(tmp_path, path)
+            tmp_path = None
+            self._disk_count += 1
+            if self._disk_count > self.disk_max_entries:
+                self._prune_disk()
+        except (OSError, UnicodeEncodeError) as e:
+            print(f"Warning: failed to write conversion cache entry: {e}")
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _prune_disk(self):
+        """Delete the oldest files once the disk tier holds more than disk_max_entries"""
+        names = [name for name in os.listdir(self.disk_dir) if name.endswith(".md")]
+        paths = sorted((os.path.join(self.disk_dir, name) for name in names), key=os.path.getmtime)
+        # Drop an extra tenth so the directory is not listed on every write
+        keep = self.disk_max_entries * 9 // 10
+        for path in paths[:max(len(paths) - keep, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._disk_count = min(len(paths), keep)
+
+
+# Shared cache used by convert_math_syntax and therefore by the listeners
+default_cache = ConversionCache()
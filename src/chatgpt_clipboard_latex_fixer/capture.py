@@ -0,0 +1,257 @@
+"""Capture of slow conversions, so they can be reproduced and replayed.
+
+``convert_math_syntax(text, capture=SlowCapture(directory, threshold))``
+times the conversion and, when it takes at least ``threshold`` seconds, keeps
+the input in ``directory`` under its content hash:
+
+- ``<key>.txt``: the input, byte for byte;
+- ``<key>.json``: size, engine, time taken, time budget and whether it ran out,
+  when it was captured and how often the same input was slow;
+- ``<key>.prof``: with ``profile=True``, a cProfile dump of the input converted
+  again (without the cache), readable with ``pstats`` or snakeviz.
+
+Fast conversions cost one ``perf_counter`` call; only slow ones touch the
+disk. The listeners record with ``observe_later`` after the write-back, so the
+capture and its profiling run never count against the conversion time budget. The directory is bounded by entry count and total bytes, dropping the
+oldest captures first. ``replay_capture`` converts a captured input again with
+the current code, which the ``replay`` CLI command reports as faster or slower.
+"""
+import json
+import os
+import threading
+import time
+
+from .cache import content_key
+
+DEFAULT_THRESHOLD = 1.0
+_SUFFIXES = (".txt", ".json", ".prof")
+
+
+def default_capture_dir():
+    """Per-user capture directory next to the conversion history"""
+    from .history import default_state_dir
+
+    return os.path.join(default_state_dir(), "slow")
+
+
+def engine_spec(engine):
+    """
+    Describe an engine so that replay can rebuild it.
+
+    Returns:
+        "marko" or "fast", {"profile": {...}} for a rule profile's engine, or None
+        for an engine that cannot be rebuilt
+    """
+    if engine is None or isinstance(engine, str):
+        return engine or "marko"
+    profile = getattr(engine, "profile", None)
+    if profile is not None:
+        return {"profile": profile}
+    from .fast_engine import fast_engine
+    from .math_parser import default_engine
+
+    if engine is default_engine:
+        return "marko"
+    if engine is fast_engine:
+        return "fast"
+    return None
+
+
+def engine_from_spec(spec):
+    """
+    Rebuild the engine described by engine_spec.
+
+    Raises:
+        ValueError: If spec describes no engine that can be rebuilt
+    """
+    if spec in ("marko", "fast"):
+        return spec
+    if isinstance(spec, dict) and "profile" in spec:
+        from .profiles import compile_profile
+
+        return compile_profile(spec["profile"])
+    raise ValueError(f"cannot replay with engine {spec!r}")
+
+
+def _write_file(path, data):
+    """Write bytes to path through a temporary file and a rename"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SlowCapture:
+    """Keeps inputs whose conversion took at least threshold seconds in a bounded directory"""
+
+    def __init__(self, directory=None, threshold=DEFAULT_THRESHOLD, profile=False,
+                 max_entries=50, max_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            directory (str): Capture directory, created when the first input is captured;
+                None for default_capture_dir()
+            threshold (float): Seconds a conversion must take to be captured
+            profile (bool): Also convert each captured input again under cProfile and keep the dump
+            max_entries (int): Captures kept, oldest dropped first
+            max_bytes (int): Total size of the captured files kept
+        """
+        self.directory = directory or default_capture_dir()
+        self.threshold = threshold
+        self.profile = profile
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.captured = 0  # Slow conversions recorded by this object
+        self._lock = threading.Lock()
+
+    def observe(self, text, engine, seconds, time_budget=None):
+        """
+        Record text if its conversion was slow.
+
+        Args:
+            text (str): The converted input
+            engine: Engine argument of the conversion
+            seconds (float): Time the conversion took
+            time_budget (float): Budget it ran under, None for none
+
+        Returns:
+            str: The capture key, or None if the conversion was not slow or could not be recorded
+        """
+        if seconds < self.threshold:
+            return None
+        spec = engine_spec(engine)
+        key = content_key(text, "capture")
+        try:
+            with self._lock:
+                os.makedirs(self.directory, mode=0o700, exist_ok=True)  # Captures hold clipboard text
+                base = os.path.join(self.directory, key)
+                meta = self._read_meta(base + ".json")
+                if meta is None:
+                    _write_file(base + ".txt", text.encode("utf-8", "surrogatepass"))
+                    meta = {"key": key, "count": 0, "profile": None}
+                meta.update(
+                    size=len(text), engine=spec, seconds=round(seconds, 6), time_budget=time_budget,
+                    timed_out=time_budget is not None and seconds >= time_budget,
+                    captured_at=time.time(), count=meta["count"] + 1,
+                )
+                if self.profile and meta["profile"] is None and self._profile(text, engine, time_budget, base + ".prof"):
+                    meta["profile"] = key + ".prof"
+                _write_file(base + ".json", json.dumps(meta, indent=2, sort_keys=True).encode("utf-8"))
+                self.captured += 1
+                self._prune()
+        except (OSError, UnicodeEncodeError) as e:
+            print(f"Warning: could not capture a slow conversion in {self.directory}: {e}")
+            return None
+        return key
+
+    def observe_later(self, text, engine, seconds, time_budget=None):
+        """
+        observe() on a daemon thread, for callers that must not wait for the disk or the profiler.
+
+        Listeners call this once the write-back is done, so capturing never delays
+        or changes what is written to the clipboard.
+
+        Returns:
+            threading.Thread: The thread recording text, or None if the conversion was not slow
+        """
+        if seconds < self.threshold:
+            return None
+        thread = threading.Thread(
+            target=self.observe, args=(text, engine, seconds, time_budget), name="slow-capture", daemon=True,
+        )
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _read_meta(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _profile(text, engine, time_budget, path):
+        """Convert text again under cProfile and dump the stats to path; False if profiling is unavailable"""
+        import cProfile
+
+        from .common import convert_math_syntax
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(convert_math_syntax, text, engine=engine, cache=None, time_budget=time_budget)
+        except ValueError:
+            return False  # Another profiler is active in this process
+        profiler.dump_stats(path)
+        return True
+
+    def _prune(self):
+        """Delete the oldest captures beyond max_entries or max_bytes; caller holds the lock"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            base = os.path.join(self.directory, name[:-len(".json")])
+            paths = [base + suffix for suffix in _SUFFIXES if os.path.exists(base + suffix)]
+            entries.append((os.path.getmtime(base + ".json"), sum(os.path.getsize(path) for path in paths), paths))
+        entries.sort(reverse=True)  # Newest first
+        kept_bytes = 0
+        for index, (_, size, paths) in enumerate(entries):
+            kept_bytes += size
+            if index >= self.max_entries or (index and kept_bytes > self.max_bytes):
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+
+def load_captures(directory=None):
+    """
+    List the captures in directory, oldest first.
+
+    Returns:
+        list: (metadata dict, path of the captured input) pairs
+    """
+    directory = directory or default_capture_dir()
+    captures = []
+    for name in os.listdir(directory):
+        if name.endswith(".json"):
+            meta = SlowCapture._read_meta(os.path.join(directory, name))
+            text_path = os.path.join(directory, name[:-len(".json")] + ".txt")
+            if meta is not None and os.path.exists(text_path):
+                captures.append((meta, text_path))
+    captures.sort(key=lambda capture: capture[0].get("captured_at", 0))
+    return captures
+
+
+def replay_capture(meta, text_path, repeat=3, time_budget=None):
+    """
+    Convert a captured input again with the current code.
+
+    The engine is warmed up first and the cache is not used, so the time is
+    that of a conversion from scratch, comparable to meta["seconds"].
+
+    Args:
+        meta (dict): Capture metadata from load_captures
+        text_path (str): Path of the captured input
+        repeat (int): Conversions timed, the fastest is returned
+        time_budget (float): Budget of each conversion, None for none
+
+    Returns:
+        float: Seconds of the fastest conversion
+
+    Raises:
+        ValueError: If the capture's engine cannot be rebuilt
+    """
+    from .common import convert_math_syntax, warm_up
+
+    engine = engine_from_spec(meta.get("engine"))
+    with open(text_path, "rb") as f:
+        text = f.read().decode("utf-8", "surrogatepass")
+    warm_up(engine)
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        convert_math_syntax(text, engine=engine, cache=None, time_budget=time_budget)
+        best = min(best, time.perf_counter() - started)
+    return best
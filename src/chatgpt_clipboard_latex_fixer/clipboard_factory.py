@@ -6,7 +6,8 @@ def create_clipboard_listener():
     Factory function to create the appropriate clipboard listener based on the platform.
     
     Returns:
-        A clipboard listener instance (WinClipboardListener or MacClipboardListener)
+        A clipboard listener instance (WinClipboardListener, MacClipboardListener,
+        or on Linux X11ClipboardListener / WaylandClipboardListener)
     
     Raises:
         NotImplementedError: If the platform is not supported
@@ -19,5 +20,8 @@ def create_clipboard_listener():
     elif system == "Darwin":  # macOS
         from .macclip import MacClipboardListener
         return MacClipboardListener.alloc().init()
+    elif system == "Linux":
+        from .linuxclip import create_linux_listener
+        return create_linux_listener()
     else:
-        raise NotImplementedError(f"Platform '{system}' is not supported. Only Windows and macOS are supported.")
+        raise NotImplementedError(f"Platform '{system}' is not supported. Only Windows, macOS and Linux are supported.")
@@ -1,6 +1,89 @@
 import os
 import re
-from .math_parser import markdown_normalize
+import time
+from .blocks import BlockSplitter, split_blocks
+from .cache import default_cache, content_key
+from .deadline import ConversionTimeout, Deadline
+from .prescan import needs_conversion
+
+
+# Engine names accepted by convert_math_syntax
+ENGINES = ("marko", "fast")
+# Texts shorter than this are converted serially even when workers are requested: below it,
+# handing blocks to other processes costs more than it saves
+PARALLEL_MIN_CHARS = 512 * 1024
+
+
+def _marko_engine():
+    """The shared marko engine; marko is only imported once text actually needs it"""
+    from .math_parser import default_engine
+    return default_engine
+
+
+def resolve_engine(engine):
+    """
+    Turn an engine argument into an engine object.
+
+    Args:
+        engine: None or "marko" for the shared marko engine, "fast" for the
+            single-pass FastEngine, or an engine object with a convert method,
+            e.g. a rule profile's from profiles.compile_profile
+
+    Returns:
+        The engine object
+
+    Raises:
+        ValueError: If engine is an unknown name
+    """
+    if engine is None or engine == "marko":
+        return _marko_engine()
+    if engine == "fast":
+        from .fast_engine import fast_engine
+        return fast_engine
+    if isinstance(engine, str):
+        raise ValueError(f"Unknown engine '{engine}', expected one of: {', '.join(ENGINES)}")
+    return engine
+
+
+def warm_up(engine=None):
+    """
+    Import and build an engine ahead of the first real conversion.
+
+    Listeners call this from a background thread right after they start, so
+    the first copied answer does not pay for importing marko. The marko
+    engine keeps one parser per thread; the listener thread still builds its
+    own on first use, which is cheap once marko is imported.
+
+    Args:
+        engine: Engine name or object, see resolve_engine
+    """
+    resolve_engine(engine).convert("Warm up $ x $\n")
+
+
+def _replace_pairs(text, opening, closing, before, after, strip=False):
+    """
+    Replace every opening ... closing pair, pairing each opening with the next closing.
+
+    Same result as re.sub(opening + '(.*?)' + closing, before + r'\1' + after, text, flags=re.DOTALL)
+    for literal delimiters, but once an opening has no closing after it, no later
+    one can have either, so the text is scanned once instead of once per opening.
+    """
+    parts = []
+    pos = 0
+    find = text.find
+    start = find(opening)
+    while start != -1:
+        end = find(closing, start + len(opening))
+        if end == -1:
+            break
+        content = text[start + len(opening):end]
+        parts += [text[pos:start], before, content.strip() if strip else content, after]
+        pos = end + len(closing)
+        start = find(opening, pos)
+    if not parts:
+        return text
+    parts.append(text[pos:])
+    return ''.join(parts)
 
 
 # Legacy regex-based converter (kept for reference)
@@ -10,30 +93,338 @@ def convert_math_syntax_legacy(input_text):
     WARNING: This has ambiguity issues with regular brackets.
     """
     # turn  \[...\] into $$...$$ format
-    output_text = re.sub(r'\\\[(.*?)\\\]', r'$$\1$$', input_text, flags=re.DOTALL)
+    output_text = _replace_pairs(input_text, '\\[', '\\]', '$$', '$$')
     # turn  \(...\) into $...$ format
-    output_text = re.sub(r'\\\((.*?)\\\)', r'$\1$', output_text, flags=re.DOTALL)
+    output_text = _replace_pairs(output_text, '\\(', '\\)', '$', '$')
     # turn $ xxx $ into $xxx$ format
-    output_text = re.sub(r'\$\s*(.*?)\s*\$', r'$\1$', output_text, flags=re.DOTALL)
+    output_text = _replace_pairs(output_text, '$', '$', '$', '$', strip=True)
     # turn [\n ... \n] into $$\n ... \n$$ format
-    output_text = re.sub(r'\[\n(.*?)\n\]', r'$$\n\1\n$$', output_text, flags=re.DOTALL)
+    output_text = _replace_pairs(output_text, '[\n', '\n]', '$$\n', '\n$$')
     # turn ( ... ) into $ ... $ format
-    output_text = re.sub(r'\((.*?)\)', r'$\1$', output_text, flags=re.DOTALL)
+    output_text = _replace_pairs(output_text, '(', ')', '$', '$')
+    return output_text
+
+
+class ConversionStats:
+    """Counters describing how convert_math_syntax handled its input"""
+
+    def __init__(self):
+        self.documents = 0  # Texts handed to convert_math_syntax
+        self.documents_cached = 0  # Texts answered from the document cache
+        self.blocks = 0  # Top-level blocks looked at
+        self.blocks_skipped = 0  # Blocks without math, kept verbatim
+        self.blocks_reused = 0  # Blocks whose conversion came from the block cache
+        self.blocks_parsed = 0  # Blocks parsed and rendered by marko
+        self.parse_seconds = 0.0  # Time spent parsing (scanning, for the fast engine)
+        self.render_seconds = 0.0  # Time spent rendering parsed blocks back to Markdown
+        self.documents_timed_out = 0  # Texts returned unchanged because they ran past their time budget
+        self.blocks_failed = 0  # Blocks whose conversion raised, so they fell back to the fast engine or stayed as they were
+        self.failed_offsets = []  # Start offsets of the first MAX_FAILED_OFFSETS failed blocks in their document
+
+    def as_dict(self):
+        """Return the counters as a dict"""
+        return dict(vars(self))
+
+    def add(self, counts):
+        """Add counters from another instance's as_dict(), e.g. one filled in a worker process"""
+        for name, value in counts.items():
+            setattr(self, name, getattr(self, name) + value)
+        del self.failed_offsets[MAX_FAILED_OFFSETS:]
+
+    def record_failure(self, offset):
+        """Count a block that failed to convert, starting at offset in its document"""
+        self.blocks_failed += 1
+        if len(self.failed_offsets) < MAX_FAILED_OFFSETS:
+            self.failed_offsets.append(offset)
+
+
+MAX_FAILED_OFFSETS = 100  # Offsets kept per ConversionStats; a long-running listener only needs samples
+
+
+# A block followed by another one keeps exactly one blank line after conversion, as in a whole-document render
+_TRAILING_BLANK_RE = re.compile(r'\n[ \t\r]*\n\Z')
+
+
+def _prescan(engine):
+    """The needs_conversion check for engine; rule profiles bring their own"""
+    return getattr(engine, "needs_conversion", None) or needs_conversion
+
+
+def _render_block(engine, block, stats):
+    if stats is None or not hasattr(engine, "render"):
+        return engine.convert(block)
+    # Parse and render separately so the listener metrics can tell the two apart
+    start = time.perf_counter()
+    doc = engine.parse(block)
+    parsed = time.perf_counter()
+    output_text = engine.render(doc)
+    del doc  # Free the tree before the output is cached
+    stats.parse_seconds += parsed - start
+    stats.render_seconds += time.perf_counter() - parsed
     return output_text
 
 
+def convert_block(block, engine=None, last=True, cache=None, stats=None, deadline=None):
+    """
+    Convert one top-level block from split_blocks.
+
+    Blocks without convertible delimiters are returned unchanged, the others
+    are rendered through marko. With a cache, rendered blocks are memoized by
+    content hash in its block tier (cache.blocks), so a document that grew or
+    changed only re-parses the blocks that are new.
+
+    Args:
+        block (str): The block text
+        engine: Engine object, None for the shared marko engine
+        last (bool): Whether the block ends the document
+        cache (ConversionCache): Cache whose block tier memoizes the block, None to always parse
+        stats (ConversionStats): Counters to update, if given
+        deadline (Deadline): Budget of the whole conversion; parsing may be interrupted when it runs out
+
+    Returns:
+        str: The converted block
+
+    Raises:
+        ConversionTimeout: If deadline runs out before the block is converted
+    """
+    if stats is not None:
+        stats.blocks += 1
+    if not _prescan(engine)(block):
+        if stats is not None:
+            stats.blocks_skipped += 1
+        return block
+    if getattr(engine, "edits_in_place", False):
+        # Cheap enough not to memoize, and it never touches the surrounding layout
+        if stats is None:
+            return engine.convert(block, deadline)
+        start = time.perf_counter()
+        output_text = engine.convert(block, deadline)
+        stats.parse_seconds += time.perf_counter() - start
+        stats.blocks_parsed += 1
+        return output_text
+
+    output_text = None
+    namespace = getattr(engine, "cache_namespace", "")  # Results of different rule profiles are kept apart
+    cache = cache.blocks if cache is not None and namespace is not None else None
+    if cache is not None:
+        key = content_key(block, "block" + namespace)
+        output_text = cache.get(key)
+    if output_text is not None:
+        if stats is not None:
+            stats.blocks_reused += 1
+    else:
+        engine = engine or _marko_engine()
+        if deadline is None:
+            output_text = _render_block(engine, block, stats)
+        else:
+            with deadline.interruptible():
+                output_text = _render_block(engine, block, stats)
+        if cache is not None:
+            cache.put(key, output_text)
+        if stats is not None:
+            stats.blocks_parsed += 1
+    if not last and _TRAILING_BLANK_RE.search(block):
+        output_text = output_text.rstrip('\n') + '\n\n'
+    return output_text
+
+
+def convert_block_isolated(block, engine=None, last=True, cache=None, stats=None, deadline=None, offset=0):
+    """
+    convert_block, containing a failure to this one block.
+
+    If the shared marko engine raises, the block is converted with the fast
+    engine instead, which only rewrites math delimiters, and returned unchanged
+    if that fails too; the rest of the document is not affected. Other engines
+    (a rule profile's) get no fallback, since the fast engine would rewrite the
+    block with the default delimiters: their failing block is returned unchanged.
+    The failure is recorded in stats with offset, so the input that triggered
+    it can be found.
+
+    Args:
+        offset (int): Start of block in its document, for the stats
+        Others as for convert_block
+
+    Returns:
+        str: The converted block
+
+    Raises:
+        ConversionTimeout: If deadline runs out before the block is converted
+    """
+    try:
+        return convert_block(block, engine, last, cache, stats, deadline)
+    except ConversionTimeout:
+        raise
+    except Exception as e:
+        print(f"Warning: could not convert the block at offset {offset} ({e!r}); falling back for this block only")
+        if stats is not None:
+            stats.record_failure(offset)
+    if engine is not None and engine is not _marko_engine():
+        return block
+    try:
+        return resolve_engine("fast").convert(block, deadline)
+    except ConversionTimeout:
+        raise
+    except Exception:
+        return block
+
+
 # New improved converter
-def convert_math_syntax(input_text):
+def convert_math_syntax(input_text, engine=None, cache=default_cache, stats=None, workers=None, time_budget=None,
+                        capture=None):
     """
     Convert ChatGPT math syntax to standard MathJax format.
     Uses the improved converter from math_converter_v2.py
+
+    Text without any convertible delimiter (plain prose, code, or content that
+    is already normalized) is returned as the same object without parsing.
+    Otherwise the text is split into top-level blocks and only the blocks that
+    contain math are parsed; the others are kept verbatim.
+    Results of the marko engines are kept in a content-addressed cache, both
+    for whole texts, so text that comes back to the clipboard is not converted
+    twice, and for single blocks, so a text that grew (an answer copied while
+    still streaming) only re-parses its new blocks.
+    With workers, texts of at least PARALLEL_MIN_CHARS are converted block by
+    block on a process pool; the output is identical to a serial conversion.
+    With a time_budget, a conversion that runs longer is abandoned and the
+    input is returned unchanged, see deadline.py. With a capture, a conversion
+    that takes at least its threshold is recorded for replay before this
+    returns, see capture.py; the listeners convert without one and record
+    with SlowCapture.observe_later after writing back instead.
+
+    Args:
+        input_text (str): The text to convert
+        engine: "marko" (default), "fast" or an engine object, see resolve_engine
+        cache (ConversionCache): Result cache, None to disable; not used with the fast engine
+        stats (ConversionStats): Counters to update, if given
+        workers (int): Worker processes for large texts with the marko engine, 0 for the CPU count,
+            None or 1 to convert in this process
+        time_budget (float): Seconds the conversion may take, None for no limit
+        capture (SlowCapture): Records the input if the conversion is slow, if given
     """
-    try:        
-        return markdown_normalize(input_text)
-    except Exception as e:
-        # Fallback to legacy if new module not available or fails
-        print("Warning: Using legacy regex-based converter (may have ambiguity issues)", e)
-        return convert_math_syntax_legacy(input_text)
+    if capture is not None:
+        started = time.perf_counter()
+        converted = convert_math_syntax(input_text, engine, cache, stats, workers, time_budget)
+        capture.observe(input_text, engine, time.perf_counter() - started, time_budget)
+        return converted
+    if stats is not None:
+        stats.documents += 1
+    if not _prescan(engine)(input_text):
+        return input_text
+    engine = resolve_engine(engine)
+    if time_budget is None:
+        return _convert_document(input_text, engine, cache, stats, workers, None)
+    deadline = Deadline(time_budget)
+    try:
+        return _convert_document(input_text, engine, cache, stats, workers, deadline)
+    except ConversionTimeout:
+        if stats is not None:
+            stats.documents_timed_out += 1
+        if hasattr(engine, "reset"):
+            engine.reset()  # The interrupted parser may have been left half-way
+        return input_text
+    finally:
+        deadline.close()
+
+
+def _convert_document(input_text, engine, cache, stats, workers, deadline):
+    """convert_math_syntax for text that needs conversion, with the engine resolved"""
+    if getattr(engine, "edits_in_place", False):
+        # The fast engine edits the text in place and needs no block splitting
+        try:
+            if stats is None:
+                return engine.convert(input_text, deadline)
+            start = time.perf_counter()
+            output_text = engine.convert(input_text, deadline)
+            stats.parse_seconds += time.perf_counter() - start
+            return output_text
+        except ConversionTimeout:
+            raise
+        except Exception:
+            pass  # Retry block by block below, so only the failing block is left unconverted
+
+    key = None
+    if cache is not None and getattr(engine, "cache_namespace", None) is not None:
+        key = content_key(input_text, engine.cache_namespace)
+        cached = cache.get(key)
+        if cached is not None:
+            if stats is not None:
+                stats.documents_cached += 1
+            return cached
+    else:
+        cache = None
+
+    blocks = split_blocks(input_text)
+    output_text = None
+    if workers != 1 and workers is not None and len(input_text) >= PARALLEL_MIN_CHARS \
+            and engine is _marko_engine():
+        from .parallel import convert_blocks
+        output_text = convert_blocks(blocks, workers or None, stats, deadline)
+    if output_text is None:
+        # A block that fails is converted on its own terms; the others are unaffected
+        last = len(blocks) - 1
+        parts = []
+        offset = 0
+        for i, block in enumerate(blocks):
+            parts.append(convert_block_isolated(block, engine, i == last, cache, stats, deadline, offset))
+            offset += len(block)
+        output_text = ''.join(parts)
+
+    if key is not None:
+        cache.put(key, output_text)
+    return output_text
+
+
+def convert_stream(chunks, engine=None, cache=None, stats=None):
+    """
+    Convert a document given as an iterable of lines or arbitrary chunks.
+
+    Input is cut at the same top-level block boundaries convert_math_syntax
+    uses and every block is yielded as soon as it is complete, so peak memory
+    depends on the largest block rather than on document size. Joining the
+    output gives the same text as convert_math_syntax on the joined input.
+    As in convert_math_syntax, a block that cannot be parsed falls back on
+    its own, see convert_block_isolated.
+
+    Args:
+        chunks (iterable): Strings to concatenate into the document
+        engine: "marko" (default), "fast" or an engine object, see resolve_engine
+        cache (ConversionCache): Block cache, None to always parse
+        stats (ConversionStats): Counters to update, if given
+
+    Yields:
+        str: Converted blocks, in order
+    """
+    engine = resolve_engine(engine)
+    splitter = BlockSplitter()
+    partial = []  # Pieces of a line that is not complete yet
+    offset = 0  # Start of the next block in the document
+
+    def convert(block, last=False):
+        nonlocal offset
+        start = offset
+        offset += len(block)
+        return convert_block_isolated(block, engine, last, cache, stats, None, start)
+
+    for chunk in chunks:
+        start = 0
+        end = chunk.find('\n')
+        while end != -1:
+            line = chunk[start:end + 1]
+            if partial:
+                partial.append(line)
+                line = ''.join(partial)
+                partial = []
+            for block in splitter.feed(line):
+                yield convert(block)
+            start = end + 1
+            end = chunk.find('\n', start)
+        if start < len(chunk):
+            partial.append(chunk[start:])
+    if partial:
+        for block in splitter.feed(''.join(partial)):
+            yield convert(block)
+    for block in splitter.flush():
+        yield convert(block, last=True)
 
 if __name__ == "__main__":
     for file in os.listdir("testcases"):
@@ -0,0 +1,340 @@
+"""Resident conversion daemon serving requests over a Unix domain socket.
+
+Starting Python and importing marko costs far more than converting a typical
+snippet, so editor plugins and shell pipelines that call the converter once
+per snippet are dominated by startup. The ``daemon`` command keeps a warmed
+converter resident; the ``client`` command sends stdin to it and prints the
+result, converting in-process when no daemon is running.
+
+Protocol: every message is a pair of frames, a JSON header and a UTF-8 body,
+each prefixed by its length as a 4-byte big-endian unsigned integer. A request
+header holds ``op`` ("convert", "ping" or "shutdown") and optionally
+``engine``; its body is the text to convert. A response header holds ``ok``
+and, on failure, ``error``; its body is the converted text. A connection may
+carry any number of requests.
+
+The socket lives in a directory only its user can enter: XDG_RUNTIME_DIR, or
+a per-user 0700 directory in the temp dir. It is created closed to other users, and
+the client refuses a socket owned by another user, which could otherwise
+read every snippet sent to it.
+"""
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import sys
+
+
+_LENGTH = struct.Struct(">I")
+# Frames larger than this are rejected instead of being buffered
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+
+
+def default_socket_path():
+    """Per-user socket path, in XDG_RUNTIME_DIR when available, else in a per-user directory of the temp dir"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "chatgpt-clipboard-latex-fixer.sock")
+    import tempfile
+
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(tempfile.gettempdir(), f"chatgpt-clipboard-latex-fixer-{uid}", "daemon.sock")
+
+
+def ensure_private_directory(directory):
+    """
+    Create directory with mode 0700, or check that the existing one is private to this user.
+
+    Raises:
+        RuntimeError: If directory is a symlink, not a directory, owned by another user, or open to others
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(f"{directory} must be a directory owned by this user with mode 0700")
+
+
+def check_socket_owner(socket_path):
+    """
+    Check that socket_path belongs to this user before sending it any text.
+
+    Raises:
+        PermissionError: If another user owns the socket
+        FileNotFoundError: If there is no socket at socket_path
+    """
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise PermissionError(f"{socket_path} is owned by another user")
+
+
+def _recv_exact(sock, size):
+    """Read exactly size bytes, or None if the peer closed the connection first"""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            return None
+        received += n
+    return bytes(buf)
+
+
+def send_frame(sock, payload):
+    """Send one length-prefixed frame"""
+    sock.sendall(_LENGTH.pack(len(payload)))
+    if payload:  # The peer may already be gone after reading an empty frame's length
+        sock.sendall(payload)
+
+
+def recv_frame(sock):
+    """
+    Receive one length-prefixed frame.
+
+    Returns:
+        bytes: The payload, or None if the peer closed the connection between frames
+
+    Raises:
+        ValueError: If the frame is larger than MAX_FRAME_BYTES
+        ConnectionError: If the connection closes in the middle of a frame
+    """
+    header = _recv_exact(sock, _LENGTH.size)
+    if header is None:
+        return None
+    (size,) = _LENGTH.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {size} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    payload = _recv_exact(sock, size)
+    if payload is None:
+        raise ConnectionError("Connection closed in the middle of a frame")
+    return payload
+
+
+def send_message(sock, header, body=""):
+    """Send a JSON header frame followed by a text body frame"""
+    send_frame(sock, json.dumps(header).encode("utf-8"))
+    send_frame(sock, body.encode("utf-8", "surrogatepass"))
+
+
+def recv_message(sock):
+    """
+    Receive a header and body sent by send_message.
+
+    Returns:
+        tuple: (header dict, body str), or None if the peer closed the connection
+
+    Raises:
+        ValueError: If the header is not a JSON object, or a frame is too large
+    """
+    header = recv_frame(sock)
+    if header is None:
+        return None
+    body = recv_frame(sock)
+    if body is None:
+        raise ConnectionError("Connection closed before the message body")
+    header = json.loads(header)
+    if not isinstance(header, dict):
+        raise ValueError(f"Message header must be a JSON object, not {type(header).__name__}")
+    return header, body.decode("utf-8", "surrogatepass")
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serve the requests of one connection until the client closes it"""
+
+    def handle(self):
+        try:
+            self._serve_connection()
+        except ConnectionError:
+            pass  # The client went away; nothing left to answer
+
+    def _serve_connection(self):
+        from .common import convert_math_syntax
+
+        while True:
+            try:
+                message = recv_message(self.request)
+            except ValueError as e:
+                print(f"Dropping connection: {e}", file=sys.stderr)
+                return
+            if message is None:
+                return
+            header, body = message
+            op = header.get("op")
+            if op == "convert":
+                try:
+                    converted = convert_math_syntax(body, engine=header.get("engine"))
+                except Exception as e:
+                    send_message(self.request, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+                    continue
+                send_message(self.request, {"ok": True}, converted)
+            elif op == "ping":
+                send_message(self.request, {"ok": True, "pid": os.getpid()})
+            elif op == "shutdown":
+                try:
+                    send_message(self.request, {"ok": True})
+                finally:
+                    self.server.shutdown()  # Safe here: handlers run on pool threads, not the serving thread
+                return
+            else:
+                send_message(self.request, {"ok": False, "error": f"Unknown op '{op}'"})
+
+
+class ConversionServer(socketserver.UnixStreamServer):
+    """
+    Unix socket server handing connections to a fixed pool of threads.
+
+    A fixed pool rather than a thread per connection keeps the per-thread marko
+    parsers of ConverterEngine warm across connections.
+    """
+
+    request_queue_size = 128  # Listen backlog; a burst of clients beyond it would get EAGAIN on connect
+
+    def __init__(self, socket_path, workers=4, engine=None):
+        """
+        Args:
+            socket_path (str): Path of the socket to create
+            workers (int): Connections served concurrently
+            engine: Engine warmed up in every worker, see common.resolve_engine
+        """
+        from concurrent.futures import ThreadPoolExecutor  # Server side only, keeps the client's startup lean
+        from .common import warm_up
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="convert", initializer=warm_up, initargs=(engine,),
+        )
+        super().__init__(socket_path, _RequestHandler)
+
+    def server_bind(self):
+        # bind() creates the socket file; with this umask only its user can use it from the start, not after a chmod
+        umask = os.umask(0o077)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+def _remove_stale_socket(socket_path):
+    """Remove socket_path if no daemon answers on it; raise if one does or another user owns it"""
+    if not os.path.lexists(socket_path):
+        return
+    if os.lstat(socket_path).st_uid != os.getuid():
+        raise RuntimeError(f"{socket_path} is owned by another user")
+    try:
+        ping(socket_path, timeout=1.0)
+    except OSError:
+        os.unlink(socket_path)
+        return
+    raise RuntimeError(f"A daemon is already running on {socket_path}")
+
+
+def serve(socket_path=None, workers=4, engine=None):
+    """
+    Run the daemon in the foreground until interrupted or asked to shut down.
+
+    Args:
+        socket_path (str): Socket to listen on, defaults to default_socket_path()
+        workers (int): Connections served concurrently
+        engine: Engine to warm up before accepting connections
+    """
+    import signal
+    from .common import warm_up
+
+    if socket_path is None:
+        socket_path = default_socket_path()
+        ensure_private_directory(os.path.dirname(socket_path))
+    _remove_stale_socket(socket_path)
+    warm_up(engine)  # Import marko before the first client is waiting for it
+
+    # Turn SIGTERM into a normal exit so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server = ConversionServer(socket_path, workers, engine)
+    print(f"Conversion daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        print("Conversion daemon stopped")
+
+
+def _request(socket_path, header, body="", timeout=None):
+    """Send one request on a new connection and return (header, body) of the response"""
+    socket_path = socket_path or default_socket_path()
+    check_socket_owner(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        send_message(sock, header, body)
+        response = recv_message(sock)
+    if response is None:
+        raise ConnectionError("Daemon closed the connection without answering")
+    return response
+
+
+def ping(socket_path=None, timeout=None):
+    """
+    Check that a daemon answers on socket_path.
+
+    Returns:
+        int: Process id of the daemon
+
+    Raises:
+        OSError: If no daemon is reachable, or another user owns the socket
+    """
+    header, _ = _request(socket_path, {"op": "ping"}, timeout=timeout)
+    return header.get("pid")
+
+
+def shutdown(socket_path=None, timeout=None):
+    """Ask the daemon on socket_path to stop; raises OSError if none is reachable"""
+    _request(socket_path, {"op": "shutdown"}, timeout=timeout)
+
+
+def convert_via_daemon(text, engine=None, socket_path=None, timeout=30.0):
+    """
+    Convert text in the resident daemon.
+
+    Args:
+        text (str): The text to convert
+        engine (str): Engine name, see common.ENGINES; the daemon's default if None
+        socket_path (str): Socket of the daemon, defaults to default_socket_path()
+        timeout (float): Seconds to wait for the daemon
+
+    Returns:
+        str: The converted text
+
+    Raises:
+        OSError: If no daemon is reachable or another user owns the socket (fall back to converting in-process)
+        RuntimeError: If the daemon failed to convert the text
+    """
+    header = {"op": "convert"}
+    if engine is not None:
+        header["engine"] = engine
+    response, body = _request(socket_path, header, text, timeout=timeout)
+    if not response.get("ok"):
+        raise RuntimeError(response.get("error", "Conversion failed in the daemon"))
+    return body
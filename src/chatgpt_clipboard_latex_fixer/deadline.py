@@ -0,0 +1,101 @@
+"""Time budget for a single conversion.
+
+``convert_math_syntax(text, time_budget=S)`` gives up after S seconds and
+returns the text unchanged, so a pathological clipboard (a log dump, a shell
+session) cannot keep the listener busy. The converter's own patterns and
+scans are linear in the input, and a ``Deadline`` is checked between blocks
+and regions. Marko's inline parser is not linear for every input, though,
+and a single huge paragraph is parsed in one call; that call runs
+``interruptible``: if the budget runs out meanwhile, a timer thread raises
+``ConversionTimeout`` inside it (CPython's asynchronous exceptions, which
+take effect between bytecodes). Nothing is armed outside those calls.
+"""
+import threading
+import time
+
+
+class ConversionTimeout(Exception):
+    """Raised inside a conversion that ran past its time budget"""
+
+
+def _set_async_exc(thread_id, exc_type):
+    """Raise exc_type in the thread at its next bytecode, or cancel a pending one with None"""
+    try:
+        import ctypes
+
+        set_async_exc = ctypes.pythonapi.PyThreadState_SetAsyncExc
+    except (ImportError, AttributeError):
+        return False  # Not CPython: only the checks between blocks apply
+    return set_async_exc(ctypes.c_ulong(thread_id), ctypes.py_object(exc_type) if exc_type else None) == 1
+
+
+class Deadline:
+    """Point in time after which the conversion running in the creating thread must stop"""
+
+    def __init__(self, seconds):
+        """
+        Args:
+            seconds (float): Time budget from now
+        """
+        self.expires = time.perf_counter() + seconds
+        self._thread_id = threading.get_ident()
+        self._lock = threading.Lock()  # Orders the timer's interrupt against leaving interruptible()
+        self._armed = False  # Inside an interruptible() block
+        self._sent = False  # An interrupt was raised and may not have been delivered yet
+        self._timer = None
+
+    def expired(self):
+        return time.perf_counter() >= self.expires
+
+    def check(self):
+        """
+        Raises:
+            ConversionTimeout: If the budget is used up
+        """
+        if time.perf_counter() >= self.expires:
+            raise ConversionTimeout(f"time budget exceeded by {time.perf_counter() - self.expires:.3f}s")
+
+    def interruptible(self):
+        """Context manager for a call that may be stopped from another thread once the budget is used up"""
+        return _Interruptible(self)
+
+    def _interrupt(self):
+        with self._lock:
+            if self._armed and not self._sent:
+                self._sent = _set_async_exc(self._thread_id, ConversionTimeout)
+
+    def _arm(self):
+        self.check()
+        if self._timer is None:
+            self._timer = threading.Timer(max(0.0, self.expires - time.perf_counter()), self._interrupt)
+            self._timer.daemon = True
+            self._timer.start()
+        with self._lock:
+            self._armed = True
+
+    def _disarm(self):
+        with self._lock:
+            self._armed = False
+            if self._sent:
+                # Still pending if the call returned before the interpreter delivered it
+                _set_async_exc(self._thread_id, None)
+                self._sent = False
+
+    def close(self):
+        """Stop the timer; call when the conversion is over"""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._disarm()
+
+
+class _Interruptible:
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def __enter__(self):
+        self.deadline._arm()
+        return self.deadline
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.deadline._disarm()
+        return False
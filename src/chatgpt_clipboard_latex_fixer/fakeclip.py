@@ -0,0 +1,94 @@
+"""In-memory clipboard backend for tests and benchmarks.
+
+``FakeClipboard`` behaves like NSPasteboard: it holds one text value, or a
+non-text item such as an image, and a change counter that every write
+increments. Like a real backend it hands out a fresh copy of the text on
+every read, while its metadata (change count, whether text is on offer, text
+length) costs nothing to look at. ``FakeClipboardListener`` polls it through
+the same ``BaseClipboardListener.poll`` loop and scheduler the macOS listener
+uses, so polling, probing, change detection and write-back loop suppression
+can be exercised on any platform without a display.
+"""
+import threading
+
+from .base_clipboard_listener import BaseClipboardListener, ClipboardProbe
+
+
+class FakeClipboard:
+    """Thread-safe in-memory clipboard with a change counter"""
+
+    def __init__(self, text=None):
+        self._lock = threading.Lock()
+        self.text = text
+        self.data = None  # Non-text item (bytes), e.g. a copied image
+        self.change_count = 0
+        self.reads = 0  # Calls to paste(), i.e. full clipboard fetches
+        self.probes = 0  # Calls to probe(), metadata only
+        self.writes = 0
+
+    def copy(self, text):
+        """Replace the clipboard content, as an app or the listener would"""
+        with self._lock:
+            self.text = text
+            self.data = None
+            self.change_count += 1
+            self.writes += 1
+
+    def copy_data(self, data):
+        """Replace the clipboard content with a non-text item, as copying an image or a file would"""
+        with self._lock:
+            self.text = None
+            self.data = data
+            self.change_count += 1
+            self.writes += 1
+
+    def paste(self):
+        """Return the clipboard text, None for a non-text item"""
+        with self._lock:
+            self.reads += 1
+            if self.text is None:
+                return None
+            # A fresh string per read, as a backend decodes the transferred bytes every time
+            return self.text.encode("utf-8", "surrogatepass").decode("utf-8", "surrogatepass")
+
+    def probe(self):
+        """Return (change count, whether text is on offer, text length) without reading the content"""
+        with self._lock:
+            self.probes += 1
+            return self.change_count, self.text is not None, len(self.text) if self.text is not None else None
+
+
+class FakeClipboardListener(BaseClipboardListener):
+    """Polling listener over a FakeClipboard"""
+
+    def __init__(self, clipboard=None, scheduler=None):
+        """
+        Args:
+            clipboard (FakeClipboard): Clipboard to watch, a new empty one by default
+            scheduler (PollScheduler): Poll intervals, the base listener's default if None
+        """
+        super().__init__()
+        self.clipboard = clipboard if clipboard is not None else FakeClipboard()
+        if scheduler is not None:
+            self.scheduler = scheduler
+
+    def get_clipboard_change_count(self):
+        return self.clipboard.change_count
+
+    def probe_clipboard(self):
+        """Change count, whether text is on offer and its exact length, from the fake clipboard's metadata"""
+        return ClipboardProbe(*self.clipboard.probe())
+
+    def get_clipboard_text(self):
+        """Get text content from clipboard"""
+        return self.clipboard.paste()
+
+    def set_clipboard_text(self, text):
+        """Set text content to clipboard"""
+        self.clipboard.copy(text)
+        return True
+
+    def start(self):
+        """Poll the fake clipboard until stop() is called"""
+        self.warm_up_in_background()
+        self.poll()
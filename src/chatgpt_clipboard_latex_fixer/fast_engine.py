@@ -0,0 +1,532 @@
+"""Single-pass math delimiter engine, a faster alternative to the marko engine.
+
+The marko engine parses the whole document into a CommonMark tree and renders
+every paragraph, list and heading back to Markdown just to rewrite a few
+delimiters. This engine walks the lines once, tracking only what decides where
+math can occur (fenced and indented code, HTML blocks, headings, block quote
+and list prefixes, paragraph boundaries), and scans each paragraph with the
+same patterns the marko elements use. The result is a list of edits on the
+original text, so everything that is not math is left byte-for-byte intact.
+
+Only the stretches around candidate delimiters are walked line by line: they
+are found with ``str.find``, and each is widened to lines where the walk is
+known to start in a clean state (column 0 after a blank line, outside fences
+and ``[`` ... ``]`` spans). The Python-level work thus grows with the amount
+of math rather than with the size of the document.
+
+Select it with ``convert_math_syntax(text, engine="fast")``. ``math_edits``
+returns the edits themselves, for callers that only need to know whether and
+where text would change, and ``splice`` applies them.
+"""
+import re
+from bisect import bisect_left, bisect_right
+
+from .patterns import (
+    INLINE_MATH_PATTERN, INLINE_BLOCK_MATH_PATTERN, INLINE_MATH_PRIORITY, INLINE_BLOCK_MATH_PRIORITY,
+    LITERAL_PATTERN, CONTAINER_PREFIX_PATTERN,
+)
+from .prescan import needs_conversion
+
+
+# Container prefix of a line: block quote markers, list markers and indentation
+_PREFIX_RE = re.compile(CONTAINER_PREFIX_PATTERN)
+_MARKER_RE = re.compile(r'[-*+]|\d{1,9}[.)]')
+_FENCE_RE = re.compile(r'(`{3,}|~{3,})')
+_HEADING_RE = re.compile(r'#{1,6}(?:[ \t]|$)')
+_THEMATIC_RE = re.compile(r' {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_SETEXT_RE = re.compile(r' {0,3}(?:=+|-+)[ \t]*$')
+_HTML_RAW_RE = re.compile(r'<(?:(!--)|(script|pre|style|textarea)\b)', re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r'</?[A-Za-z][A-Za-z0-9-]*(?:[\s/>]|$)')
+
+# Inline patterns, identical to the marko elements so both engines agree on what is math
+_LITERAL_RE = re.compile(LITERAL_PATTERN)
+_BACKTICKS_RE = re.compile(r'`+')
+_INLINE_MATH_RE = re.compile(INLINE_MATH_PATTERN)
+_INLINE_BLOCK_MATH_RE = re.compile(INLINE_BLOCK_MATH_PATTERN)
+
+# A line starting at column 0 after a blank line: the line walk is in the same state there whatever came
+# before, unless a fence or BlockMath is open
+_CUT_RE = re.compile(r'\n[ \t\r]*\n(?=[^ \t\r\n])')
+# Only whitespace up to the end of the line; matching it scans no further than that whitespace
+_REST_BLANK_RE = re.compile(r'[^\S\n]*(?:\n|\Z)')
+
+# Token kinds; overlapping tokens are resolved like marko does, by start and priority
+_LITERAL, _CODE, _INLINE, _INLINE_BLOCK = range(4)
+_PRIORITY = {_LITERAL: 7, _CODE: 7, _INLINE: INLINE_MATH_PRIORITY, _INLINE_BLOCK: INLINE_BLOCK_MATH_PRIORITY}
+
+
+def _find_all(text, needle):
+    """Offsets of the non-overlapping occurrences of needle, found with str.find (much faster than a regex)"""
+    positions = []
+    find = text.find
+    step = len(needle)
+    pos = find(needle)
+    while pos != -1:
+        positions.append(pos)
+        pos = find(needle, pos + step)
+    return positions
+
+
+def _line_end(text, pos):
+    end = text.find('\n', pos)
+    return len(text) if end == -1 else end
+
+
+def _code_spans(body):
+    """
+    (start, end) of the code spans in body, as marko's CodeSpan pattern finds them.
+
+    A run of backticks opens a span closed by the next run of the same length.
+    The pattern itself rescans the rest of the body from every run that has no
+    closer; pairing the runs through a next-run-of-the-same-length table takes
+    one pass.
+    """
+    runs = [(m.start(), m.end()) for m in _BACKTICKS_RE.finditer(body)]
+    following = [None] * len(runs)  # Index of the next run of the same length
+    last_of_length = {}
+    for index in range(len(runs) - 1, -1, -1):
+        length = runs[index][1] - runs[index][0]
+        following[index] = last_of_length.get(length)
+        last_of_length[length] = index
+    spans = []
+    index = 0
+    while index < len(runs):
+        closing = following[index]
+        if closing is None:
+            index += 1
+            continue
+        spans.append((runs[index][0], runs[closing][1]))
+        index = closing + 1
+    return spans
+
+
+def _indent_width(text, start, end):
+    """Column width of the whitespace in text[start:end], tabs counting to the next multiple of 4"""
+    width = 0
+    for ch in text[start:end]:
+        if ch == '\t':
+            width += 4 - width % 4
+        elif ch == ' ':
+            width += 1
+        else:
+            break
+    return width
+
+
+class FastEngine:
+    """Hand-written math converter with the ConverterEngine.convert interface"""
+
+    # Output keeps all non-math text as is, so convert_math_syntax needs no block splitting or cache
+    edits_in_place = True
+
+    def convert(self, text, deadline=None):
+        """
+        Convert text in one pass over its lines.
+
+        Args:
+            text (str): Markdown text
+            deadline (Deadline): Checked between regions, if given
+
+        Returns:
+            str: text with math delimiters normalized and everything else unchanged
+        """
+        return splice(text, self.edits(text, deadline))
+
+    def edits(self, text, deadline=None):
+        """
+        Return the (start, end, replacement) edits that convert text, in order.
+
+        Edits that would not change anything (math that is already normalized)
+        are left out, so an empty list means text converts to itself.
+
+        Args:
+            text (str): Markdown text
+            deadline (Deadline): Checked between regions, if given
+
+        Returns:
+            list: Non-overlapping edits sorted by start offset
+
+        Raises:
+            ConversionTimeout: If deadline runs out
+        """
+        if not needs_conversion(text):
+            return []  # Regex-speed scan; the line walk below only runs when a delimiter may change
+        regions = self._regions(text)
+        if regions is None:
+            regions = [(0, len(text))]
+        edits = []
+        for start, end in regions:
+            if deadline is not None:
+                deadline.check()
+            edits.extend(
+                edit for span in self.math_spans(text, start, end) for edit in span[4]
+                if text[edit[0]:edit[1]] != edit[2]
+            )
+        return edits
+
+    @staticmethod
+    def _hazards(text, brackets):
+        """
+        Lines that can keep a construct open across blank lines, in order: fences and "[" / "]"
+        lines (BlockMath), plus HTML block starts, each right behind its container prefix.
+
+        Returns:
+            list: (line start, token start, token) tuples
+        """
+        hazards = []
+        for needle in ('```', '~~~', '<'):
+            for pos in _find_all(text, needle):
+                hazards.append((pos, needle))
+        for pos in brackets:
+            if _REST_BLANK_RE.match(text, pos + 1):
+                hazards.append((pos, text[pos]))
+        hazards.sort()
+        lines = []
+        line_end = -1
+        for pos, token in hazards:
+            if pos <= line_end:
+                # Behind an earlier token of the line (or the rest of a longer fence), so not
+                # right behind the container prefix, which cannot extend past that token
+                continue
+            line_start = text.rfind('\n', 0, pos) + 1
+            line_end = _line_end(text, pos)
+            if _PREFIX_RE.match(text, line_start, pos).end() != pos:
+                continue  # Not at the start of the line's content
+            if token[0] in '`~':
+                run_end = pos
+                while run_end < len(text) and text[run_end] == token[0]:
+                    run_end += 1
+                token = text[pos:run_end]
+            lines.append((line_start, pos, token))
+        return lines
+
+    def _open_ranges(self, text, brackets):
+        """
+        Ranges where a fence or a "[" line may keep a construct open across blank lines.
+
+        Pairs fences and brackets the way the line walk does, erring on the side of
+        longer ranges. Returns None when that is not possible cheaply (HTML blocks,
+        indented fences, fences inside a "[" span), and the whole text must be walked.
+        """
+        ranges = []
+        fence = None  # (character, length, start) of the open fence
+        bracket = None  # Start of the open "[" line
+        for line_start, pos, token in self._hazards(text, brackets):
+            if token == '<':
+                return None
+            if token[0] in '`~':
+                if fence is not None:
+                    if token[0] == fence[0] and len(token) >= fence[1] \
+                            and _REST_BLANK_RE.match(text, pos + len(token)):
+                        ranges.append((fence[2], pos))
+                        fence = None
+                    continue
+                if bracket is not None:
+                    return None
+                prefix = text[line_start:pos]
+                if '>' not in prefix and not _MARKER_RE.search(prefix) and _indent_width(prefix, 0, len(prefix)) >= 4:
+                    return None  # Indented code or a fence, depending on list context
+                fence = (token[0], len(token), line_start)
+            elif fence is not None:
+                continue
+            elif token == '[':
+                if bracket is None:
+                    bracket = line_start
+            elif bracket is not None:
+                ranges.append((bracket, pos))
+                bracket = None
+        if fence is not None or bracket is not None:
+            ranges.append((fence[2] if fence is not None else bracket, len(text)))
+        return ranges
+
+    def _regions(self, text):
+        """
+        Return (start, end) ranges that hold all the math of text, each starting where the
+        line walk starts from a clean state, or None if the whole text must be walked.
+        """
+        brackets = sorted(_find_all(text, '[') + _find_all(text, ']'))
+        open_ranges = self._open_ranges(text, brackets)
+        if open_ranges is None:
+            return None
+        open_starts = [start for start, _ in open_ranges]
+
+        def is_cut(pos):
+            """Whether the walk starts clean at the line starting at pos"""
+            if pos == 0:
+                return True
+            if text[pos] in ' \t\r\n' or text[text.rfind('\n', 0, pos - 1) + 1:pos].strip():
+                return False  # Indented, blank, or not after a blank line
+            index = bisect_right(open_starts, pos) - 1
+            return index < 0 or open_ranges[index][1] < pos
+
+        # Where math can start: "$", "\(", or a "[" ending a line (BlockMath, InlineBlockMath, "\[")
+        candidates = _find_all(text, '$') + _find_all(text, '\\(') + [
+            pos for pos in brackets if text[pos] == '[' and _REST_BLANK_RE.match(text, pos + 1)
+        ]
+        candidates.sort()
+        regions = []
+        index = 0
+        while index < len(candidates):
+            # Walk back line by line to a clean start, and search forward for the next one
+            start = text.rfind('\n', 0, candidates[index]) + 1
+            while not is_cut(start):
+                start = text.rfind('\n', 0, start - 1) + 1
+            match = _CUT_RE.search(text, candidates[index])
+            while match and not is_cut(match.end()):
+                match = _CUT_RE.search(text, match.end())
+            end = match.end() if match else len(text)
+            regions.append((start, end))
+            index = bisect_left(candidates, end, index)
+        return regions
+
+    def math_spans(self, text, start=0, end=None):
+        """
+        Find the math in text.
+
+        Args:
+            text (str): Markdown text
+            start (int): Offset of the line to start at; the walk assumes nothing is open there
+            end (int): Offset to stop at, the end of text by default
+
+        Returns:
+            list: (start, end, kind, content, edits) tuples in document order,
+            where kind is "display" or "inline" and edits rewrite that span
+        """
+        spans = []
+        paragraph = []  # (content start, line end) of the lines of the current paragraph
+
+        def flush_paragraph():
+            if paragraph:
+                spans.extend(self._scan_inline(text, paragraph))
+                del paragraph[:]
+
+        lines = self._lines(text, start, len(text) if end is None else end)
+        fence = None  # (fence character, minimum length) inside fenced code
+        html_end = None  # Closing text of the raw HTML block we are in, '' for "until a blank line"
+        list_indent = 0  # Content column of the innermost open list item
+        quote_depth = 0
+        unclosed = False  # A "[" line found no closing "]" line; no later one will either
+        i = 0
+        while i < len(lines):
+            start, end = lines[i]
+            i += 1
+            prefix_end = _PREFIX_RE.match(text, start, end).end()
+            rest = text[prefix_end:end]
+            blank = not rest.strip()
+
+            if fence is not None:
+                match = _FENCE_RE.match(rest)
+                if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= fence[1] \
+                        and not rest[match.end():].strip():
+                    fence = None
+                continue
+            if html_end is not None:
+                if (html_end == '' and blank) or (html_end and html_end in rest.lower()):
+                    html_end = None
+                continue
+            if blank:
+                flush_paragraph()
+                continue
+
+            prefix = text[start:prefix_end]
+            has_marker = _MARKER_RE.search(prefix.replace('>', ' ')) is not None
+            depth = prefix.count('>')
+            indent = _indent_width(text, start, prefix_end)
+            if has_marker or depth != quote_depth:
+                flush_paragraph()
+            quote_depth = depth
+            if has_marker:
+                list_indent = len(prefix)
+            elif not paragraph and indent < list_indent:
+                list_indent = 0
+
+            # Indented code: after a blank line or another block, 4+ columns past the list content
+            if not paragraph and not has_marker and not depth and indent >= list_indent + 4:
+                continue
+
+            if _THEMATIC_RE.match(text, start, end) or (paragraph and _SETEXT_RE.match(text, start, end)):
+                flush_paragraph()
+                continue
+            match = _FENCE_RE.match(rest)
+            if match:
+                flush_paragraph()
+                fence = (match.group(1)[0], len(match.group(1)))
+                continue
+            if _HEADING_RE.match(rest):
+                flush_paragraph()
+                paragraph.append((prefix_end, end))
+                flush_paragraph()
+                continue
+            if not paragraph and rest.startswith('<'):
+                match = _HTML_RAW_RE.match(rest)
+                if match:
+                    end_text = '-->' if match.group(1) else f'</{match.group(2).lower()}>'
+                    if end_text not in rest.lower()[match.end():]:
+                        html_end = end_text
+                    continue
+                if _HTML_TAG_RE.match(rest):
+                    html_end = ''
+                    continue
+            if not paragraph and not unclosed and rest.strip() == '[':
+                closing = self._find_block_math_end(text, lines, i)
+                unclosed = closing is None
+                if closing is not None:
+                    spans.append(self._block_math_span(text, prefix_end, lines, i, closing))
+                    i = closing + 1
+                    continue
+            paragraph.append((prefix_end, end))
+        flush_paragraph()
+        return spans
+
+    @staticmethod
+    def _lines(text, start, length):
+        """Return (start, end) of every line in text[start:length], end excluding the newline"""
+        lines = []
+        while start < length:
+            end = text.find('\n', start, length)
+            if end == -1:
+                lines.append((start, length))
+                break
+            lines.append((start, end))
+            start = end + 1
+        return lines
+
+    @staticmethod
+    def _find_block_math_end(text, lines, first):
+        """Index of the "]" line closing a BlockMath opened before lines[first], or None"""
+        for index in range(first, len(lines)):
+            start, end = lines[index]
+            content_start = _PREFIX_RE.match(text, start, end).end()
+            if text[content_start:end].strip() == ']':
+                return index
+        return None
+
+    @staticmethod
+    def _block_math_span(text, open_at, lines, first, closing):
+        """Span for a BlockMath: swap the "[" and "]" lines' brackets for "$$", keep the lines between"""
+        open_bracket = text.index('[', open_at)
+        close_start, close_end = lines[closing]
+        close_bracket = text.index(']', _PREFIX_RE.match(text, close_start, close_end).end())
+        inner_start = lines[first][0] if first < closing else close_start
+        content = text[inner_start:close_start].strip()
+        return (
+            open_bracket, close_bracket + 1, "display", content,
+            [(open_bracket, open_bracket + 1, "$$"), (close_bracket, close_bracket + 1, "$$")],
+        )
+
+    @staticmethod
+    def _scan_inline(text, paragraph):
+        """Find the inline math of one paragraph given as (content start, line end) pairs"""
+        # Build the inline body the way marko does: line contents joined by newlines
+        body_parts = []
+        body_starts = []
+        offset = 0
+        for content_start, line_end in paragraph:
+            body_starts.append(offset)
+            body_parts.append(text[content_start:line_end])
+            offset += line_end - content_start + 1
+        body = '\n'.join(body_parts)
+        if '$' not in body and '[' not in body and '\\(' not in body:
+            return []
+
+        def to_text(pos):
+            line = bisect_right(body_starts, pos) - 1
+            return paragraph[line][0] + pos - body_starts[line]
+
+        tokens = []
+        if '\\' in body:
+            tokens.extend((m.start(), m.end(), _LITERAL, m) for m in _LITERAL_RE.finditer(body))
+        if '`' in body:
+            tokens.extend((start, end, _CODE, None) for start, end in _code_spans(body))
+        if '$' in body or '\\(' in body:
+            tokens.extend((m.start(), m.end(), _INLINE, m) for m in _INLINE_MATH_RE.finditer(body))
+        if '[' in body:
+            tokens.extend((m.start(), m.end(), _INLINE_BLOCK, m) for m in _INLINE_BLOCK_MATH_RE.finditer(body))
+        if not tokens:
+            return []
+        tokens.sort(key=lambda token: token[0])
+
+        # Resolve overlaps: an earlier token wins unless the later one has a higher priority
+        resolved = []
+        prev = tokens[0]
+        for cur in tokens[1:]:
+            if prev[1] <= cur[0]:
+                resolved.append(prev)
+                prev = cur
+            elif _PRIORITY[prev[2]] < _PRIORITY[cur[2]]:
+                prev = cur
+        resolved.append(prev)
+
+        spans = []
+        for start, end, kind, match in resolved:
+            if kind == _INLINE:
+                content = match.group(1) if match.group(1) else match.group(2)
+                content = content.strip() or content[-1]  # As InlineMath._set_content does
+                text_start, text_end = to_text(start), to_text(end)
+                spans.append((text_start, text_end, "inline", content, [(text_start, text_end, f"${content}$")]))
+            elif kind == _INLINE_BLOCK:
+                content = match.group(1) if match.group(1) else match.group(2)
+                bracket = 2 if body[start] == '\\' else 1
+                text_start, text_end = to_text(start), to_text(end - bracket) + bracket
+                # Pad the inner line with blank lines, as marko renders it; they repeat the
+                # container prefix so a block quote does not end there
+                inner = to_text(start + bracket + 1)
+                inner_prefix = text[text.rfind('\n', 0, inner) + 1:inner]
+                close_line = text.rfind('\n', 0, text_end - bracket) + 1
+                close_prefix = text[close_line:text_end - bracket]
+                spans.append((
+                    text_start, text_end, "display", content.strip(),
+                    [
+                        (text_start, text_start + bracket, "$$\n" + inner_prefix.rstrip()),
+                        (close_line, text_end, close_prefix.rstrip() + "\n" + close_prefix + "$$"),
+                    ],
+                ))
+        return spans
+
+
+def splice(text, edits):
+    """
+    Apply edits to text in a single join of slices of the original.
+
+    Args:
+        text (str): The original text
+        edits (list): (start, end, replacement) tuples sorted by start, not overlapping
+
+    Returns:
+        str: The edited text; text itself when there are no edits
+
+    Raises:
+        ValueError: If the edits are out of order or overlap
+    """
+    if not edits:
+        return text
+    parts = []
+    pos = 0
+    for start, end, replacement in edits:
+        if start < pos or end < start:
+            raise ValueError(f"Edit ({start}, {end}) overlaps the previous one or is reversed")
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(text[pos:])
+    return ''.join(parts)
+
+
+# Shared instance used for engine="fast"
+fast_engine = FastEngine()
+
+
+def math_edits(text):
+    """
+    Return the (start, end, replacement) edits that normalize the math in text.
+
+    Only the delimiters of math spans are edited; splice(text, math_edits(text))
+    equals convert_math_syntax(text, engine="fast").
+
+    Args:
+        text (str): Markdown text
+
+    Returns:
+        list: Non-overlapping edits sorted by start offset, empty if nothing changes
+    """
+    return fast_engine.edits(text)
@@ -0,0 +1,293 @@
+"""Bounded on-disk history of clipboard conversions, for undo.
+
+Listeners append (timestamp, original, converted) after each write-back, so a
+wrong conversion can be taken back with the ``undo`` command even though the
+original text only ever lived on the clipboard. The history is one file of
+fixed size, memory-mapped:
+
+- a header with the geometry and the sequence numbers of the oldest and next
+  record, the write position and the last undone record;
+- an index of ``max_records`` slots, slot ``seq % max_records`` holding the
+  offset and length of record ``seq``, for random access without a scan;
+- a data ring holding the records back to back. A record that does not fit
+  before the end of the ring starts again at offset 0, and the records it
+  overwrites are dropped from the front.
+
+Appending touches the new record, one index slot and the header, plus the
+records it pushes out, so it costs the same however full the file is.
+Payloads above ``compress_threshold`` bytes are stored zlib-compressed when
+that makes them smaller. Records carry a CRC, so a record torn by a crash
+reads as missing instead of as garbage.
+"""
+import binascii
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+HistoryRecord = namedtuple("HistoryRecord", "seq timestamp original converted")
+
+_MAGIC = b"CLPHIST1"
+_VERSION = 1
+# Header fields after the magic, each an unsigned 64-bit integer at 8 + 8 * index
+_FIELDS = ("version", "slots", "capacity", "next_seq", "oldest_seq", "write_pos", "undone_seq")
+_FIELD = struct.Struct("<Q")
+_HEADER_SIZE = 64
+_SLOT = struct.Struct("<QQQ")  # seq, offset, length
+# seq, timestamp, flags, stored original length, stored converted length, CRC of both payloads, original digest
+_RECORD = struct.Struct("<QdB3xIII8s")
+_ORIGINAL_COMPRESSED = 1
+_CONVERTED_COMPRESSED = 2
+
+DEFAULT_SIZE = 16 * 1024 * 1024
+DEFAULT_MAX_RECORDS = 1024
+DEFAULT_COMPRESS_THRESHOLD = 4096
+
+
+def default_state_dir():
+    """Per-user state directory: XDG_STATE_HOME on Linux, LOCALAPPDATA on Windows, Application Support on macOS"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+    return os.path.join(base, "chatgpt-clipboard-latex-fixer")
+
+
+def default_history_path():
+    """Per-user history file in default_state_dir()"""
+    return os.path.join(default_state_dir(), "history.bin")
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+class ConversionHistory:
+    """Fixed-size ring buffer of conversion records in a memory-mapped file"""
+
+    def __init__(self, path, size=DEFAULT_SIZE, max_records=DEFAULT_MAX_RECORDS,
+                 compress_threshold=DEFAULT_COMPRESS_THRESHOLD, create=True):
+        """
+        Args:
+            path (str): History file, created with mode 0600; an existing one with other geometry is started over
+            size (int): Total file size in bytes, header and index included
+            max_records (int): Index slots, the most records kept whatever their size
+            compress_threshold (int): Payloads of more bytes than this are compressed
+            create (bool): Create the file if missing; if False, open an existing file with
+                whatever geometry it has
+
+        Raises:
+            FileNotFoundError: If create is False and there is no history at path
+            ValueError: If create is False and path is not a history file, or size is too small
+        """
+        self.path = path
+        self.compress_threshold = compress_threshold
+        self._lock = threading.Lock()
+        if not create:
+            self._file = open(path, "r+b")
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            # Created readable by the user only, since it holds clipboard text; an existing file is not truncated
+            self._file = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o600), "r+b")
+        try:
+            self._map(size, max_records, create)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _map(self, size, max_records, create):
+        file_size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0) if file_size >= _HEADER_SIZE else None
+        if self._mm is not None and self._mm[:8] == _MAGIC and self._get("version") == _VERSION:
+            slots, capacity = self._get("slots"), self._get("capacity")
+            if file_size == _HEADER_SIZE + slots * _SLOT.size + capacity:
+                if not create or (slots == max_records and file_size == size):
+                    self.slots, self.capacity = slots, capacity
+                    return
+        if not create:
+            raise ValueError(f"{self.path} is not a conversion history file")
+        # New file, or one with other geometry: start over
+        capacity = size - _HEADER_SIZE - max_records * _SLOT.size
+        if capacity < _RECORD.size:
+            raise ValueError(f"History size {size} is too small for {max_records} records")
+        if self._mm is not None:
+            self._mm.close()
+        self._file.truncate(0)
+        self._file.truncate(size)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._mm[:8] = _MAGIC
+        self.slots, self.capacity = max_records, capacity
+        for name, value in zip(_FIELDS, (_VERSION, max_records, capacity, 1, 1, 0, 0)):
+            self._set(name, value)
+
+    def _get(self, name):
+        return _FIELD.unpack_from(self._mm, 8 + 8 * _FIELDS.index(name))[0]
+
+    def _set(self, name, value):
+        _FIELD.pack_into(self._mm, 8 + 8 * _FIELDS.index(name), value)
+
+    def _slot_offset(self, seq):
+        return _HEADER_SIZE + (seq % self.slots) * _SLOT.size
+
+    def _data_offset(self, offset):
+        return _HEADER_SIZE + self.slots * _SLOT.size + offset
+
+    def _pack(self, data, compressed_flag):
+        if len(data) > self.compress_threshold:
+            import zlib  # Only loaded once a large paste is recorded
+
+            packed = zlib.compress(data, 1)
+            if len(packed) < len(data):
+                return packed, compressed_flag
+        return data, 0
+
+    def append(self, original, converted, timestamp=None):
+        """
+        Record a conversion, dropping the oldest records to make room.
+
+        Args:
+            original (str): Clipboard text before conversion
+            converted (str): Text written back
+            timestamp (float): Seconds since the epoch, defaults to now
+
+        Returns:
+            int: The record's sequence number, or None if it is larger than the whole ring
+        """
+        raw = original.encode("utf-8", "surrogatepass")
+        digest = _digest(raw)
+        stored_original, flags = self._pack(raw, _ORIGINAL_COMPRESSED)
+        stored_converted, converted_flags = self._pack(converted.encode("utf-8", "surrogatepass"),
+                                                       _CONVERTED_COMPRESSED)
+        flags |= converted_flags
+        length = _RECORD.size + len(stored_original) + len(stored_converted)
+        if length > self.capacity:
+            return None
+        crc = binascii.crc32(stored_converted, binascii.crc32(stored_original))
+        with self._lock:
+            seq = self._get("next_seq")
+            end_of_lap = self._get("write_pos")
+            pos = end_of_lap if end_of_lap + length <= self.capacity else 0
+            self._drop_overwritten(seq, pos, length, end_of_lap if pos == 0 else None)
+            start = self._data_offset(pos)
+            _RECORD.pack_into(
+                self._mm, start, seq, time.time() if timestamp is None else timestamp, flags,
+                len(stored_original), len(stored_converted), crc, digest,
+            )
+            body = start + _RECORD.size
+            self._mm[body:body + len(stored_original)] = stored_original
+            body += len(stored_original)
+            self._mm[body:body + len(stored_converted)] = stored_converted
+            _SLOT.pack_into(self._mm, self._slot_offset(seq), seq, pos, length)
+            # Header last: a reader never sees a sequence number before its record is complete
+            self._set("write_pos", pos + length)
+            self._set("undone_seq", 0)
+            self._set("next_seq", seq + 1)
+        return seq
+
+    def _drop_overwritten(self, seq, pos, length, wrapped_at):
+        """Advance oldest_seq past the records the write of [pos, pos + length) makes invalid"""
+        oldest = self._get("oldest_seq")
+        while oldest < seq:
+            slot_seq, offset, old_length = _SLOT.unpack_from(self._mm, self._slot_offset(oldest))
+            if slot_seq != oldest or seq - oldest >= self.slots:
+                pass  # Its index slot is taken by the new record
+            elif wrapped_at is not None and offset >= wrapped_at:
+                pass  # In the tail of the previous lap, older than what is overwritten at offset 0
+            elif offset < pos + length and pos < offset + old_length:
+                pass  # Overwritten
+            else:
+                break
+            oldest += 1
+        self._set("oldest_seq", oldest)
+
+    def __len__(self):
+        return self._get("next_seq") - self._get("oldest_seq")
+
+    def _read_header(self, seq):
+        """(data offset, record header fields) of record seq, or None if it is gone"""
+        if not self._get("oldest_seq") <= seq < self._get("next_seq"):
+            return None
+        slot_seq, offset, length = _SLOT.unpack_from(self._mm, self._slot_offset(seq))
+        if slot_seq != seq or offset + length > self.capacity:
+            return None
+        start = self._data_offset(offset)
+        fields = _RECORD.unpack_from(self._mm, start)
+        if fields[0] != seq or _RECORD.size + fields[3] + fields[4] != length:
+            return None
+        return start, fields
+
+    def get(self, seq):
+        """
+        Read one record by sequence number.
+
+        Returns:
+            HistoryRecord: The record, or None if it was overwritten or is damaged
+        """
+        header = self._read_header(seq)
+        if header is None:
+            return None
+        start, (_, timestamp, flags, original_length, converted_length, crc, _) = header
+        body = start + _RECORD.size
+        stored_original = self._mm[body:body + original_length]
+        stored_converted = self._mm[body + original_length:body + original_length + converted_length]
+        if binascii.crc32(stored_converted, binascii.crc32(stored_original)) != crc:
+            return None
+        if flags & (_ORIGINAL_COMPRESSED | _CONVERTED_COMPRESSED):
+            import zlib
+
+            if flags & _ORIGINAL_COMPRESSED:
+                stored_original = zlib.decompress(stored_original)
+            if flags & _CONVERTED_COMPRESSED:
+                stored_converted = zlib.decompress(stored_converted)
+        return HistoryRecord(
+            seq, timestamp,
+            stored_original.decode("utf-8", "surrogatepass"), stored_converted.decode("utf-8", "surrogatepass"),
+        )
+
+    def latest(self, back=1):
+        """
+        Read the back-th most recent record, 1 for the last one.
+
+        Returns:
+            HistoryRecord: The record, or None if the history does not reach that far
+        """
+        return self.get(self._get("next_seq") - back)
+
+    def mark_undone(self, seq):
+        """Remember that record seq was undone, so listeners leave its original alone when it is copied back"""
+        self._set("undone_seq", seq)
+
+    def is_undone(self, text):
+        """
+        Check whether text is the original of the last undone record.
+
+        Costs one header read unless an undo happened since the last append.
+        """
+        seq = self._get("undone_seq")
+        if not seq:
+            return False
+        header = self._read_header(seq)
+        return header is not None and header[1][6] == _digest(text.encode("utf-8", "surrogatepass"))
+
+    def close(self):
+        """Unmap and close the file"""
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm = None
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
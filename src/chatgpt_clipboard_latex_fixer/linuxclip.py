@@ -0,0 +1,391 @@
+"""Event-driven clipboard listeners for Linux.
+
+Neither backend polls: the X11 listener blocks on the X connection until the
+XFixes extension reports a new CLIPBOARD owner, and the Wayland listener blocks
+on ``wl-paste --watch``, which is notified through the data-control protocol.
+Both read the clipboard only when it offers a text type, so copying images or
+files costs one TARGETS round-trip and nothing else.
+"""
+import os
+import select
+import shutil
+import subprocess
+import time
+
+from .base_clipboard_listener import BaseClipboardListener, ClipboardProbe
+
+
+# Targets / MIME types holding text, in order of preference
+TEXT_TARGETS = ("UTF8_STRING", "text/plain;charset=utf-8", "STRING", "TEXT", "text/plain")
+
+
+class X11ClipboardListener(BaseClipboardListener):
+    """CLIPBOARD listener for X11 based on XFixes selection-owner notifications"""
+
+    convert_in_background = False  # The X connection is used by the event loop thread only
+
+    def __init__(self, display_name=None, timeout=2.0):
+        """
+        Args:
+            display_name (str): X display to connect to, defaults to $DISPLAY
+            timeout (float): Seconds to wait for the clipboard owner to answer a request
+        """
+        # pip install python-xlib
+        try:
+            from Xlib import X, display as xdisplay
+            from Xlib.ext import xfixes
+        except ImportError:
+            raise NotImplementedError("The X11 clipboard listener needs python-xlib (pip install python-xlib)")
+        super().__init__()
+        self.X = X
+        self.timeout = timeout
+        self.display = xdisplay.Display(display_name)
+        if not self.display.has_extension("XFIXES"):
+            raise NotImplementedError("The X server does not support the XFIXES extension")
+        self.display.xfixes_query_version()
+
+        self.CLIPBOARD = self.display.get_atom("CLIPBOARD")
+        self.TARGETS = self.display.get_atom("TARGETS")
+        self.INCR = self.display.get_atom("INCR")
+        self.PROPERTY = self.display.get_atom("CHATGPT_LATEX_FIXER_SELECTION")
+        self.text_targets = [self.display.get_atom(name) for name in TEXT_TARGETS]
+        # Invisible window that requests conversions and owns the clipboard after a write-back
+        self.window = self.display.screen().root.create_window(
+            0, 0, 1, 1, 0, X.CopyFromParent, event_mask=X.PropertyChangeMask,
+        )
+        self.display.xfixes_select_selection_input(
+            self.window, self.CLIPBOARD, xfixes.XFixesSetSelectionOwnerNotifyMask,
+        )
+        self.display.flush()
+        self._owner_notify = self.display.extension_event.SetSelectionOwnerNotify
+        # Requests may not exceed the server limit; larger text is sent incrementally (INCR)
+        self._max_chunk = min(256 * 1024, self.display.info.max_request_length * 4 - 1024)
+        self._owned_text = None  # UTF-8 bytes we serve while we own CLIPBOARD
+        self._probed_target = None  # Text target found by probe_clipboard, used by the fetch that follows it
+        self._incr = {}  # (requestor window id, property) -> [requestor, target, data, offset]
+        self._pending_change = None  # Owner change seen while waiting for something else
+        self.running = True
+        print("Clipboard listener successfully initialized")
+
+    def _is_owner_change(self, event):
+        return (event.type, getattr(event, "sub_code", None)) == self._owner_notify
+
+    def wait_for(self, predicate, timeout):
+        """
+        Process events until one matches predicate.
+
+        Requests from other clients for text we own are answered right away;
+        an owner change is remembered for the main loop.
+
+        Returns:
+            The matching event, or None after timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            while self.display.pending_events():
+                event = self.display.next_event()
+                if predicate(event):
+                    return event
+                if self._is_owner_change(event):
+                    self._pending_change = event  # Only the latest change matters
+                else:
+                    self._dispatch(event)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            select.select([self.display], [], [], remaining)
+
+    def _dispatch(self, event):
+        X = self.X
+        if self._is_owner_change(event):
+            owner = getattr(event.owner, "id", event.owner)
+            if owner == self.window.id:
+                return  # Our own write-back
+            content = self.read_clipboard()
+            if content:
+                self.on_clipboard_change(content)
+        elif event.type == X.SelectionRequest:
+            self._serve_request(event)
+        elif event.type == X.SelectionClear:
+            if event.atom == self.CLIPBOARD:
+                self._owned_text = None
+        elif event.type == X.PropertyNotify and event.state == X.PropertyDelete:
+            self._continue_incr(event)
+
+    def _convert(self, target):
+        """Ask the clipboard owner for target; return the property value or None"""
+        X = self.X
+        self.window.convert_selection(self.CLIPBOARD, target, self.PROPERTY, X.CurrentTime)
+        self.display.flush()
+        event = self.wait_for(
+            lambda e: e.type == X.SelectionNotify and e.requestor.id == self.window.id and e.target == target,
+            self.timeout,
+        )
+        if event is None or event.property == X.NONE:
+            return None
+        prop = self.window.get_full_property(self.PROPERTY, X.AnyPropertyType, sizehint=16384)
+        if prop is None:
+            return None
+        if prop.property_type == self.INCR:
+            return self._read_incr()
+        self.window.delete_property(self.PROPERTY)
+        self.display.flush()
+        return prop.value
+
+    def _read_incr(self):
+        """Receive a value sent incrementally: each chunk arrives as a new property value"""
+        X = self.X
+        chunks = []
+        self.window.delete_property(self.PROPERTY)  # Deleting the INCR property starts the transfer
+        self.display.flush()
+        while True:
+            event = self.wait_for(
+                lambda e: e.type == X.PropertyNotify and e.window.id == self.window.id
+                and e.atom == self.PROPERTY and e.state == X.PropertyNewValue,
+                self.timeout,
+            )
+            if event is None:
+                return None
+            prop = self.window.get_full_property(self.PROPERTY, X.AnyPropertyType, sizehint=16384)
+            self.window.delete_property(self.PROPERTY)
+            self.display.flush()
+            if prop is None or not prop.value:
+                return b"".join(chunks)
+            chunks.append(prop.value)
+
+    def _text_target(self):
+        """The preferred text target the owner offers, None for an image, file list, ..."""
+        targets = self._convert(self.TARGETS)
+        if not targets:
+            return None
+        available = set(targets)
+        return next((t for t in self.text_targets if t in available), None)
+
+    def probe_clipboard(self):
+        """Ask the owner for its TARGETS only; the text is fetched afterwards if one of them is text"""
+        try:
+            self._probed_target = self._text_target()
+        except Exception as e:
+            print(f"Error probing clipboard content: {e}")
+            self._probed_target = None
+        return ClipboardProbe(None, self._probed_target is not None, None)
+
+    def get_clipboard_text(self):
+        """Get text content from clipboard, None if the owner offers no text type"""
+        try:
+            target, self._probed_target = self._probed_target, None
+            if target is None:
+                target = self._text_target()
+            if target is None:
+                return None  # Image, file list, ...: skip without transferring it
+            data = self._convert(target)
+            if data is None:
+                return None
+            return data.decode("utf-8", "replace")
+        except Exception as e:
+            print(f"Error getting clipboard content: {e}")
+            return None
+
+    def set_clipboard_text(self, text):
+        """Take ownership of CLIPBOARD and serve text to the apps that paste it"""
+        try:
+            self._owned_text = text.encode("utf-8")
+            self.window.set_selection_owner(self.CLIPBOARD, self.X.CurrentTime)
+            self.display.flush()
+            owner = self.display.get_selection_owner(self.CLIPBOARD)
+            if getattr(owner, "id", owner) != self.window.id:
+                print("Error setting clipboard content: could not take clipboard ownership")
+                return False
+            return True
+        except Exception as e:
+            print(f"Error setting clipboard content: {e}")
+            return False
+
+    def hold_clipboard(self):
+        """
+        Serve the text set with set_clipboard_text until another client takes CLIPBOARD.
+
+        X11 clipboard text lives in its owner, so a one-shot command such as undo
+        must keep running for apps to paste it. Owner changes are not converted here.
+        """
+        X = self.X
+        try:
+            while self._owned_text is not None or self._incr:
+                event = self.display.next_event()
+                if event.type in (X.SelectionRequest, X.SelectionClear) or (
+                    event.type == X.PropertyNotify and event.state == X.PropertyDelete
+                ):
+                    self._dispatch(event)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.display.close()
+
+    def _serve_request(self, event):
+        """Answer another client's SelectionRequest for the text we own"""
+        from Xlib import Xatom
+        from Xlib.protocol.event import SelectionNotify
+
+        X = self.X
+        requestor = event.requestor
+        prop = event.property or event.target  # Obsolete clients pass no property
+        data = self._owned_text
+        if data is None or event.selection != self.CLIPBOARD:
+            prop = X.NONE
+        elif event.target == self.TARGETS:
+            requestor.change_property(prop, Xatom.ATOM, 32, [self.TARGETS] + self.text_targets)
+        elif event.target in self.text_targets:
+            if len(data) > self._max_chunk:
+                requestor.change_attributes(event_mask=X.PropertyChangeMask)
+                requestor.change_property(prop, self.INCR, 32, [len(data)])
+                self._incr[(requestor.id, prop)] = [requestor, event.target, data, 0]
+            else:
+                requestor.change_property(prop, event.target, 8, data)
+        else:
+            prop = X.NONE
+        requestor.send_event(SelectionNotify(
+            time=event.time, requestor=requestor, selection=event.selection, target=event.target, property=prop,
+        ))
+        self.display.flush()
+
+    def _continue_incr(self, event):
+        """Send the next chunk of an INCR transfer once the requestor deleted the previous one"""
+        transfer = self._incr.get((event.window.id, event.atom))
+        if transfer is None:
+            return
+        requestor, target, data, offset = transfer
+        chunk = data[offset:offset + self._max_chunk]
+        requestor.change_property(event.atom, target, 8, chunk)
+        if chunk:
+            transfer[3] = offset + len(chunk)
+        else:
+            del self._incr[(event.window.id, event.atom)]  # The empty chunk ends the transfer
+        self.display.flush()
+
+    def start(self):
+        """Start listening to clipboard changes"""
+        self.warm_up_in_background()
+        print("Listening for clipboard content changes...")
+        print("Press Ctrl+C to stop")
+        try:
+            while self.running:
+                if self._pending_change is not None:
+                    event, self._pending_change = self._pending_change, None
+                else:
+                    event = self.display.next_event()  # Blocks until the X server sends something
+                self._dispatch(event)
+        except KeyboardInterrupt:
+            print("\nStopped listening")
+        finally:
+            self.display.close()
+
+
+class WaylandClipboardListener(BaseClipboardListener):
+    """Clipboard listener for Wayland compositors with the data-control protocol, through wl-clipboard"""
+
+    def __init__(self, timeout=5.0):
+        """
+        Args:
+            timeout (float): Seconds to wait for wl-paste / wl-copy
+        """
+        super().__init__()
+        missing = [tool for tool in ("wl-paste", "wl-copy") if shutil.which(tool) is None]
+        if missing:
+            raise NotImplementedError(f"The Wayland clipboard listener needs wl-clipboard ({', '.join(missing)} not found)")
+        self.timeout = timeout
+        self.process = None
+        self._probed_type = None  # Text MIME type found by probe_clipboard, used by the fetch that follows it
+        print("Clipboard listener successfully initialized")
+
+    def _text_type(self):
+        """The preferred text MIME type on offer, or None"""
+        result = subprocess.run(["wl-paste", "--list-types"], capture_output=True, text=True, timeout=self.timeout)
+        if result.returncode != 0:
+            return None  # Empty clipboard
+        offered = set(result.stdout.splitlines())
+        return next((mime for mime in TEXT_TARGETS if mime in offered), None)
+
+    def probe_clipboard(self):
+        """List the offered MIME types only; the text is fetched afterwards if one of them is text"""
+        try:
+            self._probed_type = self._text_type()
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Error probing clipboard content: {e}")
+            self._probed_type = None
+        return ClipboardProbe(None, self._probed_type is not None, None)
+
+    def get_clipboard_text(self):
+        """Get text content from clipboard, None if it offers no text type"""
+        try:
+            mime, self._probed_type = self._probed_type, None
+            if mime is None:
+                mime = self._text_type()
+            if mime is None:
+                return None
+            result = subprocess.run(
+                ["wl-paste", "--no-newline", "--type", mime], capture_output=True, timeout=self.timeout,
+            )
+            if result.returncode != 0:
+                return None
+            return result.stdout.decode("utf-8", "replace")
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Error getting clipboard content: {e}")
+            return None
+
+    def set_clipboard_text(self, text):
+        """Set text content to clipboard"""
+        try:
+            # wl-copy forks a process that serves the content, so its output must not be piped
+            result = subprocess.run(
+                ["wl-copy", "--type", "text/plain;charset=utf-8"], input=text.encode("utf-8"),
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout,
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Error setting clipboard content: {e}")
+            return False
+        if result.returncode != 0:
+            print(f"Error setting clipboard content: wl-copy exited with status {result.returncode}")
+            return False
+        return True
+
+    def start(self):
+        """Start listening to clipboard changes"""
+        self.warm_up_in_background()
+        # wl-paste runs the command once per selection change; its output line is our wake-up
+        self.process = subprocess.Popen(
+            ["wl-paste", "--watch", "echo", "changed"], stdout=subprocess.PIPE, text=True,
+        )
+        print("Listening for clipboard content changes...")
+        print("Press Ctrl+C to stop")
+        try:
+            for _ in self.process.stdout:
+                content = self.read_clipboard()
+                if content:
+                    self.on_clipboard_change(content)
+            if self.process.wait() != 0:
+                print("wl-paste --watch stopped; the compositor may not support the data-control protocol")
+        except KeyboardInterrupt:
+            print("\nStopped listening")
+        finally:
+            if self.process.poll() is None:
+                self.process.terminate()
+
+
+def create_linux_listener():
+    """
+    Pick the Linux backend for the current session.
+
+    Returns:
+        WaylandClipboardListener in a Wayland session with wl-clipboard installed,
+        X11ClipboardListener when an X display is available
+
+    Raises:
+        NotImplementedError: If neither is available
+    """
+    if os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-paste"):
+        return WaylandClipboardListener()
+    if os.environ.get("DISPLAY"):
+        return X11ClipboardListener()
+    raise NotImplementedError(
+        "No graphical session found on Linux: set DISPLAY for X11, or install wl-clipboard under Wayland"
+    )
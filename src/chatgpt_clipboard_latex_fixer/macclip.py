@@ -2,15 +2,15 @@
 from AppKit import NSPasteboard, NSApplication, NSPasteboardTypeString
 from Foundation import NSObject, NSLog
 import objc
-import time
-from .common import convert_math_syntax
+from .base_clipboard_listener import ClipboardProbe, ConversionMixin
 
 
-class MacClipboardListener(NSObject):
+class MacClipboardListener(NSObject, ConversionMixin):
     """
     macOS clipboard listener implementation.
     Note: Must inherit from NSObject for Objective-C compatibility,
-    so we implement the base listener interface rather than inherit from it.
+    so we implement the base listener interface rather than inherit from it;
+    conversion and write-back come from ConversionMixin, as for the other listeners.
     """
     def init(self):
         """Override the init method and initialize using objc.super"""
@@ -20,9 +20,9 @@ class MacClipboardListener(NSObject):
 
         try:
             # Initialize the clipboard object and related properties
+            self._init_conversion_state()
             self.pasteboard = NSPasteboard.generalPasteboard()
             self.last_change_count = self.pasteboard.changeCount()  # Initial change count
-            self.last_processed_content = None   # Save the last processed content to avoid redundant processing
             NSLog("Clipboard listener successfully initialized")
         except Exception as e:
             NSLog(f"Failed to initialize clipboard: {e}")
@@ -31,45 +31,47 @@ class MacClipboardListener(NSObject):
         return self
 
     def check_clipboard(self):
-        """Check if clipboard content has changed"""
+        """Check if clipboard content has changed; return True if it did"""
         if not self.pasteboard:
             NSLog("Error: Clipboard is not initialized")
-            return
+            return False
 
         try:
             # Get the current change count of the clipboard
             current_change_count = self.pasteboard.changeCount()
             if current_change_count != self.last_change_count:
                 self.last_change_count = current_change_count
-
-                # Get the content of the clipboard
-                content = self.pasteboard.stringForType_("public.utf8-plain-text")
-                if content and content != self.last_processed_content:  # Skip redundant processing
+                # Fetched only if the probe offers text that is not our own write-back (not an image or a Finder file)
+                content = self.read_clipboard()
+                if content:
                     self.on_clipboard_change(content)
+                return True
+            return False
         except Exception as e:
             NSLog(f"Error while checking clipboard: {e}")
+            return False
 
     def on_clipboard_change(self, content):
-        """Process the changed clipboard content"""
-        # Use convert_math_syntax to transform the content
-        converted_content = convert_math_syntax(content)
+        """Process the changed clipboard content on the polling thread"""
+        self.convert_and_write_back(content)
 
-        # If the converted content is the same as the current content, skip writing back to avoid loops
-        if converted_content == content:
-            NSLog("Converted content is the same as the original content, skipping write-back")
-            self.last_processed_content = content
-            return
+    def log(self, message):
+        """Send listener events to the system log"""
+        NSLog("%@", message)
 
-        NSLog(f"Original clipboard content: {content[:100]}...")
-        NSLog(f"Converted clipboard content: {converted_content[:100]}...")
+    def get_clipboard_change_count(self):
+        """Pasteboard change count, incremented by macOS on every change"""
+        if not self.pasteboard:
+            return None
+        return self.pasteboard.changeCount()
 
-        # Save the processed content
-        self.last_processed_content = converted_content
+    def probe_clipboard(self):
+        """Change count and whether a string type is on offer, without fetching the string"""
+        if not self.pasteboard:
+            return ClipboardProbe(None, False, None)
+        has_text = self.pasteboard.availableTypeFromArray_([NSPasteboardTypeString]) is not None
+        return ClipboardProbe(self.pasteboard.changeCount(), has_text, None)
 
-        # Write the converted content back to the clipboard (set_clipboard_text equivalent)
-        self.pasteboard.declareTypes_owner_([NSPasteboardTypeString], None)
-        self.pasteboard.setString_forType_(converted_content, NSPasteboardTypeString)
-    
     def get_clipboard_text(self):
         """Get text content from clipboard"""
         if not self.pasteboard:
@@ -84,19 +86,22 @@ class MacClipboardListener(NSObject):
         """Set text content to clipboard"""
         try:
             self.pasteboard.declareTypes_owner_([NSPasteboardTypeString], None)
-            self.pasteboard.setString_forType_(text, NSPasteboardTypeString)
+            return bool(self.pasteboard.setString_forType_(text, NSPasteboardTypeString))
         except Exception as e:
             NSLog(f"Error setting clipboard content: {e}")
+            return False
 
     def start(self):
         """Start listening to clipboard changes"""
+        self.warm_up_in_background()
         print("Listening for clipboard content changes...")
         print("Press Ctrl+C to stop")
         
         try:
             while True:
-                self.check_clipboard()  # Check for clipboard content changes
-                time.sleep(0.5)  # Check every 0.5 seconds
+                interval = self.scheduler.record(self.check_clipboard())  # Check for clipboard content changes
+                with self.metrics.time("sleep"):
+                    self.scheduler.wait(interval)
         except KeyboardInterrupt:
             print("\nStopped listening")
             NSApplication.sharedApplication().terminate_(None)
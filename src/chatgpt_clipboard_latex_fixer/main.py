@@ -1,20 +1,424 @@
-from .clipboard_factory import create_clipboard_listener
+import argparse
+import sys
+import time
 
 
-def main():
-    """Main entry point for the clipboard listener application"""
+def run_listener(args=None):
+    """Start the platform clipboard listener"""
+    from .clipboard_factory import create_clipboard_listener
+
+    exporter = None
     try:
         listener = create_clipboard_listener()
         if listener is None:
             print("Failed to initialize clipboard listener")
             return
-        
+
+        if getattr(args, "profile", None):
+            from .profiles import compile_profile
+
+            listener.engine = compile_profile(args.profile)
+
+        if getattr(args, "history", None) is not None:
+            listener.history = open_history(args)
+
+        cache_dir = getattr(args, "cache_dir", None)
+        if cache_dir:
+            try:
+                listener.cache.set_disk_dir(cache_dir)
+            except OSError as e:
+                print(f"Warning: keeping conversions in memory only, {cache_dir} cannot be used: {e}")
+
+        capture_slow = getattr(args, "capture_slow", None)
+        if capture_slow is not None:
+            from .capture import SlowCapture
+
+            listener.capture = SlowCapture(args.capture_dir, threshold=capture_slow, profile=args.capture_profile)
+            print(f"Keeping inputs of conversions slower than {capture_slow}s in {listener.capture.directory}")
+
+        time_budget = getattr(args, "time_budget", None)
+        if time_budget is not None:
+            listener.conversion_budget = time_budget if time_budget > 0 else None
+
+        poll_floor = getattr(args, "poll_floor", None)
+        poll_ceiling = getattr(args, "poll_ceiling", None)
+        if poll_floor is not None or poll_ceiling is not None:
+            from .scheduler import PollScheduler
+
+            default = listener.scheduler
+            listener.scheduler = PollScheduler(
+                floor=poll_floor if poll_floor is not None else default.floor,
+                ceiling=poll_ceiling if poll_ceiling is not None else max(default.ceiling, poll_floor or 0),
+            )
+
+        metrics_file = getattr(args, "metrics_file", None)
+        metrics_port = getattr(args, "metrics_port", None)
+        if metrics_file or metrics_port is not None:
+            from .metrics import MetricsExporter
+
+            exporter = MetricsExporter(
+                listener.metrics, json_path=metrics_file, interval=args.metrics_interval, port=metrics_port,
+            ).start()
+            if metrics_port is not None:
+                print(f"Serving metrics on http://127.0.0.1:{metrics_port}/metrics")
         listener.start()
-    except NotImplementedError as e:
+    except (NotImplementedError, ValueError, OSError) as e:
         print(f"Error: {e}")
     except Exception as e:
         print(f"Unexpected error: {e}")
+    finally:
+        if exporter is not None:
+            exporter.stop()
+
+
+def open_history(args):
+    """Open the conversion history for --history and --history-size, None (with a warning) if it cannot be"""
+    from .history import ConversionHistory, default_history_path, DEFAULT_SIZE
+
+    path = getattr(args, "history", None) or default_history_path()
+    size_mb = getattr(args, "history_size", None)
+    try:
+        return ConversionHistory(path, size=int(size_mb * 1024 * 1024) if size_mb else DEFAULT_SIZE)
+    except (OSError, ValueError) as e:
+        print(f"Warning: not keeping a conversion history, {path} cannot be used: {e}")
+        return None
+
+
+def run_undo(args):
+    """Put the original of a recent conversion back on the clipboard"""
+    from .history import ConversionHistory, default_history_path
+
+    path = args.history or default_history_path()
+    try:
+        history = ConversionHistory(path, create=False)
+    except FileNotFoundError:
+        print(f"No conversion history at {path}")
+        return 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    with history:
+        record = history.latest(args.steps)
+        if record is None:
+            print(f"The history at {path} holds {len(history)} conversion(s), not {args.steps}")
+            return 1
+        if args.stdout:
+            sys.stdout.write(record.original)
+            return 0
+        from .clipboard_factory import create_clipboard_listener
+
+        try:
+            listener = create_clipboard_listener()
+        except NotImplementedError as e:
+            print(f"Error: {e}")
+            return 1
+        if listener is None:
+            print("Failed to initialize clipboard listener")
+            return 1
+        # Marked first, so a running listener leaves the restored text alone
+        history.mark_undone(record.seq)
+        if not listener.set_clipboard_text(record.original):
+            history.mark_undone(0)
+            print("Error: could not set the clipboard")
+            return 1
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp))
+    print(f"Restored the original of the conversion from {when} ({len(record.converted)} -> {len(record.original)} chars)")
+    hold = getattr(listener, "hold_clipboard", None)
+    if hold is not None:
+        hold()
+    return 0
+
+
+def run_replay(args):
+    """Convert captured slow inputs again and report whether each got faster or slower"""
+    from .capture import default_capture_dir, load_captures, replay_capture
+
+    directory = args.directory or default_capture_dir()
+    try:
+        captures = load_captures(directory)
+    except OSError as e:
+        print(f"Error: {e}")
+        return 1
+    if not captures:
+        print(f"No captured conversions in {directory}")
+        return 0
+    slower = 0
+    print(f"{'capture':12s} {'size':>9s} {'engine':8s} {'captured':>10s} {'now':>10s} {'change':>8s}")
+    for meta, text_path in captures:
+        engine = meta.get("engine")
+        name = engine if isinstance(engine, str) else "profile" if isinstance(engine, dict) else "?"
+        try:
+            seconds = replay_capture(meta, text_path, repeat=args.repeat, time_budget=args.time_budget)
+        except (OSError, ValueError) as e:
+            print(f"{meta['key'][:12]:12s} skipped: {e}")
+            continue
+        change = seconds / meta["seconds"] - 1 if meta.get("seconds") else 0.0
+        verdict = "faster" if change < -args.tolerance else "slower" if change > args.tolerance else "same"
+        slower += verdict == "slower"
+        print(f"{meta['key'][:12]:12s} {meta['size']:9d} {name:8s} {meta['seconds'] * 1000:8.1f}ms "
+              f"{seconds * 1000:8.1f}ms {change:+7.0%}  {verdict}")
+    return 1 if slower else 0
+
+
+def run_convert(args):
+    """Convert files given on the command line"""
+    from .batch import convert_files, expand_inputs, DEFAULT_EXTENSIONS
+
+    if not args.in_place and not args.output_dir:
+        print("Error: pass --in-place or --output-dir")
+        return 2
+    try:
+        engine = resolve_cli_engine(args)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}")
+        return 2
+
+    files = expand_inputs(args.paths, tuple(args.ext) if args.ext else DEFAULT_EXTENSIONS)
+    if not files:
+        print("No input files found")
+        return 1
+
+    def progress(path, status, error):
+        if error:
+            print(f"{status}: {path}: {error}", file=sys.stderr)
+        elif args.verbose:
+            print(f"{status}: {path}")
+
+    summary = convert_files(
+        files,
+        output_dir=None if args.in_place else args.output_dir,
+        workers=args.workers,
+        chunksize=args.chunksize,
+        state_path=args.state,
+        progress=progress,
+        engine=engine,
+    )
+    print(
+        f"{summary['files']} files: {summary['converted']} converted, {summary['unchanged']} unchanged, "
+        f"{summary['skipped']} skipped, {summary['failed']} failed"
+    )
+    print(
+        f"{summary['seconds']:.2f}s, {summary['files_per_s']:.1f} files/s, "
+        f"{summary['mb_per_s']:.2f} MB/s"
+    )
+    return 1 if summary['failed'] else 0
+
+
+def run_filter(args):
+    """Convert stdin to stdout block by block, or as a whole on several cores"""
+    try:
+        engine = resolve_cli_engine(args)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    if args.jobs is not None:
+        from .common import convert_math_syntax
+
+        sys.stdout.write(convert_math_syntax(sys.stdin.read(), engine=engine, cache=None, workers=args.jobs))
+        return 0
+
+    from .common import convert_stream
+
+    for block in convert_stream(sys.stdin, engine=engine):
+        sys.stdout.write(block)
+        sys.stdout.flush()
+    return 0
+
+
+def run_daemon(args):
+    """Serve conversions over a Unix socket, or stop the running daemon"""
+    from . import daemon
+
+    if not hasattr(daemon.socket, "AF_UNIX"):
+        print("Error: the daemon needs Unix domain sockets, which this platform does not provide")
+        return 2
+    if args.stop:
+        try:
+            daemon.shutdown(args.socket, timeout=5.0)
+        except OSError as e:
+            print(f"No daemon running: {e}")
+            return 1
+        return 0
+    try:
+        daemon.serve(args.socket, workers=args.workers, engine=args.engine)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+def run_client(args):
+    """Convert stdin through the daemon, or in-process when it is not running"""
+    from .daemon import convert_via_daemon
+
+    text = sys.stdin.read()
+    try:
+        converted = convert_via_daemon(text, engine=args.engine, socket_path=args.socket, timeout=args.timeout)
+    except (OSError, AttributeError) as e:  # AttributeError: no AF_UNIX on this platform
+        if args.no_fallback:
+            print(f"Error: daemon not reachable: {e}", file=sys.stderr)
+            return 1
+        from .common import convert_math_syntax
+
+        converted = convert_math_syntax(text, engine=args.engine)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    sys.stdout.write(converted)
+    return 0
+
+
+def add_engine_argument(parser):
+    """Add the --engine option shared by the converting commands"""
+    from .common import ENGINES
+
+    parser.add_argument(
+        "--engine", choices=ENGINES, default="marko",
+        help="marko re-renders the Markdown, fast only rewrites math delimiters (default: marko)",
+    )
+
+
+def add_profile_argument(parser):
+    """Add the --profile option of the commands that convert with the marko engine"""
+    parser.add_argument(
+        "--profile", default=None,
+        help="TOML (or .json) rule profile: which delimiters are math and how it is written back",
+    )
+
+
+def resolve_cli_engine(args):
+    """
+    Return the engine for --engine and --profile.
+
+    Raises:
+        ValueError: If the profile is invalid, or combined with the fast engine
+        OSError: If the profile file cannot be read
+    """
+    if not args.profile:
+        return args.engine
+    if args.engine == "fast":
+        raise ValueError("--profile applies to the marko engine, not --engine fast")
+    from .profiles import compile_profile
+
+    return compile_profile(args.profile)
+
+
+def build_parser():
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(
+        prog="chatgpt-clipboard-latex-fixer",
+        description="Convert ChatGPT LaTeX-style math notation to standard Markdown math syntax.",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    listen = subparsers.add_parser("listen", help="watch the clipboard and convert copied text (default)")
+    listen.add_argument("--metrics-file", help="write latency histograms and event counters to this JSON file")
+    listen.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between metrics file updates")
+    listen.add_argument(
+        "--metrics-port", type=int, default=None,
+        help="serve metrics in the Prometheus text format on 127.0.0.1:PORT/metrics",
+    )
+    listen.add_argument(
+        "--poll-floor", type=float, default=None,
+        help="seconds between clipboard polls right after a copy (polling backends, default: 0.05)",
+    )
+    listen.add_argument(
+        "--poll-ceiling", type=float, default=None,
+        help="longest wait between clipboard polls while idle, and so the delay before the first copy "
+             "after a pause is seen; lower values notice it sooner, higher ones wake up less often "
+             "(polling backends, default: 2)",
+    )
+    listen.add_argument(
+        "--time-budget", type=float, default=None,
+        help="seconds a conversion may take before the clipboard is left unchanged, 0 for no limit (default: 5.0)",
+    )
+    listen.add_argument(
+        "--history", nargs="?", const="", default=None, metavar="PATH",
+        help="record write-backs for undo in this file (default PATH: per-user state directory); off by default",
+    )
+    listen.add_argument("--history-size", type=float, default=None, help="history file size in MB (default: 16)")
+    listen.add_argument(
+        "--cache-dir", default=None,
+        help="also keep converted documents in this directory, so a restarted listener starts warm",
+    )
+    listen.add_argument(
+        "--capture-slow", type=float, default=None, metavar="SECONDS",
+        help="keep the input of every conversion taking at least SECONDS, for replay",
+    )
+    listen.add_argument("--capture-dir", help="directory of captured inputs (default: per-user state directory)")
+    listen.add_argument(
+        "--capture-profile", action="store_true",
+        help="also keep a cProfile dump of each captured conversion (converts it a second time)",
+    )
+    add_profile_argument(listen)
+    listen.set_defaults(func=run_listener)
+
+    undo = subparsers.add_parser("undo", help="put the original of the last conversion back on the clipboard")
+    undo.add_argument("--history", help="conversion history file of the listener, as given to listen --history")
+    undo.add_argument("-n", "--steps", type=int, default=1, help="undo the N-th most recent conversion (default: 1)")
+    undo.add_argument("--stdout", action="store_true", help="print the original instead of setting the clipboard")
+    undo.set_defaults(func=run_undo)
+
+    replay = subparsers.add_parser("replay", help="convert captured slow inputs again and compare the timings")
+    replay.add_argument("directory", nargs="?", help="capture directory (default: the one listen --capture-slow uses)")
+    replay.add_argument("--repeat", type=int, default=3, help="conversions per input, the fastest is reported")
+    replay.add_argument(
+        "--tolerance", type=float, default=0.10,
+        help="relative change below which an input counts as the same (default: 0.10)",
+    )
+    replay.add_argument("--time-budget", type=float, default=None, help="seconds each conversion may take")
+    replay.set_defaults(func=run_replay)
+
+    convert = subparsers.add_parser("convert", help="convert Markdown/text files on disk")
+    convert.add_argument("paths", nargs="+", help="files, directories or glob patterns (use ** for recursion)")
+    target = convert.add_mutually_exclusive_group()
+    target.add_argument("-i", "--in-place", action="store_true", help="rewrite the input files")
+    target.add_argument("-o", "--output-dir", help="write converted files under this directory, mirroring the input layout")
+    convert.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    convert.add_argument("--chunksize", type=int, default=None, help="files handed to a worker at a time")
+    convert.add_argument("--state", help="JSON file remembering converted inputs so unchanged files are skipped")
+    convert.add_argument(
+        "--ext", nargs="+", default=None,
+        help="file extensions picked up inside directories (default: .md .markdown .txt)",
+    )
+    convert.add_argument("-v", "--verbose", action="store_true", help="print the outcome for every file")
+    add_engine_argument(convert)
+    add_profile_argument(convert)
+    convert.set_defaults(func=run_convert)
+
+    filter_ = subparsers.add_parser("filter", help="convert stdin to stdout, streaming block by block")
+    add_engine_argument(filter_)
+    add_profile_argument(filter_)
+    filter_.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="read all of stdin and convert it with this many processes (0: CPU count); "
+             "inputs under 512 KB are converted in-process",
+    )
+    filter_.set_defaults(func=run_filter)
+
+    daemon = subparsers.add_parser("daemon", help="keep a warmed converter resident, serving a Unix socket")
+    daemon.add_argument("--socket", help="socket path (default: per-user path in XDG_RUNTIME_DIR or the temp dir)")
+    daemon.add_argument("-j", "--workers", type=int, default=4, help="connections served concurrently")
+    daemon.add_argument("--stop", action="store_true", help="stop the daemon listening on the socket")
+    add_engine_argument(daemon)
+    daemon.set_defaults(func=run_daemon)
+
+    client = subparsers.add_parser("client", help="convert stdin through the daemon, in-process if it is not running")
+    client.add_argument("--socket", help="socket path of the daemon")
+    client.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for the daemon")
+    client.add_argument("--no-fallback", action="store_true", help="fail instead of converting in-process")
+    add_engine_argument(client)
+    client.set_defaults(func=run_client)
+    return parser
+
+
+def main(argv=None):
+    """Main entry point for the clipboard listener application"""
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        return run_listener(args)
+    return args.func(args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
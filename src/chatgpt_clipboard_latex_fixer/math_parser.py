@@ -1,13 +1,60 @@
 from marko import Markdown
-from marko.inline import InlineElement
+from marko.inline import InlineElement, Literal
 from marko.block import BlockElement
 from marko.md_renderer import MarkdownRenderer
 from marko.helpers import MarkoExtension
 import re
+import threading
+
+from .patterns import (
+    BLOCK_MATH_PATTERN, BLOCK_MATH_END_PATTERN, INLINE_MATH_PATTERN, INLINE_BLOCK_MATH_PATTERN,
+    INLINE_MATH_PRIORITY, INLINE_BLOCK_MATH_PRIORITY, LITERAL_PATTERN,
+    PAREN_MATH_PATTERN, DOLLAR_MATH_PATTERN, ESCAPED_BRACKET_MATH_PATTERN, BARE_BRACKET_MATH_PATTERN,
+    ENVIRONMENT_PATTERN,
+)
+from .profiles import compile_profile, profile_needs_conversion
+
+
+# ========== Math node storage ==========
+class _MathNode:
+    """Math content kept as an offset range into a source string
+
+    A document with thousands of formulas creates as many nodes, so they use
+    ``__slots__`` and refer to the text they were parsed from instead of
+    holding copies of their content. ``math_content`` slices it on access.
+    """
+    __slots__ = ()
+
+    @property
+    def math_content(self):
+        return self._text[self._start:self._end]
+
+
+def _strip_range(text, start, end):
+    """Offsets of text[start:end].strip() within text"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+_BLOCK_MATH_END_RE = re.compile(BLOCK_MATH_END_PATTERN, re.MULTILINE)
+
+
+def _last_block_math_end(source):
+    """Offset of the last "]" line in the source, -1 if there is none; found once per document"""
+    last = getattr(source.context, "last_block_math_end", None)
+    if last is None:
+        last = -1
+        for match in _BLOCK_MATH_END_RE.finditer(source._buffer):
+            last = match.start()
+        source.context.last_block_math_end = last
+    return last
 
 
 # ========== Block Element ==========
-class BlockMath(BlockElement):
+class BlockMath(_MathNode, BlockElement):
     """Block-level math element (wrapped in [ ... ], occupies a line)
     
     Example:
@@ -15,8 +62,10 @@ class BlockMath(BlockElement):
     x = y + z
     ]
     """
+    # _inline_positions: set by NoSourcePositionsParser on every block, a slot keeps it out of __dict__
+    __slots__ = ("_text", "_start", "_end", "source_span", "children", "_inline_positions")
     # Define matching pattern - Note: do not use ^, expect_re already matches from line start
-    pattern = r' {0,3}\['  # Allow up to 3 spaces indentation
+    pattern = BLOCK_MATH_PATTERN  # Allow up to 3 spaces indentation
     priority = 10  # Set high priority to ensure matching before Paragraph
     
     @classmethod
@@ -36,7 +85,12 @@ class BlockMath(BlockElement):
         """
         # Use expect_re method to match current line
         # If match succeeds, return Match object; otherwise return None
-        return source.expect_re(cls.pattern)
+        match = source.expect_re(cls.pattern)
+        # A "[" line that no "]" line follows is left as text, as the fast engine does,
+        # instead of turning the rest of the document into display math
+        if match and _last_block_math_end(source) < match.end():
+            return None
+        return match
     
     @classmethod
     def parse(cls, source):
@@ -58,6 +112,8 @@ class BlockMath(BlockElement):
         
         # Collect math content
         lines = []
+        start = end = source.pos
+        contiguous = True  # No container prefix was cut from the lines
         # Keep reading until encountering ]
         while not source.exhausted:
             line = source.next_line()
@@ -67,50 +123,91 @@ class BlockMath(BlockElement):
                 source.consume()  # Consume ] line
                 break
             lines.append(line)
+            contiguous = contiguous and source.match.start() == end
+            end = source.match.end()
             source.consume()  # Consume this line
         
-        # Return math content (use ''.join to preserve original format)
-        math_content = ''.join(lines).strip()
-        return math_content
+        # Return math content as offsets into the source buffer when the lines
+        # are one run of it, otherwise as the joined lines (''.join preserves the format)
+        if contiguous:
+            text = source._buffer
+        else:
+            text, start, end = ''.join(lines), 0, sum(len(line) for line in lines)
+        return (text,) + _strip_range(text, start, end)
     
-    def __init__(self, math_content):
-        """Constructor: Receive parameters returned by parse"""
-        self.math_content = math_content
+    def __init__(self, content):
+        """Constructor: Receive the (text, start, end) returned by parse"""
+        self._text, self._start, self._end = content
+        self.source_span = None
         self.children = []  # Block elements need children attribute
 
 
 # ========== Inline Element Example ==========
 # Define custom inline math element
-class InlineMath(InlineElement):
+class InlineMath(_MathNode, InlineElement):
     """Inline math element (wrapped in $ ... $ or \( ... \))"""
-    pattern = r'(?:\\\((.+?)\\\)|\$\s*([^\$\n]+?)\s*\$)'  # Match \(...\) or $...$ format math, no cross-line. Non-greedy ? ensures stopping at first \)
+    __slots__ = ("_text", "_start", "_end", "source_span")
+    pattern = INLINE_MATH_PATTERN  # Match \(...\) or $...$ format math, no cross-line. Non-greedy ? ensures stopping at first \)
     parse_children = False  # Don't parse math content as markdown
-    priority = 7  # Set priority
+    priority = INLINE_MATH_PRIORITY  # Set priority
 
     def __init__(self, match):
-        # Extract math content from either group 1 (\(...\)) or group 2 ($...$)
-        self.math_content = match.group(1) if match.group(1) else match.group(2)
+        # Refer to the math content in either group 1 (\(...\)) or group 2 ($...$)
+        self._set_content(match, 1 if match.group(1) else 2)
+        self.source_span = None
         # IMPORTANT: Don't call super().__init__() because when parse_children=False,
         # it would set self.children to the matched string, causing renderer errors
         # We leave children undefined - renderer will use our custom render method
+
+    def _set_content(self, match, group):
+        """Refer to the content of group stripped, so a converted span converts to itself again
+
+        The $...$ pattern leaves surrounding spaces out of its group; \\(...\\) keeps
+        them. Content that is all spaces keeps its last one, as "$ $" does, instead
+        of rendering as "$$".
+        """
+        text, end = match.string, match.end(group)
+        start, stripped_end = _strip_range(text, match.start(group), end)
+        if start == stripped_end:
+            start = end - 1
+        else:
+            end = stripped_end
+        self._text, self._start, self._end = text, start, end
         
-class InlineBlockMath(InlineElement):
+class InlineBlockMath(_MathNode, InlineElement):
     # Inline block math element (wrapped in [ ... ] or \[ ... \])
-    pattern = r'(?:\\\[(\n[^\[\]\n]+?\n)\\\]|\[(\n[^\[\]\n]+?\n)\])'  # Match [ ... ] or \[ ... \] format math
+    __slots__ = ("_text", "_start", "_end", "source_span")
+    pattern = INLINE_BLOCK_MATH_PATTERN  # Match [ ... ] or \[ ... \] format math
     parse_children = False  # Don't parse math content as markdown
-    priority = 8  # Set priority
+    priority = INLINE_BLOCK_MATH_PRIORITY  # Set priority
 
     def __init__(self, match):
-        # Extract math content from either group 1 (\[...\]) or group 2 ([...])
-        self.math_content = match.group(1) if match.group(1) else match.group(2)
+        # Refer to the math content in either group 1 (\[...\]) or group 2 ([...])
+        group = 1 if match.group(1) else 2
+        self._text, self._start, self._end = match.string, match.start(group), match.end(group)
+        self.source_span = None
         # IMPORTANT: Don't call super().__init__() because when parse_children=False,
         # it would set self.children to the matched string, causing renderer errors
         # We leave children undefined - renderer will use our custom render method
 
 
+class MathLiteral(Literal):
+    """Backslash escape that leaves the \\( of \\( ... \\) math to InlineMath
+
+    Marko's escape has the same priority as InlineMath and starts at the same
+    backslash, so it would consume the "\\(" and the math would never match.
+    Escapes and InlineMath keep their priority, so a code span or an escape that
+    starts earlier still wins over \\( ... \\) as it does over $ ... $.
+    """
+    override = True  # Replaces marko's Literal
+    pattern = re.compile(LITERAL_PATTERN)
+
+
 # ========== Renderer Implementation ==========
 class MathMarkdownRenderer(MarkdownRenderer):
     """Custom Markdown renderer, supports math formulas"""
+    display_delimiters = ("$$", "$$")  # Output delimiters of display math, set by rule profiles
+    inline_delimiters = ("$", "$")  # Output delimiters of inline math
     
     def render_block_math(self, element):
         """Render block-level math
@@ -121,7 +218,8 @@ class MathMarkdownRenderer(MarkdownRenderer):
         $$
         """
         # Block elements need blank lines before and after
-        return f"$$\n{element.math_content}\n$$\n"
+        opening, closing = self.display_delimiters
+        return f"{opening}\n{element.math_content}\n{closing}\n"
     
     def render_inline_math(self, element):
         """Render inline math
@@ -129,7 +227,8 @@ class MathMarkdownRenderer(MarkdownRenderer):
         Render InlineMath element back to Markdown format:
         $math content$
         """
-        return f"${element.math_content}$"
+        opening, closing = self.inline_delimiters
+        return f"{opening}{element.math_content}{closing}"
     
     def render_inline_block_math(self, element):
         """Render inline block math
@@ -139,21 +238,245 @@ class MathMarkdownRenderer(MarkdownRenderer):
         content
         $$
         """
-        return f"$$\n{element.math_content}\n$$"
+        opening, closing = self.display_delimiters
+        # Inside a block quote or list item the lines after the first carry the container
+        # prefix, the blank ones around the content too, or the container would end there
+        prefix = self._second_prefix
+        lines = f"{opening}\n{element.math_content}\n{closing}".split("\n")
+        return "\n".join([lines[0]] + [prefix + line if line else prefix.rstrip() for line in lines[1:]])
+
+    def render_blank_line(self, element):
+        """Render a blank line with the container prefix, so a block quote holding several
+        paragraphs (or the padded lines of inline block math) stays one quote"""
+        self._prefix = self._second_prefix
+        return self._second_prefix.rstrip() + "\n"
+
+
+# ========== Parser Implementation ==========
+class NoSourcePositionsParser:
+    """Parser mixin that skips marko's source position tracking
+
+    Marko (2.2 and later) maps every inline element back to its offsets in the
+    source, allocating a span tuple and two integers per element; on math-heavy
+    text that is the largest part of the tree. Markdown rendering never reads
+    the spans, so inline parsing runs without them.
+    """
+
+    def parse_inline(self, element, source):
+        element._inline_positions = None
+        super().parse_inline(element, source)
 
 
 MathExtension = MarkoExtension(
-    elements = [BlockMath, InlineMath, InlineBlockMath],
+    elements = [BlockMath, InlineMath, InlineBlockMath, MathLiteral],
+    parser_mixins = [NoSourcePositionsParser],
     renderer_mixins = [MathMarkdownRenderer]
 )
 
-def markdown_normalize(text: str) -> str:
+
+# ========== Rule profiles ==========
+class _ProfileBlockMath(BlockMath):
+    """BlockMath whose pattern also opens on the \\begin{...} environments of a profile"""
+    __slots__ = ()
+
+    @classmethod
+    def match(cls, source):
+        match = source.expect_re(cls.pattern)
+        if match is None:
+            return None
+        name = match.groupdict().get("env")
+        if name is None:
+            closed = _last_block_math_end(source) >= match.end()
+        else:
+            closed = source._buffer.find(f"\\end{{{name}}}", match.end()) != -1
+        # Like a "[" line, an environment that is never closed is left as text
+        return match if closed else None
+
+    @classmethod
+    def parse(cls, source):
+        name = source.match.groupdict().get("env")
+        if name is None:
+            return super().parse(source)
+        # Keep the \begin and \end lines: the environment is the math content
+        closing = f"\\end{{{name}}}"
+        lines = []
+        start = end = None
+        contiguous = True
+        while not source.exhausted:
+            line = source.next_line()
+            if line is None:
+                break
+            lines.append(line)
+            if start is None:
+                start = end = source.match.start()
+            contiguous = contiguous and source.match.start() == end
+            end = source.match.end()
+            source.consume()
+            if closing in line:
+                break
+        if contiguous:
+            text = source._buffer
+        else:
+            text, start, end = ''.join(lines), 0, sum(len(line) for line in lines)
+        return (text,) + _strip_range(text, start, end)
+
+
+class _ProfileInlineMath(InlineMath):
+    __slots__ = ()
+
+    def __init__(self, match):
+        # The pattern holds only the delimiters the profile enables, so take whichever group matched
+        self._set_content(match, match.lastindex)
+        self.source_span = None
+
+
+class _ProfileInlineBlockMath(InlineBlockMath):
+    __slots__ = ()
+
+    def __init__(self, match):
+        group = match.lastindex
+        self._text, self._start, self._end = match.string, match.start(group), match.end(group)
+        self.source_span = None
+
+
+# Output delimiters a profile can choose, as (opening, closing)
+DISPLAY_DELIMITERS = {"$$": ("$$", "$$"), "\\[": ("\\[", "\\]")}
+INLINE_DELIMITERS = {"$": ("$", "$"), "\\(": ("\\(", "\\)")}
+
+
+def _element(name, base, pattern):
+    """Subclass of base under the name marko derives its render method from, with the given pattern"""
+    return type(name, (base,), {"__slots__": (), "pattern": pattern})
+
+
+def build_math_extension(profile):
+    """
+    Compile a normalized rule profile (see profiles.py) into a marko extension.
+
+    The delimiters the profile enables are merged into one pattern per element,
+    so a line or paragraph is scanned with a single regex however many rules
+    are on, instead of once per rule.
+
+    Args:
+        profile (dict): Profile from profiles.normalize_profile
+
+    Returns:
+        MarkoExtension: Elements and renderer for the profile
+    """
+    elements = []
+    openers = []
+    if profile["bare_brackets"]:
+        openers.append(r'\[')
+    if profile["environments"]:
+        names = '|'.join(re.escape(name) for name in profile["environments"])
+        openers.append(ENVIRONMENT_PATTERN.format(names=names))
+    if openers:
+        elements.append(_element("BlockMath", _ProfileBlockMath, f" {{0,3}}(?:{'|'.join(openers)})"))
+    inline = [
+        pattern for enabled, pattern in (
+            (profile["parens"], PAREN_MATH_PATTERN), (profile["dollars"], DOLLAR_MATH_PATTERN),
+        ) if enabled
+    ]
+    if inline:
+        elements.append(_element("InlineMath", _ProfileInlineMath, f"(?:{'|'.join(inline)})"))
+    if profile["parens"]:
+        elements.append(MathLiteral)
+    inline_block = [
+        pattern for enabled, pattern in (
+            (profile["escaped_brackets"], ESCAPED_BRACKET_MATH_PATTERN),
+            (profile["bare_brackets"], BARE_BRACKET_MATH_PATTERN),
+        ) if enabled
+    ]
+    if inline_block:
+        elements.append(_element("InlineBlockMath", _ProfileInlineBlockMath, f"(?:{'|'.join(inline_block)})"))
+    renderer = type("MathMarkdownRenderer", (MathMarkdownRenderer,), {
+        "display_delimiters": DISPLAY_DELIMITERS[profile["display"]],
+        "inline_delimiters": INLINE_DELIMITERS[profile["inline"]],
+    })
+    return MarkoExtension(
+        elements=elements,
+        parser_mixins=[NoSourcePositionsParser],
+        renderer_mixins=[renderer],
+    )
+
+
+class ConverterEngine:
+    """Reusable Markdown parser and renderer with the math extension applied
+
+    Creating a ``Markdown`` object and registering ``MathExtension`` composes
+    new parser and renderer classes, which is far more expensive than parsing
+    a typical clipboard snippet. The engine does this once per thread and keeps
+    the result. Marko parsers and renderers hold state while working, so each
+    thread gets its own instance and concurrent callers never share one.
+    """
+
+    def __init__(self, extensions=None, cache_namespace=None):
+        """
+        Args:
+            extensions (list): Marko extensions to register, defaults to [MathExtension]
+            cache_namespace (str): Keeps this engine's results apart from other engines' in a
+                ConversionCache; None to not cache them
+        """
+        self.extensions = list(extensions) if extensions is not None else [MathExtension]
+        self.cache_namespace = cache_namespace
+        self._local = threading.local()
+
+    def _markdown(self):
+        """Return the Markdown instance of the calling thread, building it on first use"""
+        md = getattr(self._local, "markdown", None)
+        if md is None:
+            md = Markdown()  # Do not specify renderer here, let extension system handle
+            md.use(*self.extensions)
+            md._setup_extensions()
+            self._local.markdown = md
+        return md
+
+    def parse(self, text):
+        """Parse text into a marko Document"""
+        return self._markdown().parse(text)
+
+    def render(self, doc):
+        """Render a Document produced by parse back to Markdown"""
+        return self._markdown().render(doc)
+
+    def reset(self):
+        """Drop the calling thread's parser and renderer, e.g. after a conversion was interrupted"""
+        self._local.markdown = None
+
+    def convert(self, text):
+        """Parse and render text in one step; the tree is freed as soon as it is rendered"""
+        md = self._markdown()
+        return md.render(md.parse(text))
+
+
+class ProfileEngine(ConverterEngine):
+    """ConverterEngine for a rule profile; get one from profiles.compile_profile, which caches it"""
+
+    def __init__(self, profile, key):
+        """
+        Args:
+            profile (dict): Normalized profile
+            key (str): profiles.profile_key of profile
+        """
+        super().__init__([build_math_extension(profile)], cache_namespace=f"profile:{key}")
+        self.profile = profile
+
+    def needs_conversion(self, text):
+        """Pre-scan used by convert_math_syntax instead of prescan.needs_conversion"""
+        return profile_needs_conversion(self.profile, text)
+
+    def __reduce__(self):
+        # Sent to worker processes as its profile and compiled there on first arrival
+        return compile_profile, (self.profile,)
+
+
+# Shared engine used by markdown_normalize, convert_math_syntax and the listeners
+default_engine = ConverterEngine(cache_namespace="")
+
+
+def markdown_normalize(text: str, engine: ConverterEngine = None) -> str:
     """Normalize markdown text by stripping trailing spaces and ensuring ending newline."""
-    md = Markdown()  # Do not specify renderer here, let extension system handle
-    md.use(MathExtension)
-    doc = md.parse(text)
-    normalized = md.render(doc)
-    return normalized
+    return (engine or default_engine).convert(text)
 if __name__ == "__main__":
     print("=" * 80)
     # Create custom Markdown instance and register extension
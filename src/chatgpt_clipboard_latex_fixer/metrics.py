@@ -0,0 +1,217 @@
+"""Latency histograms and event counters for the clipboard listeners.
+
+Every stage of handling a clipboard event (reading the clipboard, parsing,
+rendering, writing back, and the fixed sleeps of the platform loops) is timed
+into a histogram with fixed log-scale buckets, so memory stays constant no
+matter how long the listener runs. ``MetricsExporter`` flushes a JSON snapshot
+to a file periodically and can serve the same data in the Prometheus text
+format on a local port.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+
+# Stages of a clipboard event, in the order they happen
+STAGES = ("read", "parse", "render", "convert", "write", "sleep")
+# Outcomes counted per event
+# coalesced: replaced while waiting for the worker; stale: dropped because the clipboard changed
+# before write-back; over_budget: dropped because the conversion took too long;
+# block_fallback: blocks whose conversion failed and fell back on their own (counted per block)
+OUTCOMES = ("seen", "skipped", "converted", "failed", "coalesced", "stale", "over_budget", "block_fallback")
+
+# Bucket upper bounds in seconds: 50 us doubling up to ~26 s, plus an overflow bucket
+BUCKET_BOUNDS = tuple(0.00005 * 2 ** i for i in range(20))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket counts values above the largest bound
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, capped at the largest value seen"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum_s": self.sum,
+            "max_s": self.max,
+            "p50_s": self.quantile(0.50),
+            "p95_s": self.quantile(0.95),
+            "p99_s": self.quantile(0.99),
+            "buckets": list(self.counts),
+        }
+
+
+class _StageTimer:
+    """Context manager timing one stage into ListenerMetrics"""
+
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class ListenerMetrics:
+    """Per-stage histograms and outcome counters of one listener"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.counters = dict.fromkeys(OUTCOMES, 0)
+
+    def observe(self, stage, seconds):
+        """Record the duration of one stage"""
+        with self._lock:
+            self.histograms[stage].observe(seconds)
+
+    def time(self, stage):
+        """Context manager recording the time spent in its body as stage"""
+        return _StageTimer(self, stage)
+
+    def count(self, outcome, n=1):
+        """Increment an outcome counter"""
+        with self._lock:
+            self.counters[outcome] += n
+
+    def snapshot(self):
+        """Return all metrics as a JSON-serializable dict"""
+        with self._lock:
+            return {
+                "started": self.started,
+                "updated": time.time(),
+                "events": dict(self.counters),
+                "stages": {stage: histogram.as_dict() for stage, histogram in self.histograms.items()},
+                "bucket_bounds_s": list(BUCKET_BOUNDS),
+            }
+
+    def to_prometheus(self, prefix="chatgpt_latex_fixer"):
+        """Render the metrics in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {prefix}_events_total Clipboard events by outcome.",
+            f"# TYPE {prefix}_events_total counter",
+        ]
+        with self._lock:
+            for outcome, value in self.counters.items():
+                lines.append(f'{prefix}_events_total{{outcome="{outcome}"}} {value}')
+            name = f"{prefix}_stage_seconds"
+            lines.append(f"# HELP {name} Time spent per clipboard event stage.")
+            lines.append(f"# TYPE {name} histogram")
+            for stage, histogram in self.histograms.items():
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Background export of ListenerMetrics to a JSON file and/or a Prometheus endpoint"""
+
+    def __init__(self, metrics, json_path=None, interval=10.0, port=None, host="127.0.0.1"):
+        """
+        Args:
+            metrics (ListenerMetrics): Metrics to export
+            json_path (str): File rewritten with a snapshot every interval seconds, None to disable
+            interval (float): Seconds between JSON flushes
+            port (int): Serve the Prometheus text format on host:port/metrics, None to disable
+            host (str): Address to bind the endpoint to; keep it local
+        """
+        self.metrics = metrics
+        self.json_path = json_path
+        self.interval = interval
+        self.port = port
+        self.host = host
+        self._stop = threading.Event()
+        self._server = None
+
+    def start(self):
+        """Start the flush thread and the endpoint; returns self"""
+        if self.json_path:
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+        if self.port is not None:
+            self._server = self._make_server()
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Stop exporting, writing a last snapshot"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.json_path:
+            self.flush()
+
+    def flush(self):
+        """Write the JSON snapshot now, atomically replacing the previous one"""
+        tmp_path = f"{self.json_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.metrics.snapshot(), f, indent=2)
+            os.replace(tmp_path, self.json_path)
+        except OSError as e:
+            print(f"Warning: failed to write metrics to {self.json_path}: {e}")
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def _make_server(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the listener's output
+
+        return ThreadingHTTPServer((self.host, self.port), Handler)
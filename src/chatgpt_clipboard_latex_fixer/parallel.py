@@ -0,0 +1,149 @@
+"""Multi-core conversion of a single large document.
+
+Top-level blocks from ``split_blocks`` convert independently, so a huge paste
+or exported file can be cut at block boundaries, converted in chunks by a
+process pool and joined in order; the result is identical to a serial
+conversion. The pool is kept between calls and each worker imports marko and
+builds its parser when it starts, so only the first parallel conversion pays
+for process startup. ``convert_math_syntax(text, workers=N)`` uses this for
+texts of at least ``common.PARALLEL_MIN_CHARS`` characters.
+"""
+import os
+import threading
+import time
+
+from .common import ConversionStats, convert_block_isolated, warm_up
+from .deadline import ConversionTimeout
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+# Chunks per worker: enough to even out blocks of different cost, few enough to keep pickling cheap
+CHUNKS_PER_WORKER = 4
+
+
+def _init_worker():
+    warm_up()
+
+
+def _warmed():
+    return os.getpid()
+
+
+def get_pool(workers=None):
+    """
+    Return the shared process pool, starting it if needed.
+
+    Args:
+        workers (int): Number of worker processes, defaults to the CPU count;
+            a pool of a different size is replaced
+
+    Returns:
+        ProcessPoolExecutor: Pool whose workers have the marko engine built
+    """
+    global _pool, _pool_workers
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            _pool_workers = workers
+        return _pool
+
+
+def prewarm(workers=None):
+    """Start all worker processes now and wait until their engines are built"""
+    pool = get_pool(workers)
+    # Workers are started as tasks arrive; one task per worker starts them all
+    for future in [pool.submit(_warmed) for _ in range(_pool_workers)]:
+        future.result()
+
+
+def shutdown():
+    """Stop the shared pool"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool, _pool_workers = None, 0
+
+
+def _convert_chunk(job):
+    """Worker side: convert a run of consecutive blocks"""
+    blocks, offset, ends_document = job
+    stats = ConversionStats()
+    last = len(blocks) - 1
+    parts = []
+    for i, block in enumerate(blocks):
+        parts.append(convert_block_isolated(block, None, ends_document and i == last, None, stats, None, offset))
+        offset += len(block)
+    return ''.join(parts), stats.as_dict()
+
+
+def chunk_blocks(blocks, chunks):
+    """
+    Group consecutive blocks into about chunks runs of similar size.
+
+    Returns:
+        list: (blocks, start offset in the document, ends_document) jobs for _convert_chunk
+    """
+    target = max(1, sum(len(block) for block in blocks) // max(1, chunks))
+    jobs = []
+    current = []
+    size = 0
+    start = 0
+    for block in blocks:
+        current.append(block)
+        size += len(block)
+        if size >= target:
+            jobs.append((current, start, False))
+            start += size
+            current, size = [], 0
+    if current:
+        jobs.append((current, start, False))
+    if jobs:
+        jobs[-1] = jobs[-1][:2] + (True,)
+    return jobs
+
+
+def convert_blocks(blocks, workers=None, stats=None, deadline=None):
+    """
+    Convert the blocks of one document on the shared process pool.
+
+    Args:
+        blocks (list): Blocks from split_blocks, in document order
+        workers (int): Number of worker processes, defaults to the CPU count
+        stats (ConversionStats): Counters to update with the workers' counts, if given
+        deadline (Deadline): Budget of the conversion; chunks still running when it
+            runs out finish in the background and are dropped
+
+    Returns:
+        str: The converted document, or None if the pool could not be used
+
+    Raises:
+        ConversionTimeout: If deadline runs out before all chunks are converted
+    """
+    from concurrent.futures import TimeoutError
+    from concurrent.futures.process import BrokenProcessPool
+
+    timeout = None if deadline is None else max(0.0, deadline.expires - time.perf_counter())
+    try:
+        pool = get_pool(workers)
+        jobs = chunk_blocks(blocks, _pool_workers * CHUNKS_PER_WORKER)
+        parts = []
+        for output, counts in pool.map(_convert_chunk, jobs, timeout=timeout):  # map keeps the input order
+            parts.append(output)
+            if stats is not None:
+                stats.add(counts)
+    except TimeoutError:
+        raise ConversionTimeout("time budget exceeded waiting for worker processes") from None
+    except (BrokenProcessPool, OSError) as e:
+        print(f"Warning: parallel conversion unavailable, converting serially: {e}")
+        shutdown()
+        return None
+    return ''.join(parts)
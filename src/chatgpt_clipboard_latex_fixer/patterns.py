@@ -0,0 +1,39 @@
+"""Math delimiter patterns shared by the marko elements and the fast engine.
+
+Kept free of marko imports so the fast engine and the pre-scan can use them
+without loading the Markdown parser.
+
+The inline patterns run on whatever lands on the clipboard, log dumps and
+shell snippets included, so each is written to match in time linear in the
+text: no two parts of a pattern can match the same characters, and a match
+attempt never scans past the next opening delimiter or line break.
+"""
+
+# [ ... ] display math opening on its own line; expect_re already anchors at line start
+BLOCK_MATH_PATTERN = r' {0,3}\['
+# Block quote and list item prefixes in front of a line's content
+CONTAINER_PREFIX_PATTERN = r'(?:[ \t]*(?:>|[-*+](?=[ \t]|$)|\d{1,9}[.)](?=[ \t]|$)))*[ \t]*'
+# The "]" line closing [ ... ] display math, behind any container prefix; compile with re.MULTILINE
+BLOCK_MATH_END_PATTERN = rf'^{CONTAINER_PREFIX_PATTERN}\][^\S\n]*$'
+# \(...\) or $...$ on a single line; non-greedy so \(...\) stops at the first \)
+#   - \(...\) gives up at the next \( instead of rescanning the line from every unclosed \(
+#   - $...$ content runs from its first to its last non-space character, or is the last
+#     space of an all-space span, as with [^$\n]+? between two \s*; spelling it this way keeps
+#     the \s* runs from being retried at every position of a long run of spaces
+#   - $...$ neither opens nor closes on a "$" of "$$", so a $$ ... $$ display block is never
+#     read as "$" + inline math + "$" and collapsed onto one line
+PAREN_MATH_PATTERN = r'\\\(((?:[^\\\n]|\\(?!\())+?)\\\)'
+DOLLAR_MATH_PATTERN = r'(?<!\$)\$\s*([^\s\$](?:[^\$\n]*[^\s\$])?|[^\S\n](?=\n*\$))\s*\$(?!\$)'
+INLINE_MATH_PATTERN = f'(?:{PAREN_MATH_PATTERN}|{DOLLAR_MATH_PATTERN})'
+# marko's backslash escape, except the "\(" opening \(...\) math: the escape would take it as an
+# escaped "(" before the math element of the same priority got to it
+LITERAL_PATTERN = r'\\(?!\((?:[^\\\n]|\\(?!\())+?\\\))([!"#\$%&\'()*+,\-./:;<=>?@\[\\\]^_`{|}~])'
+# [ ... ] or \[ ... \] spanning exactly one inner line inside a paragraph
+ESCAPED_BRACKET_MATH_PATTERN = r'\\\[(\n[^\[\]\n]+?\n)\\\]'
+BARE_BRACKET_MATH_PATTERN = r'\[(\n[^\[\]\n]+?\n)\]'
+INLINE_BLOCK_MATH_PATTERN = f'(?:{ESCAPED_BRACKET_MATH_PATTERN}|{BARE_BRACKET_MATH_PATTERN})'
+# \begin{name} of one of the environments a rule profile lists; {names} is an alternation
+ENVIRONMENT_PATTERN = r'\\begin\{{(?P<env>{names})\}}'
+
+INLINE_MATH_PRIORITY = 7
+INLINE_BLOCK_MATH_PRIORITY = 8
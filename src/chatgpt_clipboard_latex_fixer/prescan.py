@@ -0,0 +1,115 @@
+"""Cheap pre-scan deciding whether a text can need math conversion at all.
+
+Most clipboard content (prose, URLs, code) contains none of the delimiters the
+marko extension rewrites, and the echo of our own write-back only contains
+tight ``$...$`` spans and ``$$`` display blocks. For those texts a full
+Markdown parse and re-render is wasted work, so ``convert_math_syntax`` asks
+``needs_conversion`` first and returns the input object unchanged when it says
+no. The scan is conservative: it may answer True for text that ends up
+unchanged, but never False for text the converter would rewrite. ``$$``
+fence lines are accepted as they are: ``$...$`` neither opens nor closes on
+a ``$`` of ``$$``, so the converter leaves ``$$`` display blocks alone too.
+"""
+import re
+
+
+# Triggers other than ``$``:
+#   - ``\(`` or ``\[`` anywhere (InlineMath / InlineBlockMath)
+#   - a ``[`` opening a line, possibly behind block quote or list markers (BlockMath)
+#   - a ``[`` closing a line (InlineBlockMath ``[\n ... \n]``)
+_TRIGGER_RE = re.compile(
+    r'\\[(\[]'
+    r'|^(?:[ \t>]|[-*+][ \t]|\d{1,9}[.)][ \t])*\['
+    r'|\[[ \t\r]*$',
+    re.MULTILINE,
+)
+
+
+def _is_fence_line(text, pos):
+    """
+    Check whether the ``$$`` at pos is alone on its line (a display math fence).
+
+    Only the whitespace next to the ``$$`` is looked at, never the whole line,
+    so a long line full of ``$`` is still scanned in linear time.
+    """
+    k = pos - 1
+    while k >= 0 and text[k] != '\n' and text[k].isspace():
+        k -= 1
+    if k >= 0 and text[k] != '\n':
+        return False
+    k = pos + 2
+    length = len(text)
+    while k < length and text[k] != '\n' and text[k].isspace():
+        k += 1
+    return k == length or text[k] == '\n'
+
+
+def _dollars_are_normalized(text):
+    """
+    Check that every ``$`` in text is already in normalized form.
+
+    Mirrors how ``InlineMath`` (``\\$\\s*([^\\$\\n]+?)\\s*\\$``) walks the text:
+    a match is harmless only if it has no whitespace to strip. ``$$`` lines
+    delimit display blocks and are accepted as they are.
+
+    Returns:
+        bool: True if converting would leave every ``$`` untouched
+    """
+    find = text.find
+    length = len(text)
+    i = find('$')
+    while i != -1:
+        nxt = text[i + 1:i + 2]
+        if nxt == '$':
+            if not _is_fence_line(text, i):
+                # The regex cannot open on "$$", it retries from the second "$"
+                i += 1
+                continue
+            # Skip to the closing fence; any other "$" in between is suspicious
+            closing = find('$', i + 2)
+            if closing == -1 or text[closing + 1:closing + 2] != '$' or not _is_fence_line(text, closing):
+                return False
+            i = find('$', closing + 2)
+            continue
+        if not nxt:
+            # Lone "$" at the very end of the text, nothing to match
+            return True
+        if nxt.isspace():
+            return False
+
+        line_end = find('\n', i + 1)
+        if line_end == -1:
+            line_end = length
+        closer = find('$', i + 1, line_end)
+        if closer != -1:
+            if text[closer - 1].isspace():
+                return False
+            i = find('$', closer + 1)
+            continue
+
+        # No closer on this line, but the trailing \s* may still reach a "$"
+        # across the line break, which would strip that whitespace.
+        k = line_end
+        while k < length and text[k].isspace():
+            k += 1
+        if k < length and text[k] == '$':
+            return False
+        i = find('$', line_end)
+    return True
+
+
+def needs_conversion(text):
+    """
+    Decide in linear time whether text can contain a convertible math delimiter.
+
+    Args:
+        text (str): The text to inspect
+
+    Returns:
+        bool: False if converting text is guaranteed to be a no-op, True otherwise
+    """
+    if ('\\' in text or '[' in text) and _TRIGGER_RE.search(text):
+        return True
+    if '$' in text:
+        return not _dollars_are_normalized(text)
+    return False
@@ -0,0 +1,153 @@
+"""Rule profiles: which delimiters are math and how math is written back.
+
+A profile is a flat table, given as a dict or a TOML (or JSON) file, for
+example::
+
+    # Only \\( \\) and $ $ inline, no bare [ ... ] display math
+    bare_brackets = false
+    # Treat these LaTeX environments as display math
+    environments = ["equation", "align*"]
+    # Write display math as \\[ ... \\] instead of $$ ... $$
+    display = "\\\\["
+
+Keys left out keep their DEFAULT_PROFILE value. ``compile_profile`` turns a
+profile into an engine for ``convert_math_syntax(text, engine=...)``: its
+delimiters are merged into one pattern per marko element and the engine is
+cached by a hash of the normalized profile, so every profile is compiled once
+per process and switching between profiles afterwards costs a dict lookup.
+The default profile compiles to the shared marko engine itself.
+"""
+import json
+import os
+import threading
+
+from .cache import content_key
+from .prescan import needs_conversion
+
+# Every key a profile may set, with the built-in behaviour as its value
+DEFAULT_PROFILE = {
+    "bare_brackets": True,  # "[" / "]" lines and [ ... ] around one line in a paragraph are display math
+    "escaped_brackets": True,  # \[ ... \] around one line in a paragraph is display math
+    "parens": True,  # \( ... \) is inline math
+    "dollars": True,  # $ ... $ is inline math, with the spaces inside the dollars removed
+    "environments": [],  # \begin{name} ... \end{name} blocks for these names are display math
+    "display": "$$",  # Output delimiters of display math: "$$" or "\\["
+    "inline": "$",  # Output delimiters of inline math: "$" or "\\("
+}
+_CHOICES = {"display": ("$$", "\\["), "inline": ("$", "\\(")}
+
+_compiled = {}  # Profile key -> engine
+_compile_lock = threading.Lock()
+
+
+def normalize_profile(profile):
+    """
+    Validate a profile and fill in the defaults.
+
+    Args:
+        profile (dict): Profile keys to override, None for the default profile
+
+    Returns:
+        dict: A complete profile, with environments sorted and deduplicated
+
+    Raises:
+        ValueError: If a key is unknown or a value has the wrong type or is not a valid choice
+    """
+    normalized = dict(DEFAULT_PROFILE)
+    for name, value in (profile or {}).items():
+        if name not in DEFAULT_PROFILE:
+            raise ValueError(f"Unknown profile key '{name}', expected one of: {', '.join(DEFAULT_PROFILE)}")
+        if name == "environments":
+            if isinstance(value, str) or not all(isinstance(env, str) and env and '}' not in env for env in value):
+                raise ValueError("Profile key 'environments' must be a list of environment names")
+            value = sorted(set(value))
+        elif name in _CHOICES:
+            if value not in _CHOICES[name]:
+                raise ValueError(f"Profile key '{name}' must be one of: {', '.join(_CHOICES[name])}")
+        elif not isinstance(value, bool):
+            raise ValueError(f"Profile key '{name}' must be true or false")
+        normalized[name] = value
+    return normalized
+
+
+def load_profile(path):
+    """
+    Read a profile from a TOML file, or a JSON file if path ends in .json.
+
+    Args:
+        path (str): Profile file
+
+    Returns:
+        dict: The normalized profile
+
+    Raises:
+        ValueError: If the file is not a valid profile
+        OSError: If the file cannot be read
+    """
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError("TOML profiles need Python 3.11 or tomli (pip install tomli); use a .json profile")
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: a profile must be a table of keys")
+    try:
+        return normalize_profile(data)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+
+
+def profile_key(profile):
+    """Hash identifying a normalized profile, the same in every process"""
+    return content_key(json.dumps(profile, sort_keys=True), "profile")
+
+
+def profile_needs_conversion(profile, text):
+    """
+    prescan.needs_conversion for a profile: False only if converting text with it is a no-op.
+
+    Args:
+        profile (dict): Normalized profile
+        text (str): The text to inspect
+    """
+    if profile["inline"] != "$" and profile["dollars"] and '$' in text:
+        return True  # Even normalized $x$ is rewritten
+    if profile["environments"] and '\\begin{' in text:
+        return True
+    return needs_conversion(text)
+
+
+def compile_profile(profile=None):
+    """
+    Return the engine converting with profile, compiling it on first use.
+
+    Args:
+        profile (dict or str): Profile dict (normalized or not), path of a profile file,
+            or None for the default profile
+
+    Returns:
+        The shared marko engine for the default profile, otherwise a ProfileEngine
+    """
+    if isinstance(profile, (str, os.PathLike)):
+        profile = load_profile(os.fspath(profile))
+    profile = normalize_profile(profile)
+    from .math_parser import ProfileEngine, default_engine
+
+    if profile == DEFAULT_PROFILE:
+        return default_engine
+    key = profile_key(profile)
+    engine = _compiled.get(key)
+    if engine is None:
+        with _compile_lock:
+            engine = _compiled.get(key)
+            if engine is None:
+                engine = _compiled[key] = ProfileEngine(profile, key)
+    return engine
@@ -0,0 +1,72 @@
+"""Adaptive poll intervals for clipboard backends without change notifications.
+
+Copies come in bursts: someone copying an answer often copies the next one a
+few seconds later, then nothing happens for minutes. ``PollScheduler`` polls
+at its floor interval right after activity and doubles the interval on every
+idle poll up to its ceiling, so conversion latency stays low while the user is
+active and an idle listener wakes up less often. The default ceiling of 2 s
+makes an idle listener wake up a quarter as often as the fixed 0.5 s interval
+the listeners used before, for at most 2 s before the first copy after a pause
+is converted; ``listen --poll-ceiling`` trades one for the other.
+"""
+import threading
+import time
+
+
+class PollScheduler:
+    """Exponential backoff between a floor and a ceiling poll interval"""
+
+    def __init__(self, floor=0.05, ceiling=2.0, backoff=2.0, hot_seconds=2.0):
+        """
+        Args:
+            floor (float): Seconds between polls right after activity
+            ceiling (float): Longest wait between polls while idle, which bounds the latency of the first copy
+            backoff (float): Factor the interval grows by per idle poll once the hot period is over
+            hot_seconds (float): Keep polling at the floor interval this long after the last change
+        """
+        if floor <= 0 or ceiling < floor:
+            raise ValueError(f"Poll intervals must satisfy 0 < floor <= ceiling, got {floor} and {ceiling}")
+        if backoff < 1:
+            raise ValueError(f"Backoff factor must be at least 1, got {backoff}")
+        self.floor = floor
+        self.ceiling = ceiling
+        self.backoff = backoff
+        self.hot_seconds = hot_seconds
+        self.interval = floor
+        self.last_activity = float("-inf")
+        self._wake = threading.Event()
+
+    def record(self, changed):
+        """
+        Update the interval after a poll.
+
+        Args:
+            changed (bool): Whether the poll saw a clipboard change
+
+        Returns:
+            float: Seconds to wait before the next poll
+        """
+        now = time.monotonic()
+        if changed:
+            self.last_activity = now
+            self.interval = self.floor
+        elif now - self.last_activity > self.hot_seconds:
+            self.interval = min(self.interval * self.backoff, self.ceiling)
+        return self.interval
+
+    def wait(self, seconds):
+        """
+        Sleep until the next poll, or until wake() is called.
+
+        Returns:
+            bool: True if woken early
+        """
+        woken = self._wake.wait(seconds)
+        self._wake.clear()
+        return woken
+
+    def wake(self):
+        """Poll now and go back to the floor interval, e.g. on a hotkey or when stopping"""
+        self.last_activity = time.monotonic()
+        self.interval = self.floor
+        self._wake.set()
@@ -6,7 +6,7 @@ import win32gui
 import time
 import threading
 import ctypes
-from .base_clipboard_listener import BaseClipboardListener
+from .base_clipboard_listener import BaseClipboardListener, ClipboardProbe
 
 # Windows message constants
 WM_CLIPBOARDUPDATE = 0x031D
@@ -17,7 +17,6 @@ class WinClipboardListener(BaseClipboardListener):
         """Initialize the clipboard listener"""
         super().__init__()
         self.hwnd = None
-        self.is_processing = False  # Flag to prevent recursive processing
         self.running = True  # Flag to control the message loop
         print("Clipboard listener successfully initialized")
 
@@ -39,40 +38,38 @@ class WinClipboardListener(BaseClipboardListener):
         return None
 
     def set_clipboard_text(self, text):
-        """Set text content to clipboard"""
+        """Set text content to clipboard; False if it could not be opened, e.g. while another thread has it open"""
         try:
             win32clipboard.OpenClipboard()
             win32clipboard.EmptyClipboard()
             win32clipboard.SetClipboardData(win32con.CF_UNICODETEXT, text)
             win32clipboard.CloseClipboard()
+            return True
         except Exception as e:
             print(f"Error setting clipboard content: {e}")
             try:
                 win32clipboard.CloseClipboard()
             except:
                 pass
+            return False
 
-    def on_clipboard_change(self, content):
-        """Process the changed clipboard content"""
-        if self.is_processing:
-            return
-        
-        # Set flag to prevent recursive processing
-        self.is_processing = True
-        
-        try:
-            # Call the base class implementation
-            super().on_clipboard_change(content)
-        finally:
-            # Reset flag after a short delay
-            time.sleep(0.1)
-            self.is_processing = False
+    def get_clipboard_change_count(self):
+        """Clipboard sequence number, incremented by Windows on every change"""
+        return win32clipboard.GetClipboardSequenceNumber()
+
+    def probe_clipboard(self):
+        """Sequence number and whether CF_UNICODETEXT is on offer; neither opens the clipboard"""
+        return ClipboardProbe(
+            win32clipboard.GetClipboardSequenceNumber(),
+            bool(win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT)),
+            None,
+        )
 
     def wnd_proc(self, hwnd, msg, wparam, lparam):
         """Window procedure to handle messages"""
         if msg == WM_CLIPBOARDUPDATE:
-            content = self.get_clipboard_text()
-            if content and content != self.last_processed_content:
+            content = self.read_clipboard()
+            if content:
                 self.on_clipboard_change(content)
         elif msg == win32con.WM_DESTROY:
             win32gui.PostQuitMessage(0)
@@ -112,6 +109,7 @@ class WinClipboardListener(BaseClipboardListener):
         
         # Add this window to the clipboard viewer chain
         ctypes.windll.user32.AddClipboardFormatListener(self.hwnd)
+        self.warm_up_in_background()
         print("Listening for clipboard content changes...")
         print("Press Ctrl+C to stop")
         
@@ -0,0 +1,64 @@
+"""Conversion time on adversarial inputs, and the time budget.
+
+The inputs are the ADVERSARIAL kinds of benchmarks/corpus.py, measured the way
+benchmarks/bench_adversarial.py does at sizes small enough for the test suite.
+"""
+import math
+import os
+import sys
+import time
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer.common import ConversionStats, convert_math_syntax, convert_math_syntax_legacy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import bench_adversarial  # noqa: E402
+from corpus import ADVERSARIAL, adversarial  # noqa: E402
+
+CONVERTERS = {
+    "marko": lambda text: convert_math_syntax(text, cache=None),
+    "fast": lambda text: convert_math_syntax(text, engine="fast", cache=None),
+    "legacy": convert_math_syntax_legacy,
+}
+SIZES = (4 * 1024, 16 * 1024)
+MAX_EXPONENT = 1.3  # Growth exponent of the time from the smallest to the largest size; 1.0 is linear
+MIN_TIME = 0.02  # Seconds below which the timings are mostly noise
+
+
+@pytest.mark.parametrize("engine", list(CONVERTERS))
+@pytest.mark.parametrize("kind", list(ADVERSARIAL))
+def test_time_grows_linearly(kind, engine):
+    times = [bench_adversarial.best_of(2, lambda: CONVERTERS[engine](adversarial(kind, size))) for size in SIZES]
+    exponent = math.log(max(times[-1], 1e-9) / max(times[0], 1e-9)) / math.log(SIZES[-1] / SIZES[0])
+    assert times[-1] < MIN_TIME or exponent <= MAX_EXPONENT, f"{times} grows with exponent {exponent:.2f}"
+
+
+@pytest.mark.parametrize("engine", ["marko", "fast"])
+def test_unmatched_parens_finish_quickly(engine):
+    text = adversarial("open_parens", 256 * 1024 if engine == "fast" else 64 * 1024)
+    start = time.perf_counter()
+    convert_math_syntax(text, engine=engine, cache=None)
+    assert time.perf_counter() - start < 5.0
+
+
+@pytest.mark.parametrize("engine", ["marko", "fast"])
+def test_expired_budget_returns_the_input(engine):
+    text = "Let $ x $ be.\n\n" * 100
+    stats = ConversionStats()
+    assert convert_math_syntax(text, engine=engine, cache=None, stats=stats, time_budget=0) is text
+    assert stats.documents_timed_out == 1
+    assert convert_math_syntax("Let $ x $ be.\n", engine=engine, cache=None) == "Let $x$ be.\n"
+
+
+def test_budget_interrupts_a_slow_parse():
+    text = bench_adversarial.backtick_runs(256 * 1024)  # One paragraph marko's inline parser takes far longer on
+    stats = ConversionStats()
+    start = time.perf_counter()
+    assert convert_math_syntax(text, cache=None, stats=stats, time_budget=0.3) == text
+    assert time.perf_counter() - start < 1.5
+    assert stats.documents_timed_out == 1
+    # The interrupted parser was reset
+    assert convert_math_syntax("So \\( y \\) holds.\n", cache=None) == "So $y$ holds.\n"
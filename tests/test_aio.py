@@ -0,0 +1,221 @@
+"""AsyncConverter admission limits and cancellation.
+
+A gate holds conversions on the executor until the test opens it, so calls
+pile up against the limits the way they do when text is submitted faster
+than it converts.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer import aio
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax
+
+TEXTS = [f"Step {i}: the value \\( x_{i} \\) holds.\n" for i in range(6)]
+
+
+class Gate:
+    """Stands in for the executor side of the converter, recording what started and how much ran at once"""
+
+    def __init__(self):
+        self.opened = threading.Event()
+        self.held = None  # Texts that wait for the gate; None holds every text
+        self.started = []
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, text, engine, use_cache):
+        with self.lock:
+            self.started.append(text)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            if self.held is None or text in self.held:
+                assert self.opened.wait(5)
+            return convert_math_syntax(text, engine=engine, cache=None)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    gate = Gate()
+    monkeypatch.setattr(aio, "_convert", gate)
+    yield gate
+    gate.opened.set()
+
+
+def expected(text):
+    return convert_math_syntax(text, engine="fast", cache=None)
+
+
+async def until(condition):
+    """Let the loop and the executor threads run until condition holds"""
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_in_flight_limit(gate):
+    async def scenario():
+        converter = aio.AsyncConverter(max_in_flight=2, executor=ThreadPoolExecutor(8), engine="fast", cache=False)
+        tasks = [asyncio.ensure_future(converter.convert(text)) for text in TEXTS]
+        await until(lambda: len(gate.started) == 2)
+        await asyncio.sleep(0.05)
+        assert len(gate.started) == 2  # The executor has threads to spare; the converter holds the rest back
+        assert converter.in_flight == 2
+        assert not any(task.done() for task in tasks)
+        gate.opened.set()
+        assert await asyncio.gather(*tasks) == [expected(text) for text in TEXTS]
+        await until(lambda: converter.in_flight == 0)
+        assert converter.queued_bytes == 0
+        converter.close()
+
+    asyncio.run(scenario())
+    assert gate.peak == 2
+
+
+def test_queued_bytes_limit(gate):
+    texts = [text.ljust(60) for text in TEXTS[:3]]
+
+    async def scenario():
+        converter = aio.AsyncConverter(max_in_flight=10, max_queued_bytes=100, engine="fast", cache=False)
+        tasks = [asyncio.ensure_future(converter.convert(text)) for text in texts]
+        await until(lambda: len(gate.started) == 1)
+        await asyncio.sleep(0.05)
+        assert (converter.in_flight, converter.queued_bytes) == (1, 60)  # A second text would take it to 120
+        gate.opened.set()
+        assert await asyncio.gather(*tasks) == [expected(text) for text in texts]
+        converter.close()
+
+    asyncio.run(scenario())
+    assert gate.peak == 1
+
+
+def test_oversized_text_is_accepted_when_nothing_is_pending(gate):
+    gate.opened.set()
+
+    async def scenario():
+        converter = aio.AsyncConverter(max_queued_bytes=10, engine="fast", cache=False)
+        assert await asyncio.wait_for(converter.convert(TEXTS[0]), 5) == expected(TEXTS[0])
+        converter.close()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiting_call_never_starts(gate):
+    async def scenario():
+        converter = aio.AsyncConverter(max_in_flight=1, engine="fast", cache=False)
+        first = asyncio.ensure_future(converter.convert(TEXTS[0]))
+        waiting = asyncio.ensure_future(converter.convert(TEXTS[1]))
+        await until(lambda: gate.started == [TEXTS[0]])
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert (converter.in_flight, converter.queued_bytes) == (1, len(TEXTS[0]))  # Nothing taken, nothing given back
+        gate.opened.set()
+        assert await first == expected(TEXTS[0])
+        assert await converter.convert(TEXTS[2]) == expected(TEXTS[2])
+        await until(lambda: converter.in_flight == 0)
+        converter.close()
+
+    asyncio.run(scenario())
+    assert gate.started == [TEXTS[0], TEXTS[2]]
+
+
+def test_cancelled_running_call_holds_its_slot_until_the_executor_is_done(gate):
+    async def scenario():
+        converter = aio.AsyncConverter(max_in_flight=1, engine="fast", cache=False)
+        running = asyncio.ensure_future(converter.convert(TEXTS[0]))
+        await until(lambda: gate.running == 1)
+        running.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await running
+        following = asyncio.ensure_future(converter.convert(TEXTS[1]))
+        await asyncio.sleep(0.05)
+        assert converter.in_flight == 1
+        assert not following.done()  # The executor still converts the cancelled text
+        gate.opened.set()
+        assert await following == expected(TEXTS[1])
+        await until(lambda: converter.in_flight == 0)
+        converter.close()
+
+    asyncio.run(scenario())
+    assert gate.started == [TEXTS[0], TEXTS[1]]
+
+
+def test_cancelled_call_queued_on_the_executor_never_starts(gate):
+    async def scenario():
+        converter = aio.AsyncConverter(max_in_flight=2, executor=ThreadPoolExecutor(1), engine="fast", cache=False)
+        first = asyncio.ensure_future(converter.convert(TEXTS[0]))
+        queued = asyncio.ensure_future(converter.convert(TEXTS[1]))
+        await until(lambda: gate.running == 1 and converter.in_flight == 2)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        await until(lambda: converter.in_flight == 1)  # Withdrawn from the executor queue, so released at once
+        gate.opened.set()
+        assert await first == expected(TEXTS[0])
+        await until(lambda: converter.in_flight == 0)
+        converter.executor.shutdown(wait=True)
+
+    asyncio.run(scenario())
+    assert gate.started == [TEXTS[0]]
+
+
+def test_close_cancels_conversions_that_have_not_started(gate):
+    async def scenario():
+        converter = aio.AsyncConverter(max_in_flight=2, executor=ThreadPoolExecutor(1), engine="fast", cache=False)
+        first = asyncio.ensure_future(converter.convert(TEXTS[0]))
+        queued = asyncio.ensure_future(converter.convert(TEXTS[1]))
+        await until(lambda: gate.running == 1 and converter.in_flight == 2)
+        converter.close()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        gate.opened.set()
+        assert await first == expected(TEXTS[0])
+        converter.executor.shutdown(wait=True)
+
+    asyncio.run(scenario())
+    assert gate.started == [TEXTS[0]]
+
+
+@pytest.mark.parametrize("as_async", [False, True])
+def test_convert_many_keeps_input_order(gate, as_async):
+    gate.opened.set()
+
+    async def source():
+        for text in TEXTS:
+            yield text
+
+    async def scenario():
+        converter = aio.AsyncConverter(max_in_flight=2, engine="fast", cache=False)
+        outputs = [output async for output in converter.convert_many(source() if as_async else TEXTS, window=3)]
+        converter.close()
+        return outputs
+
+    assert asyncio.run(scenario()) == [expected(text) for text in TEXTS]
+    assert gate.peak <= 2
+
+
+def test_closing_convert_many_early_cancels_pending_conversions(gate):
+    gate.held = {TEXTS[1]}
+
+    async def scenario():
+        converter = aio.AsyncConverter(max_in_flight=4, executor=ThreadPoolExecutor(1), engine="fast", cache=False)
+        outputs = converter.convert_many(TEXTS, window=4)
+        assert await outputs.__anext__() == expected(TEXTS[0])
+        await outputs.aclose()
+        gate.opened.set()
+        await until(lambda: converter.in_flight == 0)
+        converter.executor.shutdown(wait=True)
+
+    asyncio.run(scenario())
+    assert gate.started[0] == TEXTS[0]
+    assert set(gate.started) <= {TEXTS[0], TEXTS[1]}  # Those behind the held one were withdrawn
@@ -0,0 +1,95 @@
+"""ConversionCache: eviction from the document LRU, the block LRU and the disk tier,
+entries of different engines and profiles kept apart, and corrupt disk entries."""
+import os
+
+from chatgpt_clipboard_latex_fixer.cache import ConversionCache, content_key
+from chatgpt_clipboard_latex_fixer.common import ConversionStats, convert_math_syntax
+from chatgpt_clipboard_latex_fixer.profiles import compile_profile
+
+BLOCKS = [f"Block {i} holds $ x_{i} $.\n\n" for i in range(4)]
+
+
+def disk_entries(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".md"))
+
+
+def test_document_lru_evicts_the_least_recently_used():
+    cache = ConversionCache(max_entries=2, block_max_bytes=None)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # Now b is the least recently used
+    cache.put("c", "C")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("A", None, "C")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_document_lru_is_bounded_by_size():
+    text = "x" * 1000
+    cache = ConversionCache(max_bytes=2500, block_max_bytes=None)
+    for key in "abc":
+        cache.put(key, text)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 2 and cache.stats()["bytes"] <= 2500
+    cache.put("huge", "x" * 5000)  # Larger than the whole tier: not kept, and evicts nothing
+    assert cache.get("huge") is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_block_lru_evicts_blocks_and_reuses_the_rest():
+    cache = ConversionCache(block_max_entries=3)
+    convert_math_syntax("".join(BLOCKS), cache=cache)
+    blocks = cache.stats()["blocks"]
+    assert (blocks["entries"], blocks["evictions"]) == (3, 1)
+
+    stats = ConversionStats()
+    grown = "".join(BLOCKS[1:]) + "A new block with $ y $.\n"
+    assert convert_math_syntax(grown, cache=cache, stats=stats) == convert_math_syntax(grown, cache=None)
+    assert (stats.blocks_reused, stats.blocks_parsed) == (3, 1)
+
+
+def test_disk_tier_keeps_documents_only_and_survives_a_restart(tmp_path):
+    text = "".join(BLOCKS)
+    convert_math_syntax(text, cache=ConversionCache(disk_dir=str(tmp_path)))
+    assert len(disk_entries(tmp_path)) == 1  # Blocks stay in memory
+
+    fresh = ConversionCache(disk_dir=str(tmp_path))
+    assert convert_math_syntax(text, cache=fresh) == convert_math_syntax(text, cache=None)
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_disk_tier_prunes_the_oldest_files(tmp_path):
+    cache = ConversionCache(disk_dir=str(tmp_path), disk_max_entries=10)
+    for i in range(10):
+        cache.put(f"key{i:02d}", f"value {i}")
+        os.utime(tmp_path / f"key{i:02d}.md", (1000 + i, 1000 + i))
+    cache.put("key10", "value 10")
+    # A tenth more than needed is dropped, oldest first
+    assert disk_entries(tmp_path) == [f"key{i:02d}.md" for i in range(2, 11)]
+
+
+def test_engines_and_profiles_do_not_share_entries():
+    cache = ConversionCache()
+    text = "Let $ x $ be so that [\nx = 1\n] holds.\n"
+    parens = compile_profile({"inline": "\\("})
+    default_result = convert_math_syntax(text, cache=cache)
+    parens_result = convert_math_syntax(text, engine=parens, cache=cache)
+    assert parens_result == convert_math_syntax(text, engine=parens, cache=None) != default_result
+    assert convert_math_syntax(text, cache=cache) == default_result
+    assert content_key(text, "") != content_key(text, parens.cache_namespace)
+
+    entries = cache.stats()["entries"]
+    assert convert_math_syntax(text, engine="fast", cache=cache) == convert_math_syntax(text, engine="fast", cache=None)
+    assert cache.stats()["entries"] == entries  # The fast engine edits in place and is never cached
+
+
+def test_corrupt_disk_entry_is_replaced(tmp_path):
+    text = "Let $ x $ be.\n"
+    expected = convert_math_syntax(text, cache=None)
+    convert_math_syntax(text, cache=ConversionCache(disk_dir=str(tmp_path)))
+    (name,) = disk_entries(tmp_path)
+    (tmp_path / name).write_bytes(b"\xff\xfe not UTF-8")
+
+    cache = ConversionCache(disk_dir=str(tmp_path))
+    assert convert_math_syntax(text, cache=cache) == expected  # A miss, converted again
+    assert (tmp_path / name).read_text(encoding="utf-8") == expected  # And written back in its place
+    assert convert_math_syntax(text, cache=ConversionCache(disk_dir=str(tmp_path))) == expected
@@ -0,0 +1,72 @@
+"""Slow-conversion capture and replay: what is captured comes back byte for byte, with its engine."""
+import json
+import os
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer.capture import SlowCapture, engine_from_spec, load_captures, replay_capture
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax
+from chatgpt_clipboard_latex_fixer.main import main
+from chatgpt_clipboard_latex_fixer.profiles import compile_profile
+
+TEXT = "Windows line ends\r\nwith $ x $ and \\( y \\),\r\n\r\nand a lone surrogate \ud800 copied as is.\n"
+PROFILE = {"inline": "\\(", "environments": ["align"]}
+
+
+def read_input(path):
+    with open(path, "rb") as f:
+        return f.read().decode("utf-8", "surrogatepass")
+
+
+@pytest.mark.parametrize("engine", [None, "fast", PROFILE])
+def test_capture_replays_the_same_conversion(tmp_path, engine):
+    engine = compile_profile(engine) if isinstance(engine, dict) else engine
+    capture = SlowCapture(str(tmp_path), threshold=0)
+    converted = convert_math_syntax(TEXT, engine=engine, cache=None, capture=capture, time_budget=30)
+
+    ((meta, text_path),) = load_captures(str(tmp_path))
+    assert read_input(text_path) == TEXT
+    assert (meta["size"], meta["count"], meta["time_budget"], meta["timed_out"]) == (len(TEXT), 1, 30, False)
+
+    replayed_engine = engine_from_spec(meta["engine"])
+    assert replayed_engine == (engine or "marko")  # The same compiled profile engine, or the same name
+    assert convert_math_syntax(read_input(text_path), engine=replayed_engine, cache=None) == converted
+    assert replay_capture(meta, text_path, repeat=2) >= 0
+
+
+def test_fast_conversions_are_not_captured(tmp_path):
+    capture = SlowCapture(str(tmp_path / "slow"), threshold=60)
+    convert_math_syntax(TEXT, cache=None, capture=capture)
+    assert capture.captured == 0 and not os.path.exists(tmp_path / "slow")
+
+
+def test_same_input_is_counted_not_duplicated(tmp_path):
+    capture = SlowCapture(str(tmp_path), threshold=0)
+    for _ in range(3):
+        convert_math_syntax(TEXT, cache=None, capture=capture)
+    ((meta, _),) = load_captures(str(tmp_path))
+    assert meta["count"] == 3
+
+
+def test_oldest_captures_are_dropped(tmp_path):
+    capture = SlowCapture(str(tmp_path), threshold=0, max_entries=2)
+    keys = []
+    for i in range(3):
+        keys.append(capture.observe(f"Input {i} $ x $\n", None, 1.0))
+        os.utime(tmp_path / f"{keys[-1]}.json", (1000 + i, 1000 + i))
+    assert sorted(meta["key"] for meta, _ in load_captures(str(tmp_path))) == sorted(keys[1:])
+    assert not any(name.startswith(keys[0]) for name in os.listdir(tmp_path))
+
+
+def test_replay_command_reports_every_capture(tmp_path, capsys):
+    capture = SlowCapture(str(tmp_path), threshold=0)
+    convert_math_syntax(TEXT, cache=None, capture=capture)
+    convert_math_syntax(TEXT + "More.\n", engine=compile_profile(PROFILE), cache=None, capture=capture)
+    unknown = capture.observe("Converted by a custom engine $ z $\n", object(), 1.0)
+
+    assert main(["replay", str(tmp_path), "--repeat", "1", "--tolerance", "1000"]) == 0
+    lines = capsys.readouterr().out.splitlines()[1:]
+    assert len(lines) == 2 + 1
+    assert any(line.startswith(unknown[:12]) and "skipped" in line for line in lines)
+    with open(tmp_path / f"{unknown}.json", encoding="utf-8") as f:
+        assert json.load(f)["engine"] is None
@@ -0,0 +1,87 @@
+"""Off-thread conversion on the fake clipboard backend: latest-wins coalescing and stale write-backs.
+
+A gate holds the conversion worker before its first conversion, so copies made
+meanwhile queue up the way they do when documents are copied faster than they
+convert.
+"""
+import threading
+
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax
+from chatgpt_clipboard_latex_fixer.fakeclip import FakeClipboard, FakeClipboardListener
+
+DOCUMENTS = [f"Step {i}: the value $ x_{i} $ and \\( y_{i} \\) hold.\n" for i in range(5)]
+
+
+class GatedListener(FakeClipboardListener):
+    """Listener whose worker waits for the gate before converting"""
+
+    def __init__(self):
+        super().__init__(FakeClipboard())
+        self.cache = None
+        self.conversion_budget = None
+        self.gate = threading.Event()
+        self.converting = threading.Event()
+
+    def convert_and_write_back(self, content, generation=None, source_change_count=None):
+        self.converting.set()
+        self.gate.wait(5)
+        super().convert_and_write_back(content, generation, source_change_count)
+
+
+def notify(listener, text):
+    """Copy text and deliver the change notification, as the Windows message loop does"""
+    listener.clipboard.copy(text)
+    content = listener.read_clipboard()
+    if content:
+        listener.on_clipboard_change(content)
+
+
+def events(listener):
+    return listener.metrics.snapshot()["events"]
+
+
+def test_notification_returns_while_the_worker_converts():
+    listener = GatedListener()
+    notify(listener, DOCUMENTS[0])
+    assert listener.converting.wait(5)
+    assert listener.clipboard.text == DOCUMENTS[0]  # Handed off, not converted on the event thread
+    listener.gate.set()
+    assert listener.flush(5)
+    assert listener.clipboard.text == convert_math_syntax(DOCUMENTS[0], cache=None)
+
+
+def test_inline_conversion_writes_back_before_returning():
+    listener = GatedListener()
+    listener.convert_in_background = False
+    listener.gate.set()
+    notify(listener, DOCUMENTS[0])
+    assert listener.clipboard.text == convert_math_syntax(DOCUMENTS[0], cache=None)
+
+
+def test_burst_writes_back_only_the_latest_copy():
+    listener = GatedListener()
+    notify(listener, DOCUMENTS[0])
+    assert listener.converting.wait(5)
+    for document in DOCUMENTS[1:]:
+        notify(listener, document)
+    listener.gate.set()
+    assert listener.flush(5)
+
+    assert listener.clipboard.text == convert_math_syntax(DOCUMENTS[-1], cache=None)
+    counts = events(listener)
+    assert counts["coalesced"] == len(DOCUMENTS) - 2  # Replaced while waiting behind the first one
+    assert counts["stale"] == 1  # The first one, overtaken while it converted
+    assert counts["converted"] == 1
+
+
+def test_stale_write_back_keeps_newer_content():
+    listener = GatedListener()
+    notify(listener, DOCUMENTS[0])
+    assert listener.converting.wait(5)
+    listener.clipboard.copy("Something else the user copied")  # No notification: the worker has to notice
+    listener.gate.set()
+    assert listener.flush(5)
+
+    assert listener.clipboard.text == "Something else the user copied"
+    assert events(listener)["stale"] == 1
+    assert events(listener)["converted"] == 0
@@ -0,0 +1,22 @@
+"""convert_math_syntax on both engines: converting converted text changes nothing."""
+import pytest
+
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax
+
+ENGINES = ["marko", "fast"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("text", [
+    "x $a$ and $ b $\n",
+    "Spaced \\( b \\) and tight \\(c\\) inline.\n",
+    "Tabs \\(\tq  \\) and a blank \\( \\) and two \\(  \\).\n",
+])
+def test_second_pass_changes_nothing(engine, text):
+    once = convert_math_syntax(text, engine=engine, cache=None)
+    assert convert_math_syntax(once, engine=engine, cache=None) == once
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_spaced_paren_math_is_stripped(engine):
+    assert convert_math_syntax("Let \\( b \\) be.\n", engine=engine, cache=None) == "Let $b$ be.\n"
@@ -0,0 +1,65 @@
+"""Daemon socket permissions, the client's owner check, and malformed request headers."""
+import json
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer import daemon
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix domain sockets")
+
+
+@pytest.fixture
+def server(tmp_path):
+    """A daemon serving on a socket in tmp_path, stopped after the test"""
+    server = daemon.ConversionServer(str(tmp_path / "daemon.sock"), workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join(5)
+
+
+def test_socket_is_private_from_the_start(server):
+    assert stat.S_IMODE(os.stat(server.server_address).st_mode) & 0o077 == 0
+
+
+def test_default_socket_directory_is_private(tmp_path, monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr("tempfile.gettempdir", lambda: str(tmp_path))
+    directory = os.path.dirname(daemon.default_socket_path())
+    assert os.path.dirname(directory) == str(tmp_path)
+    daemon.ensure_private_directory(directory)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    daemon.ensure_private_directory(directory)  # Ours already: accepted as it is
+
+
+def test_shared_directory_is_refused(tmp_path):
+    directory = tmp_path / "shared"
+    directory.mkdir()
+    directory.chmod(0o755)
+    with pytest.raises(RuntimeError):
+        daemon.ensure_private_directory(str(directory))
+
+
+def test_client_refuses_socket_of_another_user(server, monkeypatch):
+    assert daemon.ping(server.server_address, timeout=5) == os.getpid()
+    uid = os.getuid()
+    monkeypatch.setattr(daemon.os, "getuid", lambda: uid + 1)
+    with pytest.raises(PermissionError):
+        daemon.convert_via_daemon("$ x $", socket_path=server.server_address, timeout=5)
+
+
+@pytest.mark.parametrize("header", [[1, 2], "convert", 3, None])
+def test_non_object_header_drops_the_connection(server, header):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(server.server_address)
+        daemon.send_frame(sock, json.dumps(header).encode("utf-8"))
+        daemon.send_frame(sock, b"$ x $")
+        assert daemon.recv_frame(sock) is None  # Closed without an answer
+    assert daemon.convert_via_daemon("Let $ x $ be.\n", socket_path=server.server_address, timeout=5) == "Let $x$ be.\n"
@@ -0,0 +1,81 @@
+"""The fast engine's edit list: region-restricted scanning against a walk of every line, and splice.
+
+Documents come from benchmarks/corpus.py with several seeds and nesting depths,
+the repository's test cases, and snippets that make the region scan fall back
+to the full walk or keep a construct open across blank lines.
+"""
+import os
+import sys
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax
+from chatgpt_clipboard_latex_fixer.fast_engine import fast_engine, math_edits, splice
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import corpus  # noqa: E402
+
+SNIPPETS = [
+    "Plain text without math.\n",
+    "Let $ x $ be.\n\n```\n$ not math $\n```\n\nThen \\( y \\).\n",
+    "<div>\n$ inside html $\n</div>\n\nAfter $ z $.\n",
+    "  ```\n  $ in an indented fence $\n  ```\n\n$ a $\n",
+    "Text\n[\nx\n\nmore $ b $\n",
+    "[\nunclosed\n\n$ c $ after\n\n]\n",
+    "- item \\[\n  x\n  \\]\n\n> quote $ d $\n>\n> [\n> e\n> ]\n",
+    "    indented code $ f $\n\nText $ g $\n",
+]
+
+
+def documents():
+    for seed in range(12):
+        yield f"corpus seed {seed}", corpus.generate(6 * 1024, seed=seed, nesting=seed % 4, code_ratio=0.2)
+    folder = os.path.join(ROOT, "testcases")
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".txt"):
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                yield name, f.read()
+    for index, snippet in enumerate(SNIPPETS):
+        yield f"snippet {index}", snippet
+
+
+DOCUMENTS = list(documents())
+
+
+def full_walk_edits(text):
+    """The edits of a walk over every line, without the pre-scan or the regions"""
+    return [
+        edit for span in fast_engine.math_spans(text) for edit in span[4]
+        if text[edit[0]:edit[1]] != edit[2]
+    ]
+
+
+@pytest.mark.parametrize("name, text", DOCUMENTS, ids=[name for name, _ in DOCUMENTS])
+def test_edits_give_the_full_render(name, text):
+    edits = math_edits(text)
+    assert edits == full_walk_edits(text)
+    assert splice(text, edits) == convert_math_syntax(text, engine="fast", cache=None)
+
+
+@pytest.mark.parametrize("name, text", DOCUMENTS, ids=[name for name, _ in DOCUMENTS])
+def test_edits_are_sorted_and_disjoint(name, text):
+    edits = math_edits(text)
+    for start, end, replacement in edits:
+        assert 0 <= start <= end <= len(text)
+        assert text[start:end] != replacement  # Edits that change nothing are left out
+    for (_, previous_end, _), (start, _, _) in zip(edits, edits[1:]):
+        assert previous_end <= start
+
+
+def test_splice_without_edits_returns_the_text():
+    text = "No math.\n"
+    assert math_edits(text) == []
+    assert splice(text, []) is text
+
+
+@pytest.mark.parametrize("edits", [[(4, 6, "x"), (5, 7, "y")], [(6, 7, "x"), (0, 1, "y")], [(3, 2, "x")]])
+def test_splice_rejects_overlapping_or_reversed_edits(edits):
+    with pytest.raises(ValueError):
+        splice("0123456789", edits)
@@ -0,0 +1,181 @@
+"""The fast engine against the marko engine.
+
+The engines render non-math Markdown differently by design: marko re-renders
+the blocks it converts, the fast engine leaves everything but the math alone.
+On the testcases/ corpus and on generated ChatGPT-style documents they must
+find the same math, as (kind, content) spans with whitespace collapsed, and
+produce the same document, compared after a plain CommonMark re-render of both
+outputs. Edge cases built from top-level paragraphs, which marko renders
+verbatim, must come out byte-identical, and converting the fast engine's
+output again must change nothing. Display math content is kept as it is, so
+a document whose display math holds other delimiters (a cut-off "[" closed by
+a later block's "]") converts them on the second pass, in both engines; those
+are left out of that check. The marko engine is held to it on the edge cases
+only: it re-renders the other Markdown of the blocks it converts, and that
+changes once their math is converted (padded display math makes a list loose,
+and a "---" that joins a converted block becomes "* * *").
+
+Known divergence, kept out of the generator: marko's BlockMath opens on any
+line starting with "[" (a link, "[x]") and swallows text up to the next "]"
+line; the fast engine only opens display math on a bare "[" line.
+"""
+import os
+import random
+
+import pytest
+from marko import Markdown
+from marko.md_renderer import MarkdownRenderer
+
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax
+from chatgpt_clipboard_latex_fixer.fast_engine import fast_engine
+from chatgpt_clipboard_latex_fixer.math_parser import BlockMath, InlineBlockMath, InlineMath, default_engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENERATED = 400
+
+
+def marko_spans(text):
+    """Math spans found by the marko engine, in document order"""
+    spans = []
+
+    def walk(element):
+        if isinstance(element, (BlockMath, InlineBlockMath)):
+            spans.append(("display", " ".join(element.math_content.split())))
+        elif isinstance(element, InlineMath):
+            spans.append(("inline", " ".join(element.math_content.split())))
+        else:
+            children = getattr(element, "children", None)
+            if isinstance(children, list):
+                for child in children:
+                    walk(child)
+
+    walk(default_engine.parse(text))
+    return spans
+
+
+def fast_spans(text):
+    """Math spans found by the fast engine, in document order"""
+    return [(kind, " ".join(content.split())) for _, _, kind, content, _ in fast_engine.math_spans(text)]
+
+
+_plain = Markdown(renderer=MarkdownRenderer)
+
+
+def convert(text, engine):
+    return convert_math_syntax(text, engine=engine, cache=None)
+
+
+FORMULAS = ["x", "a^2 + b^2 = c^2", "\\frac{1}{2}", "E = mc^2", "\\sum_{i=1}^n i", "f(x)"]
+WORDS = ["the", "value", "of", "we", "get", "so", "and", "hence", "where", "is"]
+
+
+def random_inline(rng):
+    formula = rng.choice(FORMULAS)
+    return rng.choice([
+        f"$ {formula} $", f"${formula}$", f"$ {formula}$", f"\\({formula}\\)", f"\\( {formula} \\)",
+        f"`$ {formula} $`", f"**{rng.choice(WORDS)}**", f"[{rng.choice(WORDS)}](https://example.com)",
+    ])
+
+
+def random_sentence(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(2, 8))]
+    for _ in range(rng.randint(0, 3)):
+        # Never at the start: a line opening with "[" hits the known divergence
+        words.insert(rng.randint(1, len(words)), random_inline(rng))
+    return " ".join(words)
+
+
+def random_block(rng):
+    formula = rng.choice(FORMULAS)
+    kind = rng.randrange(12)
+    if kind == 0:
+        return f"[\n{formula}\n]"
+    if kind == 1:
+        return f"{random_sentence(rng)}\n[\n{formula}\n]\n{random_sentence(rng)}"
+    if kind == 2:
+        return f"{random_sentence(rng)} \\[\n{formula}\n\\]"
+    if kind == 3:
+        return f"```\n{random_sentence(rng)}\n```"
+    if kind == 4:
+        return f"    {random_sentence(rng)}"
+    if kind == 5:
+        return f"{'#' * rng.randint(1, 3)} {random_sentence(rng)}"
+    if kind == 6:
+        items = [f"{rng.choice(['-', '*', '1.'])} {random_sentence(rng)}" for _ in range(rng.randint(1, 4))]
+        return "\n".join(items)
+    if kind == 7:
+        return f"> {random_sentence(rng)}\n> {random_sentence(rng)}"
+    if kind == 8:
+        return "---"
+    if kind == 10:
+        # \[ ... \] inside a list item or a block quote
+        prefix, marker = rng.choice([("  ", "- "), ("> ", "> ")])
+        return f"{marker}{random_sentence(rng)} \\[\n{prefix}{formula}\n{prefix}\\]\n{prefix}{random_sentence(rng)}"
+    if kind == 9:
+        # A "[" line whose "]" was cut off: text unless a later block closes it
+        lead = rng.choice(["", f"{random_sentence(rng)}\n"])
+        return f"{lead}[\n{formula} {random_inline(rng)}"
+    return "\n".join(random_sentence(rng) for _ in range(rng.randint(1, 3)))
+
+
+def generate(rng):
+    return "\n\n".join(random_block(rng) for _ in range(rng.randint(1, 12))) + "\n"
+
+
+def load_testcases():
+    folder = os.path.join(ROOT, "testcases")
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".txt"):
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                yield name, f.read()
+
+
+def corpus():
+    rng = random.Random(0)
+    return list(load_testcases()) + [(f"generated #{i}", generate(rng)) for i in range(GENERATED)]
+
+
+CORPUS = corpus()
+
+
+def holds_nested_math(text):
+    """Whether display math in text contains other math delimiters"""
+    return any(
+        kind == "display" and any(delimiter in content for delimiter in ("$", "\\(", "\\["))
+        for kind, content in fast_spans(text)
+    )
+
+
+@pytest.mark.parametrize("name, text", CORPUS, ids=[name for name, _ in CORPUS])
+def test_engines_agree(name, text):
+    assert fast_spans(text) == marko_spans(text)
+    assert _plain.convert(convert(text, "fast")) == _plain.convert(convert(text, "marko"))
+
+
+EDGE_CASES = [
+    "Inline $ x $ and \\( y \\) and $z$.\n",
+    "Text \\[\na\n\\]\n",
+    "Text [\nE = mc^2\n]\nafter\n",
+    "Before\n\n[\nx = 1\n]\n\nAfter $ y $\n",
+    "Cut off\n\n[\nx + y $ z $\n",
+    "Code `$ x $` and $ x $\n",
+    "```\n$ x $\n```\n\nthen $ x $\n",
+    "# Heading $ x $\n",
+    "Escaped \\\\( x \\\\) and \\$ x \\$\n",
+]
+
+
+@pytest.mark.parametrize("text", EDGE_CASES, ids=range(len(EDGE_CASES)))
+def test_edge_cases_are_byte_identical(text):
+    assert convert(text, "fast") == convert(text, "marko")
+
+
+STABLE = [
+    ("fast", text) for text in EDGE_CASES + [text for _, text in CORPUS if not holds_nested_math(text)]
+] + [("marko", text) for text in EDGE_CASES]
+
+
+@pytest.mark.parametrize("engine, text", STABLE, ids=[f"{engine}-{i}" for i, (engine, _) in enumerate(STABLE)])
+def test_second_pass_changes_nothing(engine, text):
+    once = convert(text, engine)
+    assert convert(once, engine) == once
@@ -0,0 +1,108 @@
+"""ConversionHistory ring buffer: wrap-around, torn records, and the undo command."""
+import pytest
+
+from chatgpt_clipboard_latex_fixer import clipboard_factory
+from chatgpt_clipboard_latex_fixer.fakeclip import FakeClipboard, FakeClipboardListener
+from chatgpt_clipboard_latex_fixer.history import _HEADER_SIZE, _RECORD, _SLOT, ConversionHistory
+from chatgpt_clipboard_latex_fixer.main import main
+
+
+def pair(i, length=100):
+    original = f"Original {i} $ x_{i} $ ".ljust(length, "a")
+    return original, original.replace(f"$ x_{i} $", f"$x_{i}$")
+
+
+def test_records_read_back(tmp_path):
+    with ConversionHistory(str(tmp_path / "history.bin"), size=64 * 1024, max_records=16) as history:
+        seqs = [history.append(*pair(i), timestamp=1000.0 + i) for i in range(3)]
+        assert seqs == [1, 2, 3] and len(history) == 3
+        assert history.get(2) == (2, 1001.0) + pair(1)
+        assert history.latest() == history.get(3) and history.latest(3) == history.get(1)
+        assert history.latest(4) is None
+
+
+def test_ring_wraps_around_and_drops_the_oldest(tmp_path):
+    path = str(tmp_path / "history.bin")
+    size = _HEADER_SIZE + 64 * _SLOT.size + 1000  # Room for a few records of about 240 bytes
+    with ConversionHistory(path, size=size, max_records=64) as history:
+        for i in range(20):
+            assert history.append(*pair(i)) == i + 1
+            kept = [history.latest(back) for back in range(1, len(history) + 1)]
+            assert all(record is not None for record in kept)  # Everything between oldest and newest is readable
+            assert [record.original for record in kept] == [pair(j)[0] for j in range(i, i - len(kept), -1)]
+        assert 2 <= len(history) < 20
+        assert history.get(1) is None
+        assert history.append("x" * size, "y") is None  # Larger than the whole ring: not recorded
+    with ConversionHistory(path, create=False) as history:  # Survives reopening
+        assert history.latest().original == pair(19)[0]
+
+
+def test_index_slots_bound_the_record_count(tmp_path):
+    with ConversionHistory(str(tmp_path / "history.bin"), size=64 * 1024, max_records=4) as history:
+        for i in range(10):
+            history.append(*pair(i))
+        assert len(history) == 4
+        assert [history.latest(back).original for back in range(1, 5)] == [pair(j)[0] for j in (9, 8, 7, 6)]
+        assert history.get(6) is None
+
+
+def test_large_payloads_are_compressed(tmp_path):
+    original, converted = pair(0, 100_000)
+    with ConversionHistory(str(tmp_path / "history.bin"), size=64 * 1024, max_records=4) as history:
+        assert history.append(original, converted) is not None  # Fits only compressed
+        assert history.latest()[2:] == (original, converted)
+
+
+def test_torn_record_reads_as_missing(tmp_path):
+    path = tmp_path / "history.bin"
+    with ConversionHistory(str(path), size=64 * 1024, max_records=16) as history:
+        for i in range(3):
+            history.append(*pair(i))
+        offset = history._data_offset(_SLOT.unpack_from(history._mm, history._slot_offset(2))[1])
+    data = bytearray(path.read_bytes())
+    body = offset + _RECORD.size + 10
+    data[body:body + 20] = bytes(20)  # As if the crash came before the payload reached the disk
+    path.write_bytes(bytes(data))
+    with ConversionHistory(str(path), size=64 * 1024, max_records=16) as history:
+        assert history.get(2) is None
+        assert [history.get(seq).original for seq in (1, 3)] == [pair(0)[0], pair(2)[0]]
+        assert history.append(*pair(3)) == 4
+
+
+def test_other_files_are_not_histories(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a history" * 100)
+    with pytest.raises(ValueError):
+        ConversionHistory(str(path), create=False)
+    with pytest.raises(FileNotFoundError):
+        ConversionHistory(str(tmp_path / "missing.bin"), create=False)
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    """A history holding two conversions; returns its path"""
+    path = str(tmp_path / "history.bin")
+    with ConversionHistory(path) as history:
+        history.append(*pair(0))
+        history.append(*pair(1))
+    return path
+
+
+def test_undo_prints_the_original(recorded, capsys):
+    assert main(["undo", "--history", recorded, "--stdout", "-n", "2"]) == 0
+    assert capsys.readouterr().out == pair(0)[0]
+    assert main(["undo", "--history", recorded, "--stdout", "-n", "3"]) == 1
+
+
+def test_undo_restores_the_original_and_the_listener_leaves_it(recorded, monkeypatch, capsys):
+    clipboard = FakeClipboard(pair(1)[1])
+    monkeypatch.setattr(clipboard_factory, "create_clipboard_listener", lambda: FakeClipboardListener(clipboard))
+    assert main(["undo", "--history", recorded]) == 0
+    assert clipboard.text == pair(1)[0]
+
+    listener = FakeClipboardListener(clipboard)
+    listener.history = ConversionHistory(recorded, create=False)
+    try:
+        assert listener.read_clipboard() is None  # Converting it again would undo the undo
+    finally:
+        listener.history.close()
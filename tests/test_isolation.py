@@ -0,0 +1,61 @@
+"""A block that makes the converter raise falls back on its own; the other blocks convert normally."""
+import pytest
+
+from chatgpt_clipboard_latex_fixer.common import ConversionStats, convert_block_isolated, convert_math_syntax, convert_stream
+from chatgpt_clipboard_latex_fixer.fast_engine import fast_engine
+from chatgpt_clipboard_latex_fixer.math_parser import default_engine
+from chatgpt_clipboard_latex_fixer.profiles import compile_profile
+
+BLOCKS = ["First $ a $ here.\n\n", "The BOOM block with \\( b \\).\n\n", "Last\n[\nc\n]\nend.\n"]
+DOCUMENT = "".join(BLOCKS)
+
+
+def fail_on_marker(monkeypatch, engine, *names):
+    """Make the named methods of engine raise for text containing BOOM"""
+    for name in names:
+        original = getattr(engine, name)
+
+        def method(text, *args, _original=original):
+            if "BOOM" in text:
+                raise RuntimeError("parser bug")
+            return _original(text, *args)
+
+        monkeypatch.setattr(engine, name, method)
+
+
+@pytest.fixture
+def marko_fails(monkeypatch):
+    fail_on_marker(monkeypatch, default_engine, "convert", "parse")
+
+
+def test_only_the_failing_block_falls_back(marko_fails):
+    stats = ConversionStats()
+    output = convert_math_syntax(DOCUMENT, cache=None, stats=stats)
+    expected = [
+        convert_math_syntax(BLOCKS[0], cache=None).rstrip("\n") + "\n\n",
+        fast_engine.convert(BLOCKS[1]),
+        convert_math_syntax(BLOCKS[2], cache=None),
+    ]
+    assert output == "".join(expected)
+    assert "\\(" not in output and "$b$" in output  # The fallback still converted the failing block's math
+    assert (stats.blocks_failed, stats.failed_offsets) == (1, [len(BLOCKS[0])])
+
+
+def test_block_is_unchanged_when_the_fallback_fails_too(marko_fails, monkeypatch):
+    fail_on_marker(monkeypatch, fast_engine, "convert")
+    stats = ConversionStats()
+    assert convert_block_isolated(BLOCKS[1], last=False, stats=stats, offset=7) == BLOCKS[1]
+    assert stats.failed_offsets == [7]
+
+
+def test_profile_engine_block_is_left_unchanged(monkeypatch):
+    engine = compile_profile({"inline": "\\("})
+    fail_on_marker(monkeypatch, engine, "convert", "parse")
+    output = convert_math_syntax(DOCUMENT, engine=engine, cache=None)
+    assert BLOCKS[1] in output  # Not rewritten with the default profile's delimiters
+    assert output.startswith("First \\(a\\) here.")
+
+
+def test_stream_falls_back_per_block(marko_fails):
+    lines = DOCUMENT.splitlines(keepends=True)
+    assert "".join(convert_stream(lines)) == convert_math_syntax(DOCUMENT, cache=None)
@@ -0,0 +1,297 @@
+"""The Linux listeners with the X server and wl-clipboard mocked, and the choice between them.
+
+FakeDisplay stands in for python-xlib's Display and for the app that owns
+CLIPBOARD: it answers conversion requests from what that app offers and
+queues the events the X server would send. FakeWayland answers the
+wl-paste / wl-copy calls and turns every copy into a ``wl-paste --watch``
+wake-up.
+"""
+import subprocess
+import sys
+import types
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer import linuxclip
+
+TEXT = "Let $ x $ be.\n"
+CONVERTED = "Let $x$ be.\n"
+IMAGE = {"image/png": b"\x89PNG" + bytes(64)}
+OWNER_NOTIFY = (87, 0)  # (event type, sub code) of XFixesSelectionNotify
+
+
+class X:
+    NONE = AnyPropertyType = CurrentTime = CopyFromParent = 0
+    PropertyChangeMask = 1 << 22
+    PropertyNotify, SelectionClear, SelectionRequest, SelectionNotify = 28, 29, 30, 31
+    PropertyNewValue, PropertyDelete = 0, 1
+
+
+class FakeWindow:
+    def __init__(self, display, window_id):
+        self.display = display
+        self.id = window_id
+        self.properties = {}
+        self.sent = []
+
+    def convert_selection(self, selection, target, prop, time):
+        display = self.display
+        name = display.atom_name(target)
+        display.conversions.append(name)
+        if name == "TARGETS":
+            self.properties[prop] = SimpleNamespace(property_type=target, value=[display.get_atom(n) for n in display.offer])
+        elif name in display.offer:
+            self.properties[prop] = SimpleNamespace(property_type=target, value=display.offer[name])
+        else:
+            prop = X.NONE
+        display.events.append(SimpleNamespace(type=X.SelectionNotify, requestor=self, target=target, property=prop))
+
+    def get_full_property(self, prop, property_type, sizehint=0):
+        return self.properties.get(prop)
+
+    def delete_property(self, prop):
+        self.properties.pop(prop, None)
+
+    def change_property(self, prop, property_type, format, data):
+        self.properties[prop] = SimpleNamespace(property_type=property_type, value=data)
+
+    def change_attributes(self, **attributes):
+        pass
+
+    def send_event(self, event):
+        self.sent.append(event)
+
+    def set_selection_owner(self, selection, time):
+        self.display.take_ownership(self)
+
+
+class FakeDisplay:
+    """The X server and the app that owns CLIPBOARD; next_event() on an empty queue is Ctrl+C"""
+
+    def __init__(self, xfixes=True):
+        self.xfixes = xfixes
+        self.atoms = {}
+        self.events = deque()
+        self.offer = {}  # {target name: value} offered by the owner
+        self.owner = None  # Window owning CLIPBOARD, None while another app does
+        self.conversions = []  # Target names the listener asked the owner for
+        self.closed = False
+        self.info = SimpleNamespace(max_request_length=65535)
+        self.extension_event = SimpleNamespace(SetSelectionOwnerNotify=OWNER_NOTIFY)
+
+    def has_extension(self, name):
+        return self.xfixes
+
+    def xfixes_query_version(self):
+        pass
+
+    def xfixes_select_selection_input(self, window, selection, mask):
+        pass
+
+    def get_atom(self, name):
+        return self.atoms.setdefault(name, len(self.atoms) + 1)
+
+    def atom_name(self, atom):
+        return next(name for name, value in self.atoms.items() if value == atom)
+
+    def screen(self):
+        return SimpleNamespace(root=SimpleNamespace(create_window=lambda *args, **kwargs: FakeWindow(self, 100)))
+
+    def flush(self):
+        pass
+
+    def pending_events(self):
+        return len(self.events)
+
+    def next_event(self):
+        if not self.events:
+            raise KeyboardInterrupt
+        return self.events.popleft()
+
+    def get_selection_owner(self, selection):
+        return self.owner
+
+    def close(self):
+        self.closed = True
+
+    def take_ownership(self, window):
+        self.owner = window
+        self.events.append(SimpleNamespace(type=OWNER_NOTIFY[0], sub_code=OWNER_NOTIFY[1], owner=window))
+
+    def copy(self, offer):
+        """Another app copies: it owns CLIPBOARD and offers these targets"""
+        self.offer = dict(offer, TARGETS=None)
+        self.take_ownership(SimpleNamespace(id=7))
+
+
+@pytest.fixture
+def xlib(monkeypatch):
+    """Install a fake python-xlib whose Display is the returned FakeDisplay"""
+    display = FakeDisplay()
+    package = types.ModuleType("Xlib")
+    package.X = X
+    package.display = SimpleNamespace(Display=lambda name=None: display)
+    package.Xatom = SimpleNamespace(ATOM=4)
+    modules = {
+        "Xlib": package,
+        "Xlib.ext": SimpleNamespace(xfixes=SimpleNamespace(XFixesSetSelectionOwnerNotifyMask=1)),
+        "Xlib.protocol": SimpleNamespace(),
+        "Xlib.protocol.event": SimpleNamespace(SelectionNotify=lambda **fields: SimpleNamespace(**fields)),
+    }
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    return display
+
+
+def x11_listener():
+    listener = linuxclip.X11ClipboardListener()
+    listener.cache = None
+    listener.conversion_budget = None
+    return listener
+
+
+def text_offer(text):
+    return {"UTF8_STRING": text.encode("utf-8"), "STRING": text.encode("latin-1", "replace")}
+
+
+def test_x11_converts_text_and_serves_it(xlib):
+    listener = x11_listener()
+    xlib.copy(text_offer(TEXT))
+    listener.start()  # Returns at the Ctrl+C of the empty event queue
+
+    assert xlib.owner is listener.window
+    assert listener._owned_text == CONVERTED.encode("utf-8")
+    assert xlib.conversions == ["TARGETS", "UTF8_STRING"]  # Our own ownership change was not read back
+    assert xlib.closed
+
+    requestor = FakeWindow(xlib, 9)
+    prop = xlib.get_atom("PASTE")
+    listener._dispatch(SimpleNamespace(
+        type=X.SelectionRequest, requestor=requestor, selection=listener.CLIPBOARD,
+        target=xlib.get_atom("UTF8_STRING"), property=prop, time=0,
+    ))
+    assert requestor.properties[prop].value == CONVERTED.encode("utf-8")
+    assert [event.property for event in requestor.sent] == [prop]
+
+
+def test_x11_skips_non_text_after_targets(xlib):
+    listener = x11_listener()
+    xlib.copy(IMAGE)
+    listener.start()
+    assert xlib.conversions == ["TARGETS"]
+    assert xlib.owner is not listener.window
+
+
+def test_x11_needs_xfixes(xlib):
+    xlib.xfixes = False
+    with pytest.raises(NotImplementedError):
+        linuxclip.X11ClipboardListener()
+
+
+def test_x11_needs_python_xlib(monkeypatch):
+    monkeypatch.setitem(sys.modules, "Xlib", None)
+    with pytest.raises(NotImplementedError):
+        linuxclip.X11ClipboardListener()
+
+
+class FakeWayland:
+    """wl-paste and wl-copy over one offer; every copy wakes up wl-paste --watch"""
+
+    def __init__(self):
+        self.offer = {}  # {MIME type: bytes}
+        self.copies = deque()  # Offers other apps copy while the listener watches
+        self.calls = []
+
+    def run(self, args, input=None, text=False, **kwargs):
+        self.calls.append(args)
+        if args[:2] == ["wl-paste", "--list-types"]:
+            stdout = "\n".join(self.offer)
+            return subprocess.CompletedProcess(args, 0 if self.offer else 1, stdout if text else stdout.encode())
+        if args[0] == "wl-paste":
+            mime = args[args.index("--type") + 1]
+            return subprocess.CompletedProcess(args, 0 if mime in self.offer else 1, self.offer.get(mime, b""))
+        if args[0] == "wl-copy":
+            self.copy({args[args.index("--type") + 1]: input, "text/plain": input})
+            return subprocess.CompletedProcess(args, 0)
+        raise AssertionError(f"Unexpected command {args}")
+
+    def copy(self, offer):
+        self.offer = offer
+        self.copies.append(None)  # One wake-up per change, the listener's own write-backs included
+
+    def watch(self):
+        while self.copies:
+            self.copies.popleft()
+            yield "changed\n"
+
+    def popen(self, args, **kwargs):
+        assert args[:2] == ["wl-paste", "--watch"]
+        return SimpleNamespace(stdout=self.watch(), wait=lambda: 0, poll=lambda: 0, terminate=lambda: None)
+
+
+@pytest.fixture
+def wayland(monkeypatch):
+    fake = FakeWayland()
+    monkeypatch.setattr(linuxclip.shutil, "which", lambda tool: f"/usr/bin/{tool}")
+    monkeypatch.setattr(linuxclip.subprocess, "run", fake.run)
+    monkeypatch.setattr(linuxclip.subprocess, "Popen", fake.popen)
+    return fake
+
+
+def wayland_listener():
+    listener = linuxclip.WaylandClipboardListener()
+    listener.cache = None
+    listener.conversion_budget = None
+    listener.convert_in_background = False
+    return listener
+
+
+def fetches(fake):
+    return [args for args in fake.calls if args[0] == "wl-paste" and "--type" in args]
+
+
+def test_wayland_watch_converts_text_once(wayland):
+    listener = wayland_listener()
+    wayland.copy({"text/plain;charset=utf-8": TEXT.encode("utf-8")})
+    listener.start()
+
+    assert wayland.offer["text/plain;charset=utf-8"] == CONVERTED.encode("utf-8")
+    assert [args[0] for args in wayland.calls].count("wl-copy") == 1
+    assert len(fetches(wayland)) == 2  # The copy, then our write-back, recognised by its fingerprint
+    assert listener.metrics.snapshot()["events"]["skipped"] == 1
+
+
+def test_wayland_skips_non_text_after_listing_types(wayland):
+    listener = wayland_listener()
+    wayland.copy(IMAGE)
+    listener.start()
+    assert fetches(wayland) == []
+    assert wayland.offer == IMAGE
+
+
+def test_wayland_needs_wl_clipboard(monkeypatch):
+    monkeypatch.setattr(linuxclip.shutil, "which", lambda tool: None if tool == "wl-copy" else f"/usr/bin/{tool}")
+    with pytest.raises(NotImplementedError, match="wl-copy"):
+        linuxclip.WaylandClipboardListener()
+
+
+def test_wayland_session_picks_wl_clipboard(wayland, monkeypatch):
+    monkeypatch.setenv("WAYLAND_DISPLAY", "wayland-0")
+    monkeypatch.setenv("DISPLAY", ":0")
+    assert isinstance(linuxclip.create_linux_listener(), linuxclip.WaylandClipboardListener)
+
+
+def test_wayland_session_without_wl_clipboard_falls_back_to_x11(xlib, monkeypatch):
+    monkeypatch.setenv("WAYLAND_DISPLAY", "wayland-0")
+    monkeypatch.setenv("DISPLAY", ":0")
+    monkeypatch.setattr(linuxclip.shutil, "which", lambda tool: None)
+    assert isinstance(linuxclip.create_linux_listener(), linuxclip.X11ClipboardListener)
+
+
+def test_no_graphical_session(monkeypatch):
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    monkeypatch.delenv("DISPLAY", raising=False)
+    with pytest.raises(NotImplementedError):
+        linuxclip.create_linux_listener()
@@ -0,0 +1,45 @@
+"""Math node layout, and peak conversion memory against benchmarks/memory_budget.json.
+
+The memory scenarios and their measurement come from benchmarks/bench_memory.py,
+which reports the same numbers for other sizes. Documents are 256KB: below
+that, fixed costs dominate the ratio to the input size.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer.math_parser import BlockMath, InlineBlockMath, InlineMath, default_engine
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCHMARKS)
+
+import bench_memory  # noqa: E402
+
+
+def math_nodes(element):
+    """Math elements of a parsed document, in document order"""
+    if isinstance(element, (BlockMath, InlineBlockMath, InlineMath)):
+        return [element]
+    children = getattr(element, "children", None)
+    if not isinstance(children, list):
+        return []
+    return [node for child in children for node in math_nodes(child)]
+
+
+def test_math_nodes_keep_offsets_in_slots():
+    nodes = math_nodes(default_engine.parse("Let $ x $ be so that [\n y \n] holds.\n\n[\nz = 1\n]\n"))
+    assert [type(node) for node in nodes] == [InlineMath, InlineBlockMath, BlockMath]
+    for node in nodes:
+        assert vars(node) == {}  # Marko's base classes leave an empty __dict__; nothing may land in it
+    assert [node.source_span for node in nodes[:2]] == [None, None]  # Inline source positions are not tracked
+    assert [node.math_content.strip() for node in nodes] == ["x", "y", "z = 1"]
+
+
+@pytest.mark.parametrize("name", sorted(bench_memory.SCENARIOS))
+def test_peak_memory_within_budget(name):
+    with open(os.path.join(BENCHMARKS, "memory_budget.json"), "r", encoding="utf-8") as f:
+        budget = json.load(f)[name]["max_mib_per_mb"]
+    func, build = bench_memory.SCENARIOS[name]
+    assert bench_memory.peak_per_mb(func, build(256 * 1024)) <= budget
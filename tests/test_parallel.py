@@ -0,0 +1,64 @@
+"""Parallel conversion of one document: chunks cut at block boundaries must join to the serial output."""
+import os
+import sys
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer import common, parallel
+from chatgpt_clipboard_latex_fixer.blocks import split_blocks
+from chatgpt_clipboard_latex_fixer.common import ConversionStats, convert_math_syntax
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import corpus  # noqa: E402
+
+# Blocks whose output depends on what follows them: trailing blank lines, containers, fences
+EDGES = (
+    "Text\n[\nx\n]\nmore.\n\n\n\n- item $ a $\n\n  continued \\( b \\)\n\n> [\n> c\n> ]\n\n"
+    "```\n$ code $\n\n```\n\n$$\nd\n$$\n\nLast $ e $ without a newline"
+)
+DOCUMENTS = {
+    "corpus": corpus.generate(24 * 1024, seed=5, nesting=2, code_ratio=0.2),
+    "edges": "\n\n".join([EDGES] * 20),
+}
+
+
+@pytest.fixture(scope="module")
+def pool():
+    yield parallel.get_pool(2)
+    parallel.shutdown()
+
+
+@pytest.mark.parametrize("name", list(DOCUMENTS))
+@pytest.mark.parametrize("chunks", [1, 3, 8, 1000])
+def test_chunks_join_to_the_serial_output(name, chunks):
+    text = DOCUMENTS[name]
+    blocks = split_blocks(text)
+    jobs = parallel.chunk_blocks(blocks, chunks)
+    assert [block for job in jobs for block in job[0]] == blocks
+    assert [ends for _, _, ends in jobs] == [False] * (len(jobs) - 1) + [True]
+    starts = [0]
+    for job_blocks, _, _ in jobs[:-1]:
+        starts.append(starts[-1] + sum(len(block) for block in job_blocks))
+    assert [start for _, start, _ in jobs] == starts
+    output = "".join(parallel._convert_chunk(job)[0] for job in jobs)
+    assert output == convert_math_syntax(text, cache=None)
+
+
+@pytest.mark.parametrize("name", list(DOCUMENTS))
+def test_workers_give_the_serial_output(pool, name):
+    text = DOCUMENTS[name]
+    stats = ConversionStats()
+    assert parallel.convert_blocks(split_blocks(text), 2, stats) == convert_math_syntax(text, cache=None)
+    assert stats.blocks_parsed + stats.blocks_skipped == len(split_blocks(text))
+
+
+def test_convert_math_syntax_uses_the_pool_for_large_text(pool, monkeypatch):
+    calls = []
+    convert_blocks = parallel.convert_blocks
+    monkeypatch.setattr(parallel, "convert_blocks", lambda *args: calls.append(args) or convert_blocks(*args))
+    monkeypatch.setattr(common, "PARALLEL_MIN_CHARS", 1024)
+    text = DOCUMENTS["edges"]
+    assert convert_math_syntax(text, cache=None, workers=2) == convert_math_syntax(text, cache=None)
+    assert len(calls) == 1
@@ -0,0 +1,90 @@
+"""The clipboard probe that runs before the listener fetches any text, on the fake backend.
+
+Notifications are delivered the way the event-driven backends do, by calling
+read_clipboard() after a change.
+"""
+import pytest
+
+from chatgpt_clipboard_latex_fixer.base_clipboard_listener import ClipboardProbe, ConversionMixin
+from chatgpt_clipboard_latex_fixer.fakeclip import FakeClipboard, FakeClipboardListener
+
+DOCUMENT = "The area is $ \\pi r^2 $ and\n\n[\nE = mc^2\n]\n"
+FRESH = "Then \\( a^2 + b^2 = c^2 \\) holds.\n"
+
+
+class FullReadListener(FakeClipboardListener):
+    """A backend without metadata: every notification fetches the text"""
+
+    def probe_clipboard(self):
+        return ClipboardProbe(None, True, None)
+
+
+class MixinListener(ConversionMixin):
+    """A host of ConversionMixin alone, as the macOS listener is: a text type on offer but no size"""
+
+    def __init__(self, clipboard):
+        self._init_conversion_state()
+        self.clipboard = clipboard
+
+    def get_clipboard_change_count(self):
+        return self.clipboard.change_count
+
+    def probe_clipboard(self):
+        change_count, has_text, _ = self.clipboard.probe()
+        return ClipboardProbe(change_count, has_text, None)
+
+    def get_clipboard_text(self):
+        return self.clipboard.paste()
+
+    def set_clipboard_text(self, text):
+        self.clipboard.copy(text)
+        return True
+
+
+def converted_listener(kind=FakeClipboardListener):
+    """A listener that has converted DOCUMENT and written it back, as after a copy of it"""
+    listener = kind(FakeClipboard())
+    listener.cache = None
+    listener.conversion_budget = None
+    listener.clipboard.copy(DOCUMENT)
+    listener.convert_and_write_back(listener.read_clipboard())
+    assert listener.clipboard.text != DOCUMENT
+    return listener
+
+
+def fetches(listener):
+    """Deliver a change notification; return (content read, full clipboard fetches it took)"""
+    reads = listener.clipboard.reads
+    content = listener.read_clipboard()
+    return content, listener.clipboard.reads - reads
+
+
+@pytest.mark.parametrize(
+    "kind, expected_reads", [(FakeClipboardListener, 0), (FullReadListener, 1), (MixinListener, 0)]
+)
+def test_echo_is_skipped(kind, expected_reads):
+    # The probe knows the change count of our write-back; without it the fingerprint gives the echo away
+    listener = converted_listener(kind)
+    assert fetches(listener) == (None, expected_reads)
+
+
+@pytest.mark.parametrize("kind", [FakeClipboardListener, MixinListener])
+def test_non_text_item_is_skipped_without_fetching(kind):
+    listener = converted_listener(kind)
+    listener.clipboard.copy_data(b"\x89PNG" + bytes(1024))
+    assert fetches(listener) == (None, 0)
+
+
+@pytest.mark.parametrize("kind", [FakeClipboardListener, FullReadListener, MixinListener])
+def test_recopy_is_recognised_by_fingerprint(kind):
+    listener = converted_listener(kind)
+    listener.clipboard.copy(listener.clipboard.text)  # The user copies the converted text again
+    content, _ = fetches(listener)
+    assert content is None
+
+
+@pytest.mark.parametrize("kind", [FakeClipboardListener, FullReadListener, MixinListener])
+def test_new_text_comes_through(kind):
+    listener = converted_listener(kind)
+    listener.clipboard.copy(FRESH)
+    assert fetches(listener) == (FRESH, 1)
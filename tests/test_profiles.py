@@ -0,0 +1,97 @@
+"""Rule profiles: parsing and validation, what each rule turns on or off, and the cache key."""
+import json
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer.cache import ConversionCache
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax
+from chatgpt_clipboard_latex_fixer.math_parser import default_engine
+from chatgpt_clipboard_latex_fixer.profiles import (
+    DEFAULT_PROFILE, compile_profile, load_profile, normalize_profile, profile_key, profile_needs_conversion,
+)
+
+TEXT = (
+    "A $ a $ and \\( b \\) and\n\n[\nc\n]\n\nText \\[\nd\n\\]\n\n"
+    "\\begin{equation}\ne\n\\end{equation}\n"
+)
+
+# Profile -> (text in the output, text that is only there with the default profile)
+RULES = {
+    "bare_brackets": ({"bare_brackets": False}, "\n[\nc\n]\n", "$$\nc\n$$"),
+    "escaped_brackets": ({"escaped_brackets": False}, "Text \\[\nd\n\\]", "Text $$\n\nd\n\n$$"),
+    "parens": ({"parens": False}, "and \\( b \\) and", "and $b$ and"),
+    "dollars": ({"dollars": False}, "A $ a $ and", "A $a$ and"),
+    "environments": ({"environments": ["equation"]}, "$$\n\\begin{equation}\ne\n\\end{equation}\n$$", "$$\n\n\\begin{equation}"),
+    "display": ({"display": "\\["}, "\\[\nc\n\\]", "$$\nc\n$$"),
+    "inline": ({"inline": "\\("}, "A \\(a\\) and \\(b\\) and", "A $a$ and $b$ and"),
+}
+
+
+def test_toml_profile_is_parsed_and_completed(tmp_path):
+    path = tmp_path / "team.toml"
+    path.write_text('bare_brackets = false\nenvironments = ["align*", "equation", "align*"]\ndisplay = "\\\\["\n')
+    assert load_profile(str(path)) == dict(
+        DEFAULT_PROFILE, bare_brackets=False, environments=["align*", "equation"], display="\\[",
+    )
+
+
+def test_json_profile_is_parsed(tmp_path):
+    path = tmp_path / "team.json"
+    path.write_text(json.dumps({"inline": "\\(", "parens": False}))
+    assert load_profile(str(path)) == dict(DEFAULT_PROFILE, inline="\\(", parens=False)
+
+
+@pytest.mark.parametrize("profile", [
+    {"brackets": False},  # Unknown key
+    {"dollars": "yes"},  # Not a boolean
+    {"display": "\\begin"},  # Not one of the choices
+    {"environments": "equation"},  # A string, not a list
+    {"environments": ["bad}name"]},
+])
+def test_invalid_profile_is_rejected(profile):
+    with pytest.raises(ValueError):
+        normalize_profile(profile)
+
+
+def test_profile_file_must_be_a_table(tmp_path):
+    path = tmp_path / "list.json"
+    path.write_text("[1, 2]")
+    with pytest.raises(ValueError, match="list.json"):
+        load_profile(str(path))
+
+
+@pytest.mark.parametrize("rule", list(RULES))
+def test_rule_toggles(rule):
+    profile, present, default_only = RULES[rule]
+    default = convert_math_syntax(TEXT, cache=None)
+    output = convert_math_syntax(TEXT, engine=compile_profile(profile), cache=None)
+    assert default_only in default and default_only not in output
+    assert present in output
+
+
+def test_inline_output_rule_rewrites_normalized_dollars():
+    profile = normalize_profile({"inline": "\\("})
+    assert profile_needs_conversion(profile, "Already $x$.\n")
+    assert convert_math_syntax("Already $x$.\n", engine=compile_profile(profile), cache=None) == "Already \\(x\\).\n"
+
+
+def test_equivalent_profiles_share_a_key_and_an_engine():
+    first = {"environments": ["equation", "align"], "parens": True}
+    second = {"environments": ["align", "equation", "align"]}
+    assert profile_key(normalize_profile(first)) == profile_key(normalize_profile(second))
+    assert compile_profile(first) is compile_profile(second)
+    assert compile_profile({}) is compile_profile(None) is default_engine
+
+
+def test_cache_key_changes_with_the_profile():
+    keys = {profile_key(normalize_profile(profile)) for profile, _, _ in RULES.values()}
+    assert len(keys) == len(RULES) and profile_key(DEFAULT_PROFILE) not in keys
+    namespaces = {compile_profile(profile).cache_namespace for profile, _, _ in RULES.values()}
+    assert len(namespaces) == len(RULES) and default_engine.cache_namespace not in namespaces
+
+    cache = ConversionCache()
+    outputs = {rule: convert_math_syntax(TEXT, engine=compile_profile(profile), cache=cache)
+               for rule, (profile, _, _) in RULES.items()}
+    for rule, (profile, _, _) in RULES.items():  # Answered from the cache, each from its own entry
+        assert convert_math_syntax(TEXT, engine=compile_profile(profile), cache=cache) == outputs[rule]
+    assert cache.stats()["hits"] == len(RULES)
@@ -0,0 +1,90 @@
+"""PollScheduler backoff and reset on a controlled clock, and the fake clipboard's change count."""
+import threading
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer import scheduler as scheduler_module
+from chatgpt_clipboard_latex_fixer.fakeclip import FakeClipboard, FakeClipboardListener
+from chatgpt_clipboard_latex_fixer.scheduler import PollScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler_module.time, "monotonic", clock)
+    return clock
+
+
+def idle_polls(scheduler, clock, count, step=0.0):
+    intervals = []
+    for _ in range(count):
+        clock.now += step
+        intervals.append(scheduler.record(False))
+    return intervals
+
+
+def test_idle_polls_back_off_to_the_ceiling(clock):
+    scheduler = PollScheduler(floor=0.05, ceiling=0.4)
+    assert idle_polls(scheduler, clock, 5) == [0.1, 0.2, 0.4, 0.4, 0.4]
+
+
+def test_default_ceiling_is_two_seconds(clock):
+    assert idle_polls(PollScheduler(), clock, 8)[-1] == 2.0
+
+
+def test_change_resets_to_the_floor_and_stays_hot(clock):
+    scheduler = PollScheduler(floor=0.05, ceiling=0.4, hot_seconds=2.0)
+    idle_polls(scheduler, clock, 5)
+    assert scheduler.record(True) == 0.05
+    assert idle_polls(scheduler, clock, 3, step=0.5) == [0.05] * 3  # Within the hot period
+    clock.now += 1.0
+    assert idle_polls(scheduler, clock, 2) == [0.1, 0.2]
+
+
+def test_wake_resets_to_the_floor_and_cuts_the_wait_short(clock):
+    scheduler = PollScheduler(floor=0.05, ceiling=0.4)
+    idle_polls(scheduler, clock, 5)
+    threading.Timer(0.05, scheduler.wake).start()
+    assert scheduler.wait(5)
+    assert scheduler.interval == 0.05
+    assert not scheduler.wait(0)  # The wake-up was used
+
+
+@pytest.mark.parametrize("kwargs", [{"floor": 0}, {"floor": 1.0, "ceiling": 0.5}, {"backoff": 0.5}])
+def test_invalid_intervals_are_rejected(kwargs):
+    with pytest.raises(ValueError):
+        PollScheduler(**kwargs)
+
+
+def test_fake_clipboard_counts_every_change():
+    clipboard = FakeClipboard()
+    assert clipboard.change_count == 0
+    clipboard.copy("a")
+    clipboard.copy("a")  # Copying the same text again is a change too
+    clipboard.copy_data(b"\x89PNG")
+    assert clipboard.change_count == 3
+    assert clipboard.probe() == (3, False, None)
+    clipboard.paste()
+    assert (clipboard.change_count, clipboard.reads, clipboard.writes) == (3, 1, 3)
+
+
+def test_polls_without_a_change_read_nothing():
+    clipboard = FakeClipboard("Before start")
+    listener = FakeClipboardListener(clipboard)
+    listener.cache = None
+    listener.convert_in_background = False
+    listener.last_change_count = listener.get_clipboard_change_count()
+    assert not listener.check_clipboard()
+    assert clipboard.reads == 0
+    clipboard.copy("No math here")
+    assert listener.check_clipboard()
+    assert not listener.check_clipboard()
+    assert clipboard.reads == 1
@@ -0,0 +1,30 @@
+"""Package import time and lazily imported modules against benchmarks/startup_budget.json.
+
+The scenarios and their measurement come from benchmarks/bench_startup.py. They
+are measured once per session, in fresh interpreters, and each scenario is
+checked against its absolute budget, its budget relative to another scenario
+of the same run, and the modules it must not import.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCHMARKS)
+
+import bench_startup  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def results():
+    with open(os.path.join(BENCHMARKS, "startup_budget.json"), "r", encoding="utf-8") as f:
+        budget = json.load(f)
+    return bench_startup.check(budget, runs=5)
+
+
+@pytest.mark.parametrize("name", list(bench_startup.SCENARIOS))
+def test_startup_within_budget(results, name):
+    ms, problems = results[name]
+    assert not problems, f"{name} took {ms:.1f} ms: {'; '.join(problems)}"
@@ -0,0 +1,78 @@
+"""convert_stream against convert_math_syntax, with the input cut at arbitrary points.
+
+Cuts fall inside math delimiters and fences as well as between lines, since
+chunks read from a pipe or socket respect neither.
+"""
+import os
+import random
+import sys
+
+import pytest
+
+from chatgpt_clipboard_latex_fixer.common import convert_math_syntax, convert_stream
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import corpus  # noqa: E402
+
+ENGINES = ["marko", "fast"]
+
+DOCUMENTS = {
+    "fences": (
+        "Let $ x $ be.\n\n```python\nprint('$ not math $')\n\n\\( still code \\)\n```\n\n"
+        "~~~\n[\nx\n]\n~~~\nThen \\( y \\) and\n\n[\nE = mc^2\n]\n"
+    ),
+    "display in containers": "- item \\[\n  a^2\n  \\]\n\n> Quote $ b $\n>\n> [\n> c\n> ]\n\nText\n[\nd\n]\nmore.\n",
+    "no final newline": "Last $ z $ without a newline",
+    "corpus": corpus.generate(4 * 1024, seed=3, nesting=2, code_ratio=0.2),
+}
+
+
+def cut(text, positions):
+    positions = sorted(set(p for p in positions if 0 < p < len(text)))
+    return [text[start:end] for start, end in zip([0] + positions, positions + [len(text)])]
+
+
+def delimiter_cuts(text):
+    """Cuts through every "$", "\\(", "\\)", "\\[", "\\]" and fence"""
+    positions = []
+    for needle in ("$", "\\(", "\\)", "\\[", "\\]", "```", "~~~"):
+        start = text.find(needle)
+        while start != -1:
+            positions += [start, start + 1]
+            start = text.find(needle, start + 1)
+    return cut(text, positions)
+
+
+CHUNKINGS = {
+    "lines": lambda text: text.splitlines(keepends=True),
+    "single characters": list,
+    "7 characters": lambda text: [text[i:i + 7] for i in range(0, len(text), 7)],
+    "random": lambda text: cut(text, random.Random(len(text)).sample(range(len(text)), len(text) // 20)),
+    "through delimiters": delimiter_cuts,
+}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("chunking", list(CHUNKINGS))
+@pytest.mark.parametrize("name", list(DOCUMENTS))
+def test_stream_equals_whole_document(engine, chunking, name):
+    text = DOCUMENTS[name]
+    chunks = CHUNKINGS[chunking](text)
+    assert "".join(chunks) == text
+    assert "".join(convert_stream(chunks, engine=engine)) == convert_math_syntax(text, engine=engine, cache=None)
+
+
+def test_blocks_are_yielded_before_the_input_ends():
+    def chunks():
+        yield "First $ a $.\n\nSecond "
+        yield "$ b $.\n\n"
+        raise AssertionError("Read past the blocks the test consumed")
+
+    stream = convert_stream(chunks(), engine="fast")
+    assert next(stream) == "First $a$.\n\n"
+
+
+def test_empty_input():
+    assert "".join(convert_stream([], engine="fast")) == convert_math_syntax("", engine="fast", cache=None)